@@ -0,0 +1,336 @@
+"""Price alert rules with indexed threshold evaluation
+
+Rules live in SQLite and, while active, in one ThresholdBook per (ticker,
+metric, direction): a sorted list of thresholds with the rule ids beside
+them. A quote moving a metric from prev to value crosses exactly the
+thresholds between the two, which two binary searches find, so each tick
+costs O(log n + triggered) in the rules on that ticker instead of a scan.
+Rules fire on crossings and are one-shot: a triggered rule is deactivated
+and recorded as an event for the endpoints and the stream.
+"""
+import asyncio
+import itertools
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+ALERTS_DIR = os.getenv("ALERTS_DATA_PATH", os.path.join(os.path.dirname(__file__), "alerts_data"))
+MAX_RULES_PER_USER = int(os.getenv("MAX_ALERTS_PER_USER", "500"))
+
+# kind -> (quote field, direction the value must cross the threshold in)
+ALERT_KINDS = {
+    "price_above": ("price", "above"),
+    "price_below": ("price", "below"),
+    "change_pct_above": ("change_pct", "above"),
+    "change_pct_below": ("change_pct", "below"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_rules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    threshold REAL NOT NULL,
+    note TEXT DEFAULT '',
+    created_at REAL NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS alert_rules_user ON alert_rules (user, active);
+CREATE TABLE IF NOT EXISTS alert_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    rule_id INTEGER NOT NULL,
+    user TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    threshold REAL NOT NULL,
+    value REAL NOT NULL,
+    price REAL NOT NULL,
+    note TEXT DEFAULT '',
+    triggered_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alert_events_user ON alert_events (user, id);
+"""
+
+
+class ThresholdBook:
+    """Thresholds in ascending order, with the rule id at the same position"""
+
+    def __init__(self):
+        self.levels = []
+        self.ids = []
+
+    def __len__(self):
+        return len(self.levels)
+
+    def add(self, level: float, rule_id: int):
+        i = bisect_right(self.levels, level)
+        self.levels.insert(i, level)
+        self.ids.insert(i, rule_id)
+
+    def remove(self, level: float, rule_id: int) -> bool:
+        i, end = bisect_left(self.levels, level), bisect_right(self.levels, level)
+        for j in range(i, end):
+            if self.ids[j] == rule_id:
+                del self.levels[j]
+                del self.ids[j]
+                return True
+        return False
+
+    def _pop(self, lo: int, hi: int) -> list:
+        """Remove and return the rules in [lo, hi) as (threshold, id)"""
+        crossed = list(zip(self.levels[lo:hi], self.ids[lo:hi]))
+        del self.levels[lo:hi]
+        del self.ids[lo:hi]
+        return crossed
+
+    def pop_crossed_up(self, prev: float, value: float) -> list:
+        """Rules with prev < threshold <= value"""
+        return self._pop(bisect_right(self.levels, prev), bisect_right(self.levels, value)) if value > prev else []
+
+    def pop_crossed_down(self, prev: float, value: float) -> list:
+        """Rules with value <= threshold < prev"""
+        return self._pop(bisect_left(self.levels, value), bisect_left(self.levels, prev)) if value < prev else []
+
+
+def parse_alert_text(text: str) -> dict:
+    """{"ticker", "kind", "threshold"} from e.g. "NVDA crosses 150",
+    "AAPL above 200", "TSLA below 180", "AAPL down 3% intraday", "MSFT up 2%".
+
+    "crosses" becomes kind "price_crosses"; AlertEngine.add_rule picks the
+    direction from the current price.
+    """
+    match = re.search(r"\b([A-Za-z][A-Za-z.\-]{0,9})\s+(?:goes\s+|is\s+|moves\s+|drops\s+)?(crosses|above|below|over|under|up|down|rises|falls)"
+                      r"\s+(?:to\s+|by\s+)?\$?(-?\d+(?:\.\d+)?)\s*(%)?", text or "", re.IGNORECASE)
+    if not match:
+        raise ValueError("Could not read the alert, try e.g. 'NVDA crosses 150' or 'AAPL down 3%'")
+    ticker, verb, number, percent = match.groups()
+    verb, threshold = verb.lower(), float(number)
+    if percent:
+        if verb in ("down", "falls", "below", "under"):
+            return {"ticker": ticker.upper(), "kind": "change_pct_below", "threshold": -abs(threshold)}
+        return {"ticker": ticker.upper(), "kind": "change_pct_above", "threshold": abs(threshold)}
+    if verb == "crosses":
+        return {"ticker": ticker.upper(), "kind": "price_crosses", "threshold": threshold}
+    kind = "price_below" if verb in ("below", "under", "down", "falls") else "price_above"
+    return {"ticker": ticker.upper(), "kind": kind, "threshold": threshold}
+
+
+class AlertEngine:
+    """Active rules indexed by (ticker, metric, direction), persisted in SQLite"""
+
+    def __init__(self, path: str = None, on_tickers_changed=None):
+        if path is None:
+            os.makedirs(ALERTS_DIR, exist_ok=True)
+            path = os.path.join(ALERTS_DIR, "alerts.db")
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.on_tickers_changed = on_tickers_changed
+        self.books = {}
+        self.rules = {}
+        self.last = {}
+        self.evaluations = 0
+        self._subscribers = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        rows = self.db.execute("SELECT * FROM alert_rules WHERE active = 1 ORDER BY threshold").fetchall()
+        for row in rows:
+            rule = dict(row)
+            self.rules[rule["id"]] = rule
+            book = self.books.setdefault((rule["ticker"], *ALERT_KINDS[rule["kind"]]), ThresholdBook())
+            # Rows come sorted by threshold, so appending keeps each book sorted
+            book.levels.append(rule["threshold"])
+            book.ids.append(rule["id"])
+        if rows:
+            print(f"✅ Alerts loaded: {len(rows)} active rules")
+
+    def tickers(self) -> list:
+        with self._lock:
+            return sorted({key[0] for key, book in self.books.items() if len(book)})
+
+    def _tickers_changed(self):
+        if self.on_tickers_changed:
+            self.on_tickers_changed(self.tickers())
+
+    def add_rule(self, user: str, ticker: str, kind: str, threshold: float, note: str = "",
+                 quote: dict = None) -> dict:
+        """Store and index a rule; ValueError for bad input.
+
+        quote (the ticker's current quote) seeds the last seen values, so the
+        next tick can already trigger. kind "price_crosses" needs it (or a
+        quote seen earlier) and becomes price_above or price_below.
+        """
+        ticker = (ticker or "").strip().upper()
+        if not user or not ticker:
+            raise ValueError("user and ticker are required")
+        threshold = float(threshold)
+        if quote:
+            with self._lock:
+                for field in ("price", "change_pct", "session"):
+                    self.last.setdefault((ticker, field), quote.get(field))
+        if kind == "price_crosses":
+            price = self.last.get((ticker, "price"))
+            if price is None:
+                raise ValueError(f"No current price for {ticker} to tell which way it must cross")
+            kind = "price_above" if threshold > price else "price_below"
+        if kind not in ALERT_KINDS:
+            raise ValueError(f"Unknown alert kind '{kind}' (one of {', '.join(ALERT_KINDS)})")
+        with self._lock:
+            count = self.db.execute(
+                "SELECT COUNT(*) FROM alert_rules WHERE user = ? AND active = 1", (user,)
+            ).fetchone()[0]
+            if count >= MAX_RULES_PER_USER:
+                raise ValueError(f"At most {MAX_RULES_PER_USER} active alerts per user")
+            cursor = self.db.execute(
+                "INSERT INTO alert_rules (user, ticker, kind, threshold, note, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (user, ticker, kind, threshold, note or "", time.time())
+            )
+            self.db.commit()
+            rule = dict(self.db.execute("SELECT * FROM alert_rules WHERE id = ?", (cursor.lastrowid,)).fetchone())
+            self.rules[rule["id"]] = rule
+            self.books.setdefault((ticker, *ALERT_KINDS[kind]), ThresholdBook()).add(threshold, rule["id"])
+        self._tickers_changed()
+        return rule
+
+    def delete_rule(self, user: str, rule_id: int) -> bool:
+        with self._lock:
+            rule = self.rules.get(rule_id)
+            if rule is None or rule["user"] != user:
+                return False
+            self.books[(rule["ticker"], *ALERT_KINDS[rule["kind"]])].remove(rule["threshold"], rule_id)
+            del self.rules[rule_id]
+            self.db.execute("UPDATE alert_rules SET active = 0 WHERE id = ?", (rule_id,))
+            self.db.commit()
+        self._tickers_changed()
+        return True
+
+    def list_rules(self, user: str, include_inactive: bool = False) -> list:
+        query = "SELECT * FROM alert_rules WHERE user = ?" + ("" if include_inactive else " AND active = 1")
+        with self._lock:
+            return [dict(row) for row in self.db.execute(query + " ORDER BY id", (user,))]
+
+    def on_quotes(self, quotes: list):
+        """Evaluate a batch of quotes; returns the events it triggered"""
+        fired = []
+        with self._lock:
+            for quote in quotes:
+                ticker = quote["ticker"]
+                session = self.last.get((ticker, "session"))
+                for metric in ("price", "change_pct"):
+                    value = quote.get(metric)
+                    if value is None:
+                        continue
+                    prev = self.last.get((ticker, metric))
+                    if metric == "change_pct" and session is not None and quote.get("session") != session:
+                        prev = 0.0  # a new session starts flat
+                    self.last[(ticker, metric)] = value
+                    if prev is None:
+                        continue
+                    self.evaluations += 1
+                    up = self.books.get((ticker, metric, "above"))
+                    down = self.books.get((ticker, metric, "below"))
+                    crossed = (up.pop_crossed_up(prev, value) if up else []) + \
+                        (down.pop_crossed_down(prev, value) if down else [])
+                    for threshold, rule_id in crossed:
+                        rule = self.rules.pop(rule_id)
+                        fired.append({
+                            "rule_id": rule_id, "user": rule["user"], "ticker": ticker, "kind": rule["kind"],
+                            "threshold": threshold, "value": value, "price": quote["price"],
+                            "note": rule["note"], "triggered_at": time.time(),
+                        })
+                self.last[(ticker, "session")] = quote.get("session")
+            if fired:
+                self._record(fired)
+        if fired:
+            self._notify(fired)
+            self._tickers_changed()
+        return fired
+
+    def _record(self, events: list):
+        """Deactivate fired rules and store their events in one transaction"""
+        self.db.executemany("UPDATE alert_rules SET active = 0 WHERE id = ?", [(e["rule_id"],) for e in events])
+        for event in events:
+            cursor = self.db.execute(
+                "INSERT INTO alert_events (rule_id, user, ticker, kind, threshold, value, price, note, triggered_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (event["rule_id"], event["user"], event["ticker"], event["kind"], event["threshold"],
+                 event["value"], event["price"], event["note"], event["triggered_at"])
+            )
+            event["id"] = cursor.lastrowid
+        self.db.commit()
+
+    def events(self, user: str, after: int = 0, limit: int = 100) -> list:
+        """Triggered alerts with id > after, oldest first"""
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT * FROM alert_events WHERE user = ? AND id > ? ORDER BY id LIMIT ?", (user, after, limit)
+            )
+            return [dict(row) for row in rows]
+
+    def subscribe(self, user: str, callback) -> int:
+        with self._lock:
+            token = next(self._ids)
+            self._subscribers[token] = (user, callback)
+            return token
+
+    def unsubscribe(self, token: int):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def _notify(self, events: list):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for user, callback in subscribers:
+            mine = [event for event in events if event["user"] == user]
+            if mine:
+                try:
+                    callback(mine)
+                except Exception as e:
+                    print(f"Alert subscriber error: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            sizes = [len(book) for book in self.books.values()]
+            return {
+                "active_rules": len(self.rules),
+                "tickers": len({key[0] for key, book in self.books.items() if len(book)}),
+                "largest_book": max(sizes, default=0),
+                "evaluations": self.evaluations,
+            }
+
+
+class AlertFeed:
+    """One user's triggered alerts as an asyncio queue, filled from the quote poller"""
+
+    def __init__(self, engine: AlertEngine, user: str, maxsize: int = 64):
+        self.engine = engine
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.token = engine.subscribe(user, self._push)
+
+    def _push(self, events: list):
+        self.loop.call_soon_threadsafe(self._offer, events)
+
+    def _offer(self, events: list):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(events)
+
+    async def next(self, timeout: float):
+        """Next batch of events, or None after timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.engine.unsubscribe(self.token)
@@ -0,0 +1,337 @@
+"""Vectorized backtests of simple rule-based strategies
+
+A strategy maps a close-price array to a target position per bar (1 = fully
+invested, 0 = cash). Positions act from the next bar, so a signal computed
+on today's close earns tomorrow's return and there is no look-ahead. Every
+step is whole-array NumPy, so one run over 20 years of daily bars takes
+well under a millisecond. Parameter sweeps fan out over a process pool.
+"""
+import itertools
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from indicators import rolling_mean_std, rsi
+
+TRADING_DAYS = 252
+DEFAULT_PERIOD = "10y"
+MAX_SWEEP_COMBINATIONS = 2000
+# Below this many combinations a sweep runs in-process; pool startup would dominate
+PARALLEL_SWEEP_THRESHOLD = 32
+SWEEP_WORKERS = max(1, min(os.cpu_count() or 1, 8))
+
+# Keys of performance_stats a sweep can be ranked by
+RANK_METRICS = ("sharpe", "cagr", "total_return", "max_drawdown", "annualized_volatility", "exposure", "trades")
+STRATEGY_DEFAULTS = {
+    "buy_and_hold": {},
+    "ma_crossover": {"fast": 50, "slow": 200},
+    "rsi": {"period": 14, "lower": 30, "upper": 70},
+    "rebalance": {"weights": {}, "every": 21},
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _forward_fill(values):
+    """Carry the last non-NaN value forward; leading NaNs become 0"""
+    index = np.where(~np.isnan(values), np.arange(len(values)), 0)
+    np.maximum.accumulate(index, out=index)
+    return np.nan_to_num(values[index])
+
+
+def ma_crossover_positions(close, fast: int, slow: int):
+    """Long while the fast SMA is above the slow SMA"""
+    fast_ma, _ = rolling_mean_std(close, int(fast))
+    slow_ma, _ = rolling_mean_std(close, int(slow))
+    with np.errstate(invalid="ignore"):
+        return (fast_ma > slow_ma).astype(np.float64)
+
+
+def rsi_positions(close, period: int, lower: float, upper: float):
+    """Enter when Wilder RSI drops below `lower`, exit when it rises above `upper`"""
+    values = rsi({"close": close}, (period,))[0]["rsi"]
+    # Entry and exit events, held in between by forward-filling
+    events = np.full(len(close), np.nan)
+    with np.errstate(invalid="ignore"):
+        events[values < lower] = 1.0
+        events[values > upper] = 0.0
+    return _forward_fill(events)
+
+
+def strategy_positions(strategy: str, close, params: dict):
+    if strategy not in ("buy_and_hold", "ma_crossover", "rsi"):
+        raise ValueError(f"Unknown single-asset strategy '{strategy}'")
+    params = {**STRATEGY_DEFAULTS[strategy], **(params or {})}
+    if strategy == "buy_and_hold":
+        return np.ones(len(close))
+    if strategy == "ma_crossover":
+        if int(params["fast"]) >= int(params["slow"]):
+            raise ValueError("fast window must be shorter than slow window")
+        return ma_crossover_positions(close, params["fast"], params["slow"])
+    return rsi_positions(close, int(params["period"]), float(params["lower"]), float(params["upper"]))
+
+
+def run_positions(close, positions, fee_bps: float = 0.0):
+    """Daily strategy returns for target positions (acting from the next bar)"""
+    returns = np.zeros(len(close))
+    returns[1:] = close[1:] / close[:-1] - 1.0
+    held = np.concatenate(([0.0], positions[:-1]))
+    turnover = np.abs(np.diff(held, prepend=0.0))
+    return held * returns - turnover * fee_bps / 10_000, held, turnover
+
+
+def performance_stats(strategy_returns, held=None, turnover=None) -> dict:
+    """Return, risk and trading statistics of a daily return series"""
+    count = len(strategy_returns)
+    equity = np.cumprod(1.0 + strategy_returns)
+    peaks = np.maximum.accumulate(np.concatenate(([1.0], equity)))[1:]
+    std = strategy_returns.std(ddof=1) if count > 1 else 0.0
+    years = max(count - 1, 1) / TRADING_DAYS
+    stats = {
+        "total_return": float(equity[-1] - 1.0) if count else 0.0,
+        "cagr": float(equity[-1] ** (1.0 / years) - 1.0) if count and equity[-1] > 0 else -1.0,
+        "annualized_volatility": float(std * np.sqrt(TRADING_DAYS)),
+        "sharpe": float(strategy_returns.mean() / std * np.sqrt(TRADING_DAYS)) if std > 0 else 0.0,
+        "max_drawdown": float((equity / peaks - 1.0).min()) if count else 0.0,
+    }
+    if held is not None:
+        stats["exposure"] = float(held.mean())
+        stats["trades"] = int(np.count_nonzero(turnover))
+    return stats
+
+
+def backtest(close, strategy: str, params: dict = None, fee_bps: float = 0.0):
+    """(stats, equity curve) of one strategy over a close-price array"""
+    close = np.asarray(close, dtype=np.float64)
+    positions = strategy_positions(strategy, close, params)
+    strategy_returns, held, turnover = run_positions(close, positions, fee_bps)
+    return performance_stats(strategy_returns, held, turnover), np.cumprod(1.0 + strategy_returns)
+
+
+def rebalance_backtest(prices, weights, every: int, fee_bps: float = 0.0):
+    """Portfolio reset to target weights every `every` bars, drifting in between.
+
+    prices is (bars x assets). Within a period each asset grows by
+    prices / prices[period start]; the period's value chains from the last.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = weights / weights.sum()
+    period = np.arange(len(prices)) // every
+    starts = np.arange(0, len(prices), every)
+    growth = (prices / prices[starts][period]) @ weights
+    # Holdings bought at one rebalance are valued at the next one's prices
+    relative = prices[starts[1:]] / prices[starts[:-1]] * weights
+    period_growth = relative.sum(axis=1)
+    # Rebalancing cost: turnover from the drifted weights back to target
+    drifted = relative / period_growth[:, None]
+    costs = np.abs(drifted - weights).sum(axis=1) * fee_bps / 10_000
+    start_values = np.cumprod(np.concatenate(([1.0], period_growth * (1.0 - costs))))
+    equity = start_values[period] * growth
+    strategy_returns = np.concatenate(([0.0], equity[1:] / equity[:-1] - 1.0))
+    stats = performance_stats(strategy_returns)
+    stats["rebalances"] = len(starts) - 1
+    return stats, equity
+
+
+def parameter_grid(sweep: dict):
+    """Every combination of {param: [values]}"""
+    names = list(sweep)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*(sweep[n] for n in names))]
+    if len(combinations) > MAX_SWEEP_COMBINATIONS:
+        raise ValueError(f"Sweep has {len(combinations)} combinations, limit is {MAX_SWEEP_COMBINATIONS}")
+    return combinations
+
+
+def _run_chunk(close, strategy: str, combinations, fee_bps: float):
+    """Worker: stats for a chunk of parameter combinations"""
+    results = []
+    for params in combinations:
+        try:
+            stats, _ = backtest(close, strategy, params, fee_bps)
+            results.append({"params": params, **stats})
+        except ValueError as e:
+            results.append({"params": params, "error": str(e)})
+    return results
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # fork: spawn and forkserver workers re-run `python main.py` (and
+            # with it the API startup) as __mp_main__. Forked workers only
+            # unpickle backtesting._run_chunk and run NumPy on its arguments.
+            _pool = ProcessPoolExecutor(
+                max_workers=SWEEP_WORKERS,
+                mp_context=multiprocessing.get_context("fork")
+            )
+        return _pool
+
+
+def start_pool():
+    """Fork every sweep worker now.
+
+    A fork copies only the calling thread, so a lock held by another thread
+    at that moment stays locked in the child. The API calls this at import,
+    before its poller, refresh and write-behind threads exist; a fork pool
+    starts all of its workers on the first submit and never forks again.
+    """
+    try:
+        _get_pool().submit(int).result()
+    except Exception as e:
+        print(f"Sweep process pool unavailable, sweeps run in-process: {e}")
+
+
+def sweep(close, strategy: str, grid: dict, fee_bps: float = 0.0, rank_by: str = "sharpe"):
+    """Backtest every parameter combination, best first.
+
+    Large sweeps are split into one chunk per worker so each process gets the
+    price array once.
+    """
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f"Unknown rank_by '{rank_by}'. Choose from {', '.join(RANK_METRICS)}")
+    close = np.asarray(close, dtype=np.float64)
+    combinations = parameter_grid(grid)
+    if len(combinations) < PARALLEL_SWEEP_THRESHOLD:
+        results = _run_chunk(close, strategy, combinations, fee_bps)
+    else:
+        chunks = [combinations[i::SWEEP_WORKERS] for i in range(SWEEP_WORKERS)]
+        try:
+            pool = _get_pool()
+            futures = [pool.submit(_run_chunk, close, strategy, chunk, fee_bps) for chunk in chunks if chunk]
+            results = [row for future in futures for row in future.result()]
+        except Exception as e:
+            print(f"Sweep process pool error, running in-process: {e}")
+            results = _run_chunk(close, strategy, combinations, fee_bps)
+    valid = [r for r in results if "error" not in r]
+    # Higher is better for every stat, drawdown included (it is negative)
+    valid.sort(key=lambda r: r.get(rank_by, 0), reverse=True)
+    return valid + [r for r in results if "error" in r]
+
+
+def parse_backtest_question(question: str):
+    """Strategy and params for questions like "how would a 50/200-day crossover
+    have done on MSFT", or None"""
+    q_lower = question.lower()
+    years = re.search(r"(?:last|past|over)\s+(\d{1,2})\s*(?:years|yrs|y)\b", q_lower)
+    period = f"{years.group(1)}y" if years else DEFAULT_PERIOD
+    if not re.search(r"backtest|crossover|cross-over|would .* have (done|performed|returned)|buy and hold|buy-and-hold"
+                     r"|golden cross|death cross|rsi strategy", q_lower):
+        return None
+    if "crossover" in q_lower or "cross-over" in q_lower or "golden cross" in q_lower or "death cross" in q_lower:
+        match = re.search(r"(\d+)(?:-day)?\s*(?:/|and|vs|-)\s*(\d+)", q_lower)
+        fast, slow = (sorted((int(match.group(1)), int(match.group(2)))) if match else (50, 200))
+        return {"strategy": "ma_crossover", "params": {"fast": fast, "slow": slow}, "period": period}
+    if "rsi" in q_lower:
+        thresholds = q_lower.replace(years.group(0), "") if years else q_lower
+        numbers = [int(n) for n in re.findall(r"\b(\d{1,2})\b", thresholds)]
+        bounds = sorted(n for n in numbers if 0 < n < 100)
+        params = {"lower": bounds[0], "upper": bounds[-1]} if len(bounds) >= 2 else {}
+        return {"strategy": "rsi", "params": params, "period": period}
+    return {"strategy": "buy_and_hold", "params": {}, "period": period}
+
+
+def summarize(result: dict) -> str:
+    """Compact prompt text comparing a strategy to its benchmark"""
+    params = result["params"]
+    if result["strategy"] == "rebalance":
+        mix = ", ".join(f"{t} {w * 100:.0f}%" for t, w in params["weights"].items())
+        label = f"rebalancing to {mix} every {params['every']} trading days"
+        benchmark_name = "Same mix, never rebalanced"
+    else:
+        label = result["strategy"].replace("_", " ")
+        if params:
+            label += " (" + ", ".join(f"{k}={v}" for k, v in params.items()) + ")"
+        label += f" on {result['ticker']}"
+        benchmark_name = "Buy & hold"
+    lines = [f"Backtest of {label}, {result['start']} to {result['end']}:"]
+    for name, s in (("Strategy", result["stats"]), (benchmark_name, result["benchmark"])):
+        line = (f"- {name}: total return {s['total_return'] * 100:+.1f}%, CAGR {s['cagr'] * 100:+.1f}%, "
+                f"volatility {s['annualized_volatility'] * 100:.1f}%, Sharpe {s['sharpe']:.2f}, "
+                f"max drawdown {s['max_drawdown'] * 100:.1f}%")
+        if "trades" in s and name == "Strategy":
+            line += f", {s['trades']} trades, {s['exposure'] * 100:.0f}% time invested"
+        lines.append(line)
+    if "sweep" in result:
+        lines.append(f"- Best of {result['sweep']['combinations']} parameter combinations "
+                     f"by {result['sweep']['rank_by']}")
+    return "\n".join(lines)
+
+
+def _curve(equity):
+    """JSON-safe equity curve (growth of 1.0)"""
+    return np.round(equity, 6).tolist()
+
+
+def backtest_report(ticker: str, strategy: str, params: dict = None, period: str = DEFAULT_PERIOD,
+                    fee_bps: float = 0.0, grid: dict = None, rank_by: str = "sharpe", loader=None) -> dict:
+    """Run (or sweep) a strategy on cached daily closes and compare it to buy-and-hold.
+
+    loader(tickers, period) must return {ticker: close Series}. For
+    "rebalance", params["weights"] maps tickers to target weights and the
+    benchmark is the same initial mix never rebalanced.
+    """
+    if strategy not in STRATEGY_DEFAULTS:
+        raise ValueError(f"Unknown strategy '{strategy}'. Choose from {', '.join(STRATEGY_DEFAULTS)}")
+    params = {**STRATEGY_DEFAULTS[strategy], **(params or {})}
+
+    if strategy == "rebalance":
+        if not params["weights"]:
+            raise ValueError("rebalance needs params.weights, e.g. {\"SPY\": 0.6, \"TLT\": 0.4}")
+        weights = {str(t).upper(): float(w) for t, w in params["weights"].items()}
+        closes = loader(list(weights), period)
+        missing = [t for t in weights if t not in closes]
+        if missing:
+            raise ValueError(f"No price data for {', '.join(missing)}")
+        frame = pd.concat([closes[t] for t in weights], axis=1, join="inner", keys=list(weights))
+        if len(frame) < 2:
+            raise ValueError("Not enough overlapping price history")
+        prices = frame.to_numpy(dtype=np.float64)
+        every = max(int(params["every"]), 1)
+        stats, equity = rebalance_backtest(prices, list(weights.values()), every, fee_bps)
+        benchmark, benchmark_equity = rebalance_backtest(prices, list(weights.values()), len(prices), fee_bps)
+        dates = frame.index
+        params = {"weights": weights, "every": every}
+        sweep_results = None
+    else:
+        closes = loader([ticker], period)
+        if ticker not in closes or len(closes[ticker]) < 2:
+            raise ValueError(f"No price history for {ticker}")
+        series = closes[ticker]
+        close, dates = series.to_numpy(dtype=np.float64), series.index
+        sweep_results = None
+        if grid:
+            sweep_results = sweep(close, strategy, grid, fee_bps, rank_by)
+            if not sweep_results or "error" in sweep_results[0]:
+                raise ValueError("No valid parameter combination in the sweep")
+            params = {**params, **sweep_results[0]["params"]}
+        stats, equity = backtest(close, strategy, params, fee_bps)
+        benchmark, benchmark_equity = backtest(close, "buy_and_hold")
+
+    result = {
+        "ticker": ticker,
+        "strategy": strategy,
+        "params": params,
+        "period": period,
+        "fee_bps": fee_bps,
+        "start": dates[0].strftime("%Y-%m-%d"),
+        "end": dates[-1].strftime("%Y-%m-%d"),
+        "observations": len(dates),
+        "stats": stats,
+        "benchmark": benchmark,
+        "equity": {
+            "dates": dates.strftime("%Y-%m-%d").tolist(),
+            "strategy": _curve(equity),
+            "benchmark": _curve(benchmark_equity),
+        },
+    }
+    if sweep_results is not None:
+        result["sweep"] = {"combinations": len(sweep_results), "rank_by": rank_by, "results": sweep_results[:20]}
+    return result
@@ -0,0 +1,93 @@
+"""Alert benchmark: per-tick evaluation cost against the number of rules
+
+Loads N random price / percent-change rules (in an in-memory database)
+spread over T tickers, replays a random walk of quotes and reports the
+average cost per quote for:
+  - the indexed engine (bisect over each ticker's sorted thresholds)
+  - a naive scan testing every rule of the ticker on every quote
+
+Usage:
+    python benchmark_alerts.py
+    python benchmark_alerts.py --rules 100000 --tickers 1 --ticks 2000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from alerts import ALERT_KINDS, AlertEngine
+
+
+def load_rules(engine, rules: int, tickers: list, rng):
+    """Random rules around a price of 100 and a change of 0%"""
+    kinds = list(ALERT_KINDS)
+    for i in range(rules):
+        ticker = tickers[i % len(tickers)]
+        kind = kinds[rng.integers(len(kinds))]
+        threshold = float(rng.normal(100, 10)) if kind.startswith("price") else float(rng.normal(0, 3))
+        engine.add_rule(f"user{i % 5000}", ticker, kind, round(threshold, 2))
+
+
+def quote_walk(tickers: list, ticks: int, rng):
+    prices = {ticker: 100.0 for ticker in tickers}
+    for i in range(ticks):
+        ticker = tickers[i % len(tickers)]
+        prices[ticker] *= float(np.exp(rng.normal(0, 0.002)))
+        yield {"ticker": ticker, "price": prices[ticker], "change_pct": (prices[ticker] / 100 - 1) * 100,
+               "session": "2024-05-01"}
+
+
+def naive_scan(rules: list, last: dict, quote: dict) -> int:
+    """Every rule of the ticker checked against the previous and new value"""
+    fired = 0
+    for ticker, metric, direction, threshold in rules:
+        if ticker != quote["ticker"]:
+            continue
+        prev, value = last.get((ticker, metric)), quote[metric]
+        if prev is None:
+            continue
+        if (direction == "above" and prev < threshold <= value) or (direction == "below" and value <= threshold < prev):
+            fired += 1
+    for metric in ("price", "change_pct"):
+        last[(quote["ticker"], metric)] = quote[metric]
+    return fired
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=100_000)
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--ticks", type=int, default=5000)
+    parser.add_argument("--naive-ticks", type=int, default=200, help="ticks for the (slow) naive scan")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    tickers = [f"T{i:03d}" for i in range(args.tickers)]
+    engine = AlertEngine(":memory:")
+    start = time.perf_counter()
+    load_rules(engine, args.rules, tickers, rng)
+    print(f"Loaded {args.rules:,} rules on {args.tickers} tickers in {time.perf_counter() - start:.1f}s "
+          f"(largest book {engine.stats()['largest_book']:,})")
+
+    # Plain copy of the rules for the naive scan, taken before any fire
+    flat = [(rule["ticker"], *ALERT_KINDS[rule["kind"]], rule["threshold"]) for rule in engine.rules.values()]
+
+    quotes = list(quote_walk(tickers, args.ticks, np.random.default_rng(3)))
+    start = time.perf_counter()
+    fired = sum(len(engine.on_quotes([quote])) for quote in quotes)
+    indexed_us = (time.perf_counter() - start) / len(quotes) * 1e6
+
+    last = {}
+    naive_quotes = quotes[:args.naive_ticks]
+    start = time.perf_counter()
+    for quote in naive_quotes:
+        naive_scan(flat, last, quote)
+    naive_us = (time.perf_counter() - start) / len(naive_quotes) * 1e6
+
+    print(f"indexed: {indexed_us:10.1f} us/quote ({fired:,} alerts fired over {len(quotes):,} quotes, "
+          f"including their SQLite writes)")
+    print(f"naive:   {naive_us:10.1f} us/quote")
+
+
+if __name__ == "__main__":
+    main()
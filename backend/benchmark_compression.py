@@ -0,0 +1,115 @@
+"""Compression benchmark: bytes and CPU per request, per encoding
+
+Builds payloads shaped like the API's largest responses and reports, for
+each available encoding (gzip always; brotli / zstd when installed):
+  - raw and compressed size
+  - CPU ms per request when the body is compressed (first request)
+  - CPU ms per request when the compressed body comes from the cache
+
+Usage:
+    python benchmark_compression.py
+    python benchmark_compression.py --tickers 10 --bars 2500 --repeat 50
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import orjson
+
+from chart_encoding import compact_chart_data
+from compression import CompressedBodyCache, available_encodings, compress
+
+
+def comparison_payload(tickers: int, bars: int, seed: int = 5) -> dict:
+    """/query response of a multi-ticker comparison chart"""
+    rng = np.random.default_rng(seed)
+    dates = np.datetime_as_string(
+        np.busday_offset("2015-01-02", np.arange(bars), roll="forward"), unit="D"
+    ).tolist()
+    data = {}
+    for i in range(tickers):
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, bars)))
+        data[f"TICK{i}"] = {
+            "dates": dates,
+            "close": close.tolist(),
+            "volume": rng.integers(1_000_000, 90_000_000, bars).tolist(),
+            "price": float(close[-1]),
+            "pe_ratio": 25.0,
+            "market_cap_b": 1200.0,
+            "dividend_yield": 0.5,
+        }
+    return {"answer": "Comparing " + ", ".join(data), "data": data, "chart_type": "comparison",
+            "suggestions": [], "tickers": list(data)}
+
+
+def news_payload(articles: int = 10, seed: int = 7) -> dict:
+    """/market-news response"""
+    rng = np.random.default_rng(seed)
+    words = ["market", "stocks", "earnings", "Fed", "rates", "inflation", "tech", "rally", "guidance", "shares"]
+    news = []
+    for i in range(articles):
+        news.append({
+            "title": " ".join(rng.choice(words, 12)).capitalize(),
+            "summary": " ".join(rng.choice(words, 120)).capitalize() + ".",
+            "url": f"https://news.example.com/markets/{i}",
+            "published": "2024-05-01 14:30",
+            "source": "Example Wire",
+        })
+    return {"news": news}
+
+
+def cpu_ms(fn, repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat * 1000
+
+
+def benchmark(name: str, body: bytes, repeat: int) -> list:
+    rows = []
+    for encoding in available_encodings():
+        compressed = compress(body, encoding)
+        cold = cpu_ms(lambda: CompressedBodyCache(64 << 20).get_or_compress(body, encoding), repeat)
+        cache = CompressedBodyCache(64 << 20)
+        cache.get_or_compress(body, encoding)
+        warm = cpu_ms(lambda: cache.get_or_compress(body, encoding), repeat)
+        rows.append({"payload": name, "encoding": encoding, "raw_bytes": len(body),
+                     "compressed_bytes": len(compressed), "ratio": len(body) / len(compressed),
+                     "compress_ms": cold, "cached_ms": warm})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=5)
+    parser.add_argument("--bars", type=int, default=1260, help="daily bars per ticker (1260 = 5 years)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    comparison = comparison_payload(args.tickers, args.bars)
+    compact = {**comparison, "data": compact_chart_data(comparison["data"])}
+    payloads = {
+        f"comparison {args.tickers}x{args.bars}": orjson.dumps(comparison),
+        "comparison compact": orjson.dumps(compact),
+        "market news": orjson.dumps(news_payload()),
+    }
+
+    rows = []
+    for name, body in payloads.items():
+        rows.extend(benchmark(name, body, args.repeat))
+
+    print(f"\n{'payload':<24} {'enc':>5} {'raw KB':>8} {'sent KB':>8} {'ratio':>6} {'compress ms':>12} {'cached ms':>10}")
+    for row in rows:
+        print(f"{row['payload']:<24} {row['encoding']:>5} {row['raw_bytes'] / 1024:>8.1f} "
+              f"{row['compressed_bytes'] / 1024:>8.1f} {row['ratio']:>6.1f} {row['compress_ms']:>12.2f} "
+              f"{row['cached_ms']:>10.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Recall@k and memory comparison of quantized vs full-precision embeddings
+
+Usage:
+    python benchmark_quantization.py [--docs 20000] [--queries 200] [--k 10]
+    python benchmark_quantization.py --corpus headlines.txt   # embed real text
+
+Without --corpus, a synthetic clustered set of unit vectors stands in for
+all-MiniLM-L6-v2 embeddings (topic clusters plus per-document noise).
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from embeddings import EMBEDDING_DIM, QUANTIZATION_MODES, QUANTIZED_DTYPES, load_embedding_model, vector_payload
+from local_vector_db import LocalIndex
+
+
+def synthetic_embeddings(count: int, clusters: int = 200, noise: float = 0.6, seed: int = 7):
+    """Unit vectors drawn around random topic centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, EMBEDDING_DIM)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    vectors = centroids[labels] + noise * rng.standard_normal((count, EMBEDDING_DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def corpus_embeddings(path: str):
+    """Embed one document per line with the production model"""
+    model = load_embedding_model()
+    if model is None:
+        raise SystemExit("Embedding model unavailable")
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    return np.asarray(model.encode(lines, batch_size=256), dtype=np.float32)
+
+
+def build_index(vectors, mode: str):
+    """Load vectors into a LocalIndex with the given quantization"""
+    index = LocalIndex(f"bench_{mode}", tempfile.gettempdir(), quantization=mode)
+    for row, vector in enumerate(vectors):
+        index.upsert(str(row), {}, vector)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--corpus", help="text file with one document per line")
+    args = parser.parse_args()
+
+    vectors = corpus_embeddings(args.corpus) if args.corpus else synthetic_embeddings(args.docs + args.queries)
+    queries, vectors = vectors[:args.queries], vectors[args.queries:]
+    print(f"{len(vectors)} documents, {len(queries)} queries, k={args.k}\n")
+
+    exact = None
+    print(f"{'mode':<6} {'recall@k':>9} {'bytes/vec':>10} {'json/vec':>9} {'search ms':>10}")
+    for mode in QUANTIZATION_MODES:
+        index = build_index(vectors, mode)
+        start = time.perf_counter()
+        results = [[row for row, _ in index.knn(q, args.k)] for q in queries]
+        search_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        if exact is None:
+            exact = results
+        recall = np.mean([len(set(got) & set(want)) / len(want) for got, want in zip(results, exact)])
+        json_bytes = np.mean([len(json.dumps(vector_payload(v, mode))) for v in vectors[:200]])
+        bytes_per_vector = EMBEDDING_DIM * np.dtype(QUANTIZED_DTYPES[mode]).itemsize
+        print(f"{mode:<6} {recall:>9.4f} {bytes_per_vector:>10} {json_bytes:>9.0f} {search_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Retrieval benchmark: recall@k, MRR, latency and build time per corpus size
+
+Runs labeled queries against the embedded local index and/or an OpenSearch
+cluster (e.g. a local container started as in the README) and reports:
+  - build time (bulk indexing + refresh)
+  - recall@k of kNN search against exact brute-force neighbours
+  - MRR of the labeled relevant document, for kNN and hybrid search
+  - p50 / p99 query latency
+
+Usage:
+    python benchmark_retrieval.py --backend local --sizes 10000,100000
+    python benchmark_retrieval.py --backend opensearch --sizes 10000 --ef-search 50,100,200
+    python benchmark_retrieval.py --sizes 1000000 --backend local        # ~2 GB RAM
+    python benchmark_retrieval.py --corpus news.jsonl --labels queries.jsonl
+
+A recorded corpus is JSONL with {"id", "title", "summary"} per line; labels
+are JSONL with {"query", "relevant": [ids]}. Both are embedded with the
+production model. Without them a synthetic clustered corpus is generated.
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from embeddings import EMBEDDING_DIM, load_embedding_model
+
+
+def synthetic_corpus(size: int, queries: int, clusters: int = 500, seed: int = 11):
+    """Clustered unit vectors with topic words, plus noisy labeled queries"""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"term{i}" for i in range(clusters * 4)])
+    centroids = rng.standard_normal((clusters, EMBEDDING_DIM)).astype(np.float32)
+    labels = rng.integers(0, clusters, size)
+
+    vectors = np.empty((size, EMBEDDING_DIM), dtype=np.float32)
+    for start in range(0, size, 100_000):
+        end = min(start + 100_000, size)
+        block = centroids[labels[start:end]] + 0.6 * rng.standard_normal((end - start, EMBEDDING_DIM))
+        vectors[start:end] = block / np.linalg.norm(block, axis=1, keepdims=True)
+
+    documents = []
+    for i in range(size):
+        # Topic words shared by the cluster plus a couple of random terms
+        topic = vocabulary[labels[i] * 4:labels[i] * 4 + 4]
+        words = list(rng.choice(topic, 3)) + list(rng.choice(vocabulary, 2))
+        documents.append((f"doc{i}", {"bench_id": f"doc{i}", "title": " ".join(words), "summary": ""}))
+
+    targets = rng.choice(size, queries, replace=False)
+    query_vectors = vectors[targets] + 0.3 * rng.standard_normal((queries, EMBEDDING_DIM)).astype(np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    query_texts = [" ".join(documents[t][1]["title"].split()[:3]) for t in targets]
+    relevant = [{f"doc{t}"} for t in targets]
+    return vectors, documents, query_vectors, query_texts, relevant
+
+
+def recorded_corpus(corpus_path: str, labels_path: str):
+    """Embed a recorded news corpus and its labeled queries"""
+    model = load_embedding_model()
+    if model is None:
+        raise SystemExit("Embedding model unavailable")
+    with open(corpus_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    with open(labels_path, encoding="utf-8") as f:
+        labeled = [json.loads(line) for line in f if line.strip()]
+
+    texts = [r.get("summary") or r.get("title", "") for r in records]
+    vectors = np.asarray(model.encode(texts, batch_size=256), dtype=np.float32)
+    documents = [(str(r["id"]), {"bench_id": str(r["id"]), "title": r.get("title", ""),
+                                 "summary": r.get("summary", "")}) for r in records]
+    query_texts = [q["query"] for q in labeled]
+    query_vectors = np.asarray(model.encode(query_texts), dtype=np.float32)
+    relevant = [set(map(str, q["relevant"])) for q in labeled]
+    return vectors, documents, query_vectors, query_texts, relevant
+
+
+def exact_neighbours(vectors, ids, query_vectors, k: int):
+    """Ground-truth top-k IDs by L2 distance, computed in blocks"""
+    sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+    truth = []
+    for q in query_vectors:
+        distances = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), 200_000):
+            end = min(start + 200_000, len(vectors))
+            distances[start:end] = sq_norms[start:end] - 2.0 * (vectors[start:end] @ q)
+        top = np.argpartition(distances, k)[:k]
+        truth.append({ids[i] for i in top})
+    return truth
+
+
+def percentile(values, pct: float):
+    return float(np.percentile(values, pct)) if values else float("nan")
+
+
+def run_queries(search, query_vectors, query_texts, relevant, truth, k: int):
+    """Run every labeled query through one search callable and score it"""
+    latencies, recalls, reciprocal_ranks = [], [], []
+    for vector, text, wanted, exact in zip(query_vectors, query_texts, relevant, truth):
+        start = time.perf_counter()
+        results = search(text, vector, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids = [doc.get("bench_id") for doc in results]
+        recalls.append(len(exact.intersection(ids)) / k)
+        rank = next((i for i, doc_id in enumerate(ids, 1) if doc_id in wanted), None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+    return {
+        "recall": float(np.mean(recalls)),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def open_backend(name: str, data_dir: str):
+    """Vector DB instance for the benchmark, without loading the text model"""
+    if name == "local":
+        from local_vector_db import LocalVectorDB
+        return LocalVectorDB(model=False, data_dir=data_dir)
+    from opensearch_client import OpenSearchVectorDB
+    db = OpenSearchVectorDB()
+    if not db.client:
+        raise SystemExit("OpenSearch is not reachable (set OPENSEARCH_HOST/PORT)")
+    return db
+
+
+def benchmark(backend: str, corpus, k: int, ef_values, hnsw: dict):
+    """Build one index from the corpus and score kNN and hybrid search"""
+    vectors, documents, query_vectors, query_texts, relevant = corpus
+    size = len(documents)
+    data_dir = tempfile.mkdtemp(prefix="bench_vectors_")
+    db = open_backend(backend, data_dir)
+    index_name = f"bench_{size}"
+    db.delete_index(index_name)
+    if backend == "opensearch":
+        db.create_index(index_name, hnsw=hnsw)
+    else:
+        db.create_index(index_name)
+
+    start = time.perf_counter()
+    batch = [(doc_id, {**doc, "embedding": vectors[i]}) for i, (doc_id, doc) in enumerate(documents)]
+    db.bulk_index(index_name, batch, chunk_size=1000)
+    db.refresh(index_name)
+    build_s = time.perf_counter() - start
+
+    truth = exact_neighbours(vectors, [doc_id for doc_id, _ in documents], query_vectors, k)
+
+    rows = []
+    for ef in ef_values if backend == "opensearch" else [None]:
+        if ef and not db.set_ef_search(index_name, ef):
+            # lucene (int8) ignores ef_search: one run, reported as n/a
+            print(f"ef_search sweep skipped: not applied with {db.quantization} quantization")
+            ef = "n/a"
+        knn = run_queries(lambda text, vector, n: db.search_similar(index_name, text, k=n, query_vector=vector),
+                          query_vectors, query_texts, relevant, truth, k)
+        hybrid = run_queries(lambda text, vector, n: db.hybrid_search(index_name, text, k=n, query_vector=vector),
+                             query_vectors, query_texts, relevant, truth, k)
+        rows.append({"backend": backend, "size": size, "ef_search": ef, "build_s": build_s,
+                     "knn": knn, "hybrid": hybrid})
+        if ef == "n/a":
+            break
+
+    db.delete_index(index_name)
+    shutil.rmtree(data_dir, ignore_errors=True)
+    return rows
+
+
+def print_rows(rows, k: int):
+    print(f"\n{'backend':<10} {'size':>8} {'ef':>5} {'build s':>8} | {'recall@' + str(k):>9} "
+          f"{'knn MRR':>8} {'p50 ms':>7} {'p99 ms':>7} | {'hyb MRR':>8} {'p50 ms':>7} {'p99 ms':>7}")
+    for row in rows:
+        knn, hybrid = row["knn"], row["hybrid"]
+        print(f"{row['backend']:<10} {row['size']:>8} {row['ef_search'] or '-':>5} {row['build_s']:>8.1f} | "
+              f"{knn['recall']:>9.4f} {knn['mrr']:>8.4f} {knn['p50_ms']:>7.2f} {knn['p99_ms']:>7.2f} | "
+              f"{hybrid['mrr']:>8.4f} {hybrid['p50_ms']:>7.2f} {hybrid['p99_ms']:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="local", help="local, opensearch or both")
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated corpus sizes")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", default="100", help="comma-separated ef_search values (OpenSearch)")
+    parser.add_argument("--m", type=int, default=16, help="HNSW m (OpenSearch)")
+    parser.add_argument("--ef-construction", type=int, default=128, help="HNSW ef_construction (OpenSearch)")
+    parser.add_argument("--corpus", help="recorded corpus JSONL")
+    parser.add_argument("--labels", help="labeled queries JSONL for --corpus")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    backends = ["local", "opensearch"] if args.backend == "both" else [args.backend]
+    ef_values = [int(v) for v in args.ef_search.split(",")]
+    hnsw = {"m": args.m, "ef_construction": args.ef_construction, "ef_search": ef_values[0]}
+
+    if args.corpus:
+        corpora = [recorded_corpus(args.corpus, args.labels)]
+    else:
+        corpora = (synthetic_corpus(int(size), args.queries) for size in args.sizes.split(","))
+
+    rows = []
+    for corpus in corpora:
+        for backend in backends:
+            print(f"Benchmarking {backend} with {len(corpus[1])} documents...")
+            rows.extend(benchmark(backend, corpus, args.k, ef_values, hnsw))
+    print_rows(rows, args.k)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Compact chart payloads and response content negotiation
+
+The compact ("columnar-v1") layout replaces every "dates" list of strings
+with a reference to a shared axis: a start value plus the deltas between
+bars, in days (daily bars) or minutes (intraday bars). Comparison charts
+whose tickers trade on the same calendar therefore send one axis instead of
+one date list per ticker. Numbers are rounded to 4 decimals and integral
+series are sent as integers.
+
+Responses are JSON via orjson by default; clients that send
+Accept: application/msgpack or application/vnd.apache.arrow.stream get
+those encodings when msgpack / pyarrow are installed.
+"""
+import json
+
+import numpy as np
+from fastapi.responses import ORJSONResponse, Response
+
+COMPACT_FORMAT = "columnar-v1"
+MSGPACK_TYPE = "application/msgpack"
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+DECIMALS = 4
+
+
+def _encode_axis(dates: list) -> dict:
+    """{"unit", "start", "deltas"} for "YYYY-MM-DD" or "YYYY-MM-DD HH:MM" labels"""
+    unit = "minute" if len(dates[0]) > 10 else "day"
+    values = np.array(dates, dtype="datetime64[m]" if unit == "minute" else "datetime64[D]").astype(np.int64)
+    return {"unit": unit, "start": int(values[0]), "deltas": np.diff(values).tolist()}
+
+
+def _compact_values(values: list):
+    """Round a numeric list; integral series become ints. Other lists pass through"""
+    if not values or not all(v is None or isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return values
+    array = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    finite = np.isfinite(array)
+    if finite.all() and np.array_equal(array, np.round(array)) and np.abs(array).max() < 2 ** 53:
+        return array.astype(np.int64).tolist()
+    rounded = np.round(array, DECIMALS)
+    return [float(v) if ok else None for v, ok in zip(rounded, finite)]
+
+
+def compact_chart_data(data: dict) -> dict:
+    """Chart data in the columnar-v1 layout (see module docstring)"""
+    axes, axis_ids = [], {}
+
+    def encode(node):
+        if isinstance(node, dict):
+            out = {}
+            for key, value in node.items():
+                if key == "dates" and isinstance(value, list) and value and isinstance(value[0], str):
+                    signature = tuple(value)
+                    if signature not in axis_ids:
+                        axis_ids[signature] = len(axes)
+                        axes.append(_encode_axis(value))
+                    out["axis"] = axis_ids[signature]
+                else:
+                    out[key] = encode(value)
+            return out
+        if isinstance(node, list):
+            return _compact_values(node)
+        return node
+
+    return {"format": COMPACT_FORMAT, "axes": axes, "series": encode(data or {})}
+
+
+def _arrow_table(payload: dict):
+    """Long-format Arrow table of the chart points: one row per (series, bar).
+
+    Columns are series, date and one column per field (nested overlays are
+    "overlays.<label>"); everything else in the payload travels as JSON in
+    the schema metadata under "payload".
+    """
+    import pyarrow as pa
+
+    data = payload.get("data") or {}
+    compact = data if data.get("format") == COMPACT_FORMAT else compact_chart_data(data)
+    series = compact["series"]
+    groups = {"": series} if "axis" in series else {k: v for k, v in series.items() if isinstance(v, dict) and "axis" in v}
+
+    rows, columns = [], {}
+    for name, group in groups.items():
+        axis = compact["axes"][group["axis"]]
+        values = axis["start"] + np.concatenate(([0], np.cumsum(axis["deltas"], dtype=np.int64)))
+        length = len(values)
+        fields = {}
+        for key, value in group.items():
+            if isinstance(value, list) and len(value) == length:
+                fields[key] = value
+            elif isinstance(value, dict):
+                fields.update({f"{key}.{label}": v for label, v in value.items()
+                               if isinstance(v, list) and len(v) == length})
+        rows.append((name, axis["unit"], values, fields))
+        for key in fields:
+            columns.setdefault(key, None)
+
+    names, dates = [], []
+    column_values = {key: [] for key in columns}
+    for name, unit, values, fields in rows:
+        names.extend([name] * len(values))
+        # Minutes become seconds so intraday bars fit a timestamp column
+        dates.append(values * 60 if unit == "minute" else values * 86400)
+        for key in columns:
+            column_values[key].extend(fields.get(key, [None] * len(values)))
+
+    arrays = {
+        "series": pa.array(names, type=pa.string()).dictionary_encode(),
+        "date": pa.array(np.concatenate(dates) if dates else np.zeros(0, dtype=np.int64), type=pa.timestamp("s")),
+    }
+    for key, values in column_values.items():
+        arrays[key] = pa.array(values, type=pa.float64())
+    table = pa.table(arrays)
+    meta = {k: v for k, v in payload.items() if k != "data"}
+    return table.replace_schema_metadata({"payload": json.dumps(meta)})
+
+
+def encode_response(payload: dict, accept: str = "") -> Response:
+    """Serialize a response body in the best format the client accepts"""
+    accept = (accept or "").lower()
+    if MSGPACK_TYPE in accept:
+        try:
+            import msgpack
+            return Response(msgpack.packb(payload, use_bin_type=True), media_type=MSGPACK_TYPE)
+        except ImportError:
+            pass
+    if ARROW_TYPE in accept:
+        try:
+            import pyarrow as pa
+            table = _arrow_table(payload)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return Response(sink.getvalue().to_pybytes(), media_type=ARROW_TYPE)
+        except ImportError:
+            pass
+    return ORJSONResponse(payload)
@@ -0,0 +1,171 @@
+"""Response compression middleware with a compressed-body cache
+
+Bodies above COMPRESSION_MIN_SIZE are compressed with the best encoding the
+client accepts: brotli (needs `brotli`), zstd (needs `zstandard`) or gzip.
+Snapshot endpoints (news, market overview, repeated charts) send the same
+bytes to every client, so compressed bodies are cached by a hash of the
+uncompressed body and encoding: a repeat costs one hash instead of a
+compression pass. Streaming responses (server-sent events) and bodies that
+are already encoded pass through untouched.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import anyio
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_CACHE_MB = int(os.getenv("COMPRESSION_CACHE_MB", "32"))
+# Larger bodies are compressed in a worker thread so the event loop keeps serving
+THREAD_MIN_SIZE = 256 * 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+SKIP_CONTENT_TYPES = ("text/event-stream", "image/", "application/zip", "application/gzip")
+
+
+def available_encodings() -> list:
+    """Supported encodings, most preferred first"""
+    return [name for name, ok in (("br", brotli), ("zstd", zstandard), ("gzip", True)) if ok]
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def choose_encoding(accept_encoding: str):
+    """Best supported encoding the Accept-Encoding header allows, or None"""
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name] = quality
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (encoding, body hash), bounded by bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compress(self, body: bytes, encoding: str) -> bytes:
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        compressed = compress(body, encoding)
+        if len(compressed) <= self.max_bytes // 8:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = compressed
+                    self.size += len(compressed)
+                while self.size > self.max_bytes and self._entries:
+                    _, dropped = self._entries.popitem(last=False)
+                    self.size -= len(dropped)
+        return compressed
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing buffered response bodies"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, cache_mb: int = COMPRESSION_CACHE_MB):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = CompressedBodyCache(cache_mb * 1024 * 1024)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in message.get("headers", [])}
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or any(content_type.startswith(skip) for skip in SKIP_CONTENT_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough:
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._send_body(start, b"".join(chunks), encoding, send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_body(self, start, body: bytes, encoding: str, send):
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+        if len(body) >= self.minimum_size:
+            if len(body) >= THREAD_MIN_SIZE:
+                body = await anyio.to_thread.run_sync(self.cache.get_or_compress, body, encoding)
+            else:
+                body = self.cache.get_or_compress(body, encoding)
+            rewritten = []
+            for key, value in headers:
+                # The encoded bytes are a different representation: weaken the ETag
+                if key.lower() == b"etag" and not value.startswith(b"W/"):
+                    value = b"W/" + value
+                rewritten.append((key, value))
+            headers = rewritten + [(b"content-encoding", encoding.encode("latin-1"))]
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        vary = [v for k, v in headers if k.lower() == b"vary"]
+        if not any(b"accept-encoding" in v.lower() for v in vary):
+            headers = [(k, v) for k, v in headers if k.lower() != b"vary"]
+            headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": body, "more_body": False})
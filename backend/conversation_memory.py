@@ -0,0 +1,137 @@
+"""Server-side conversation sessions backed by the chat_history index
+
+Each /query turn is embedded and stored in chat_history under its session ID
+after the response has been sent. Follow-up questions pull only the top-k
+most relevant earlier turns of the same session (plus the immediately
+preceding turn) into the prompt, so prompt size stays bounded no matter how
+long a conversation runs.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+CHAT_INDEX = "chat_history"
+
+# Earlier turns retrieved into each prompt
+MEMORY_TURNS = int(os.getenv("CONVERSATION_MEMORY_TURNS", "3"))
+# Only turns from this many recent days are searched (prunes chat partitions)
+SESSION_MEMORY_DAYS = int(os.getenv("SESSION_MEMORY_DAYS", "7"))
+# Session state kept in process; least recently used sessions are evicted
+MAX_SESSIONS = 5000
+
+STORED_ANSWER_CHARS = 1000
+PROMPT_ANSWER_CHARS = 300
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+class ConversationMemory:
+    """Per-session state plus retrieval of relevant earlier turns"""
+
+    def __init__(self, vector_db=None):
+        self.vector_db = vector_db
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def session(self, session_id: str = None):
+        """Return (session_id, state), creating the session if needed.
+
+        State holds the ticker the conversation is about, the last sidebar
+        ticker the client sent and the previous turn. Unknown IDs (e.g. after
+        a restart) start with empty state but still find their stored turns.
+        """
+        restored = bool(session_id)
+        session_id = session_id or new_session_id()
+        with self.lock:
+            state = self.sessions.pop(session_id, None)
+            if state is None:
+                state = {"ticker": None, "client_ticker": None, "last_turn": None, "turns": 0,
+                         "restored": restored}
+            self.sessions[session_id] = state
+            while len(self.sessions) > MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+        return session_id, state
+
+    def selected_ticker(self, state: dict, ticker: str = None):
+        """The client's ticker if it was newly selected, else None.
+
+        Clients resend their selected ticker on every request, so it only
+        overrides the conversation when it differs from the last one sent.
+        """
+        ticker = ticker.upper() if ticker else None
+        if ticker == state["client_ticker"]:
+            return None
+        state["client_ticker"] = ticker
+        return ticker
+
+    def relevant_turns(self, session_id: str, state: dict, question: str, k: int = MEMORY_TURNS):
+        """Top-k earlier turns of this session most relevant to the question"""
+        turns = []
+        # Only a brand-new session is known to have nothing stored
+        if (state["turns"] or state["restored"]) and self.vector_db and self.vector_db.is_available():
+            try:
+                turns = self.vector_db.hybrid_search(
+                    CHAT_INDEX, question, k=k,
+                    filters={"session_id": session_id, "days": SESSION_MEMORY_DAYS, "date_field": "timestamp"}
+                )
+            except Exception as e:
+                print(f"Conversation memory retrieval error: {e}")
+
+        # The previous turn is what follow-ups like "and its dividends?" refer
+        # to, and its background write may not be searchable yet
+        last_turn = state["last_turn"]
+        if last_turn and all(turn.get("turn_id") != last_turn["turn_id"] for turn in turns):
+            turns = turns[:max(k - 1, 0)] + [last_turn]
+        return sorted(turns, key=lambda turn: turn.get("timestamp", ""))
+
+    def format_context(self, turns) -> str:
+        """Prompt section summarizing earlier turns, oldest first"""
+        if not turns:
+            return ""
+        context = "\n\nEarlier in this conversation:\n"
+        for turn in turns:
+            answer = turn.get("answer", "")
+            if len(answer) > PROMPT_ANSWER_CHARS:
+                answer = answer[:PROMPT_ANSWER_CHARS] + "..."
+            tickers = f" [{', '.join(turn['tickers'])}]" if turn.get("tickers") else ""
+            context += f"- User{tickers}: {turn.get('question', '')}\n  Assistant: {answer}\n"
+        return context
+
+    def remember(self, session_id: str, state: dict, question: str, answer: str, tickers: list):
+        """Update in-process state right away; returns the turn document to store"""
+        tickers = [t.upper() for t in tickers if t]
+        turn = {
+            "turn_id": f"{session_id}-{time.time_ns()}",
+            "session_id": session_id,
+            "type": "chat_turn",
+            "question": question,
+            "answer": answer[:STORED_ANSWER_CHARS],
+            "tickers": tickers,
+            # Embedded and keyword-searched as one field
+            "text": f"{question}\n{answer[:STORED_ANSWER_CHARS]}",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with self.lock:
+            if len(tickers) == 1:
+                state["ticker"] = tickers[0]
+            state["last_turn"] = turn
+            state["turns"] += 1
+        return turn
+
+    def store_turn(self, turn: dict):
+        """Embed and index a turn; meant to run as a background task"""
+        if not self.vector_db or not self.vector_db.is_available():
+            return
+        try:
+            self.vector_db.index_document(CHAT_INDEX, turn["turn_id"], dict(turn), skip_if_exists=False)
+        except Exception as e:
+            print(f"Conversation memory store error: {e}")
+
+    def forget(self, session_id: str):
+        """Drop in-process state for a session (stored turns age out with retention)"""
+        with self.lock:
+            self.sessions.pop(session_id, None)
@@ -0,0 +1,174 @@
+"""Correlation and covariance of date-aligned log returns"""
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+CORRELATION_CACHE_TTL = 300
+MAX_CACHED_RESULTS = 500
+TRADING_DAYS = 252
+# Rolling windows keep an (observations x n x n) array, so n is bounded
+MAX_CORRELATION_TICKERS = int(os.getenv("MAX_CORRELATION_TICKERS", "25"))
+
+# (sorted tickers, period, window) -> (computed_at, result in sorted order)
+_correlation_cache = {}
+_correlation_cache_lock = threading.Lock()
+
+
+def aligned_log_returns(closes: dict, tickers: list = None):
+    """Inner-join close series on date and take log returns.
+
+    Only days on which every ticker has a close are kept, so a holiday on
+    one exchange never pairs one ticker's Monday with another's Tuesday.
+    Returns (dates, tickers, returns) with returns shaped (days - 1, tickers).
+    """
+    tickers = [t for t in (tickers or list(closes)) if t in closes]
+    if not tickers:
+        return pd.DatetimeIndex([]), [], np.zeros((0, 0))
+    frame = pd.concat([closes[t] for t in tickers], axis=1, join="inner", keys=tickers)
+    frame = frame[(frame > 0).all(axis=1)]
+    prices = frame.to_numpy(dtype=np.float64)
+    returns = np.diff(np.log(prices), axis=0) if len(prices) > 1 else np.zeros((0, len(tickers)))
+    return frame.index[1:], tickers, returns
+
+
+def covariance_and_correlation(returns):
+    """Sample covariance and Pearson correlation of the return columns"""
+    count = returns.shape[0]
+    if count < 2:
+        size = returns.shape[1]
+        return np.full((size, size), np.nan), np.full((size, size), np.nan)
+    centered = returns - returns.mean(axis=0)
+    covariance = centered.T @ centered / (count - 1)
+    std = np.sqrt(np.diag(covariance))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = covariance / np.outer(std, std)
+    np.fill_diagonal(correlation, np.where(std > 0, 1.0, np.nan))
+    return covariance, np.clip(correlation, -1.0, 1.0)
+
+
+def rolling_correlation(returns, window: int):
+    """Correlation matrix for every trailing window, shaped (windows, n, n).
+
+    Uses running sums of the returns and their pairwise products, so each
+    window costs O(n^2) regardless of its length.
+    """
+    count, size = returns.shape
+    if count < window or window < 2:
+        return np.zeros((0, size, size))
+    zeros = np.zeros((1, size))
+    sums = np.concatenate((zeros, np.cumsum(returns, axis=0)))
+    products = np.concatenate((
+        np.zeros((1, size, size)), np.cumsum(returns[:, :, None] * returns[:, None, :], axis=0)
+    ))
+    window_sums = sums[window:] - sums[:-window]
+    window_products = products[window:] - products[:-window]
+    covariance = (window_products - window_sums[:, :, None] * window_sums[:, None, :] / window) / (window - 1)
+    variance = np.diagonal(covariance, axis1=1, axis2=2)
+    std = np.sqrt(np.maximum(variance, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = covariance / (std[:, :, None] * std[:, None, :])
+    return np.clip(correlation, -1.0, 1.0)
+
+
+def _rounded(matrix, decimals: int = 4):
+    """JSON-safe nested lists with NaN as None"""
+    return [[None if np.isnan(v) else round(float(v), decimals) for v in row] for row in matrix]
+
+
+def compute_correlation(closes: dict, tickers: list, window: int = None) -> dict:
+    """Matrices (and optional rolling pair series) for already-loaded closes"""
+    dates, tickers, returns = aligned_log_returns(closes, tickers)
+    covariance, correlation = covariance_and_correlation(returns)
+    result = {
+        "tickers": tickers,
+        "observations": int(returns.shape[0]),
+        "start": dates[0].strftime("%Y-%m-%d") if len(dates) else None,
+        "end": dates[-1].strftime("%Y-%m-%d") if len(dates) else None,
+        "correlation": correlation,
+        "covariance": covariance * TRADING_DAYS,
+        "volatility": np.sqrt(np.diag(covariance) * TRADING_DAYS) if len(tickers) else np.zeros(0),
+    }
+    if window:
+        rolling = rolling_correlation(returns, window)
+        result["rolling"] = {"window": window, "dates": dates[window - 1:], "matrices": rolling}
+    return result
+
+
+def _reorder(result: dict, tickers: list) -> dict:
+    """Serialize a cached result with rows and columns in the caller's order"""
+    order = [result["tickers"].index(t) for t in tickers if t in result["tickers"]]
+    names = [result["tickers"][i] for i in order]
+    index = np.ix_(order, order)
+    payload = {
+        "tickers": names,
+        "observations": result["observations"],
+        "start": result["start"],
+        "end": result["end"],
+        "correlation": _rounded(result["correlation"][index]),
+        "covariance": _rounded(result["covariance"][index], 6),
+        "volatility": {name: round(float(result["volatility"][i]), 4) for name, i in zip(names, order)},
+    }
+    rolling = result.get("rolling")
+    if rolling is not None:
+        # One series per pair, not one matrix per day
+        pairs = {}
+        for a in range(len(order)):
+            for b in range(a + 1, len(order)):
+                values = rolling["matrices"][:, order[a], order[b]]
+                pairs[f"{names[a]}/{names[b]}"] = [None if np.isnan(v) else round(float(v), 4) for v in values]
+        payload["rolling"] = {
+            "window": rolling["window"],
+            "dates": rolling["dates"].strftime("%Y-%m-%d").tolist(),
+            "pairs": pairs,
+        }
+    return payload
+
+
+def get_correlation(tickers: list, period: str, window: int = None, loader=None, closes: dict = None) -> dict:
+    """Correlation payload for a ticker set, cached per (ticker set, period, window).
+
+    Pass closes when the caller already has the series, otherwise
+    loader(tickers, period) must return {ticker: close Series}.
+    """
+    key = (tuple(sorted(tickers)), period, window or None)
+    now = time.time()
+    with _correlation_cache_lock:
+        cached = _correlation_cache.get(key)
+    if cached and now - cached[0] < CORRELATION_CACHE_TTL:
+        payload = _reorder(cached[1], tickers)
+        payload["cached"] = True
+        return payload
+
+    if closes is None:
+        closes = loader(list(key[0]), period)
+    result = compute_correlation(closes, list(key[0]), window)
+    with _correlation_cache_lock:
+        _correlation_cache[key] = (now, result)
+        if len(_correlation_cache) > MAX_CACHED_RESULTS:
+            oldest = min(_correlation_cache, key=lambda k: _correlation_cache[k][0])
+            del _correlation_cache[oldest]
+    payload = _reorder(result, tickers)
+    payload["cached"] = False
+    return payload
+
+
+def aligned_pair(closes: dict, first: str, second: str) -> dict:
+    """Date-aligned daily log returns (%) of two tickers, for a scatter plot"""
+    dates, tickers, returns = aligned_log_returns(closes, [first, second])
+    if len(tickers) < 2 or not len(returns):
+        return {}
+    x, y = returns[:, 0], returns[:, 1]
+    variance = np.var(x, ddof=1) if len(x) > 1 else 0.0
+    beta = float(np.cov(x, y, ddof=1)[0, 1] / variance) if variance > 0 else None
+    _, correlation = covariance_and_correlation(returns)
+    return {
+        "tickers": tickers,
+        "dates": dates.strftime("%Y-%m-%d").tolist(),
+        "x": np.round(x * 100, 4).tolist(),
+        "y": np.round(y * 100, 4).tolist(),
+        "correlation": None if np.isnan(correlation[0, 1]) else round(float(correlation[0, 1]), 4),
+        "beta": round(beta, 4) if beta is not None else None,
+    }
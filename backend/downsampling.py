@@ -0,0 +1,171 @@
+"""Chart series downsampling
+
+Line and volume series use Largest-Triangle-Three-Buckets (LTTB), which
+keeps the points that shape the visible curve (peaks, troughs, breaks)
+rather than every n-th one. Candlesticks are aggregated into wider bars
+with reduceat, so each bucket keeps its true open, high, low, close and
+total volume. Other series in the payload (dates, indicator overlays) are
+sliced to the same points so they stay aligned. Comparison tickers that
+share a date axis are reduced with one set of points, so they still share
+it afterwards.
+"""
+import os
+
+import numpy as np
+
+DEFAULT_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "600"))
+
+
+def _as_float(values):
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def lttb_indices(y, threshold: int):
+    """Indices of the LTTB points of y (x is the bar position).
+
+    The first and last points are always kept. Buckets are laid out as one
+    padded 2D array, so each step is a single vectorized argmax over a
+    bucket; only the dependency on the previously chosen point is sequential.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    count = len(y)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+
+    # Interior points split into threshold - 2 buckets
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    width = int((ends - starts).max())
+    columns = starts[:, None] + np.arange(width)[None, :]
+    valid = columns < ends[:, None]
+    columns = np.where(valid, columns, starts[:, None])
+    x_buckets = columns.astype(np.float64)
+    y_filled = np.where(np.isnan(y), np.nanmean(y) if np.isfinite(y).any() else 0.0, y)
+    y_buckets = y_filled[columns]
+
+    # Average of the following bucket (the last bucket looks at the final point)
+    sizes = valid.sum(axis=1)
+    x_means = np.where(valid, x_buckets, 0.0).sum(axis=1) / sizes
+    y_means = np.where(valid, y_buckets, 0.0).sum(axis=1) / sizes
+    next_x = np.append(x_means[1:], count - 1)
+    next_y = np.append(y_means[1:], y_filled[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    prev_x, prev_y = 0.0, y_filled[0]
+    for bucket in range(len(starts)):
+        # Twice the triangle area (prev, candidate, next-bucket average)
+        area = np.abs(
+            (prev_x - next_x[bucket]) * (y_buckets[bucket] - prev_y)
+            - (prev_x - x_buckets[bucket]) * (next_y[bucket] - prev_y)
+        )
+        area[~valid[bucket]] = -1.0
+        best = int(np.argmax(area))
+        selected[bucket + 1] = columns[bucket, best]
+        prev_x, prev_y = x_buckets[bucket, best], y_buckets[bucket, best]
+    return selected
+
+
+def _take(values, indices):
+    return [values[i] for i in indices]
+
+
+def _slice_aligned(data: dict, count: int, indices) -> dict:
+    """Take `indices` from every list of length `count`, including the
+    overlay and oscillator dicts"""
+    result = {}
+    for key, values in data.items():
+        if isinstance(values, list) and len(values) == count:
+            result[key] = _take(values, indices)
+        elif isinstance(values, dict) and key in ("overlays", "oscillators"):
+            result[key] = {label: _take(series, indices) if len(series) == count else series
+                           for label, series in values.items()}
+        else:
+            result[key] = values
+    return result
+
+
+def downsample_series(data: dict, driver: str, max_points: int) -> dict:
+    """LTTB on data[driver]; the other aligned lists follow the same points"""
+    values = data.get(driver) or []
+    count = len(values)
+    if count <= max_points:
+        return data
+    return _slice_aligned(data, count, lttb_indices(_as_float(values), max_points))
+
+
+def downsample_comparison(data: dict, driver: str, max_points: int) -> dict:
+    """LTTB per group of tickers with identical dates, on the mean of their
+    driver series scaled to 1, so every ticker of a group keeps the same dates"""
+    groups = {}
+    for name, series in data.items():
+        if isinstance(series, dict) and len(series.get(driver) or []) == len(series.get("dates") or []):
+            groups.setdefault(tuple(series.get("dates") or []), []).append(name)
+    result = dict(data)
+    for dates, names in groups.items():
+        count = len(dates)
+        if count <= max_points:
+            continue
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scaled = [values / np.nanmean(values) for values in (_as_float(data[n][driver]) for n in names)]
+            combined = np.nanmean(np.vstack(scaled), axis=0) if len(scaled) > 1 else scaled[0]
+        indices = lttb_indices(combined, max_points)
+        for name in names:
+            result[name] = _slice_aligned(data[name], count, indices)
+    return result
+
+
+def downsample_ohlc(data: dict, max_points: int) -> dict:
+    """Aggregate candlesticks into max_points wider bars.
+
+    Each bar is dated by its first day and overlays take the value at its
+    last day, matching the bar's close.
+    """
+    count = len(data.get("close") or [])
+    if count <= max_points:
+        return data
+    starts = np.unique(np.linspace(0, count, max_points, endpoint=False).astype(np.int64))
+    ends = np.append(starts[1:], count) - 1
+
+    result = _slice_aligned(data, count, ends)
+    result["dates"] = _take(data["dates"], starts)
+    result["open"] = _as_float(data["open"])[starts].tolist()
+    result["close"] = _as_float(data["close"])[ends].tolist()
+    result["high"] = np.fmax.reduceat(_as_float(data["high"]), starts).tolist()
+    result["low"] = np.fmin.reduceat(_as_float(data["low"]), starts).tolist()
+    if "volume" in data:
+        result["volume"] = np.add.reduceat(np.nan_to_num(_as_float(data["volume"])), starts).tolist()
+    return result
+
+
+def _series_length(chart_type: str, data: dict) -> int:
+    if chart_type in ("candlestick", "line", "volume"):
+        return len(data.get("dates") or [])
+    return max((len(series.get("dates") or []) for series in data.values() if isinstance(series, dict)), default=0)
+
+
+def downsample_chart_data(chart_type: str, data: dict, max_points: int = DEFAULT_MAX_POINTS):
+    """Downsample a /query chart payload in its own format.
+
+    Returns (data, info) where info describes the reduction, or None when
+    the series were already short enough (or max_points is 0: full
+    resolution).
+    """
+    if not data or not max_points or max_points < 3:
+        return data, None
+    original = _series_length(chart_type, data)
+    if original <= max_points:
+        return data, None
+
+    if chart_type == "candlestick":
+        data, method = downsample_ohlc(data, max_points), "ohlc"
+    elif chart_type == "line":
+        data, method = downsample_series(data, "close", max_points), "lttb"
+    elif chart_type == "volume":
+        data, method = downsample_series(data, "volume", max_points), "lttb"
+    elif chart_type in ("comparison", "performance_comparison", "volume_comparison"):
+        driver = "volume" if chart_type == "volume_comparison" else "close"
+        data, method = downsample_comparison(data, driver, max_points), "lttb"
+    else:
+        return data, None
+    return data, {"method": method, "points": _series_length(chart_type, data), "original_points": original}
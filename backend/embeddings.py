@@ -0,0 +1,65 @@
+"""Sentence embedding model and vector quantization shared by the vector DB backends"""
+import os
+
+import numpy as np
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2 dimension
+
+# "none" keeps float32 vectors, "fp16" halves them, "int8" quarters them.
+# all-MiniLM-L6-v2 embeddings are unit-normalized, so every component is in
+# [-1, 1] and a fixed int8 scale of 127 loses no range.
+QUANTIZATION_MODES = ("none", "fp16", "int8")
+INT8_SCALE = 127.0
+QUANTIZED_DTYPES = {"none": np.float32, "fp16": np.float16, "int8": np.int8}
+
+
+def load_embedding_model():
+    """Load the sentence transformer model, returning None if unavailable"""
+    try:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        print("✅ Sentence Transformer model loaded")
+        return model
+    except Exception as e:
+        print(f"⚠️ Embedding model load failed: {e}")
+        return None
+
+
+def get_quantization_mode(mode: str = None) -> str:
+    """Resolve the quantization mode, defaulting to VECTOR_QUANTIZATION"""
+    mode = (mode or os.getenv("VECTOR_QUANTIZATION", "none")).lower()
+    if mode not in QUANTIZATION_MODES:
+        print(f"⚠️ Unknown VECTOR_QUANTIZATION '{mode}', using full precision")
+        return "none"
+    return mode
+
+
+def quantize(vectors, mode: str):
+    """Convert float vectors to the storage dtype of a quantization mode"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode == "int8":
+        return np.clip(np.rint(vectors * INT8_SCALE), -128, 127).astype(np.int8)
+    return vectors.astype(QUANTIZED_DTYPES[mode], copy=False)
+
+
+def dequantize(vectors):
+    """Convert stored vectors of any supported dtype back to float32"""
+    vectors = np.asarray(vectors)
+    if vectors.dtype == np.int8:
+        return vectors.astype(np.float32) / INT8_SCALE
+    return vectors.astype(np.float32, copy=False)
+
+
+def vector_payload(vector, mode: str) -> list:
+    """JSON-ready vector for OpenSearch, as compact as the mode allows.
+    
+    int8 vectors go out as small integers (the lucene byte vector format) and
+    fp16 vectors are rounded to the 4 decimals fp16 can actually hold, instead
+    of 17-digit float reprs.
+    """
+    if mode == "int8":
+        return quantize(vector, mode).tolist()
+    if mode == "fp16":
+        return np.round(np.asarray(vector, dtype=np.float64), 4).tolist()
+    return np.asarray(vector, dtype=np.float32).tolist()
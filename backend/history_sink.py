@@ -0,0 +1,216 @@
+"""Write-behind query history for NocoDB
+
+/query hands a compact record to HistorySink.submit(), which only enqueues
+it. A background thread collects records into batches (up to
+HISTORY_BATCH_SIZE, or whatever arrived within HISTORY_FLUSH_SECONDS) and
+sends each batch with one bulk insert. Batches NocoDB rejects or cannot
+receive go to a local SQLite spool and are replayed, oldest first, once
+NocoDB answers again.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "50"))
+HISTORY_FLUSH_SECONDS = float(os.getenv("HISTORY_FLUSH_SECONDS", "2"))
+HISTORY_SPOOL_PATH = os.getenv(
+    "HISTORY_SPOOL_PATH", os.path.join(os.path.dirname(__file__), "history_spool", "spool.db")
+)
+MAX_QUEUED = 10000
+REPLAY_SECONDS = 60
+MAX_ANSWER_CHARS = 4000
+# Queued by close() to wake the flush thread
+_STOP = object()
+
+
+def compact_record(question: str, ticker: str, result: dict) -> dict:
+    """History row for a /query result: the answer and what was charted, not the chart data"""
+    data = result.get("data") or {}
+    points = 0
+    if isinstance(data, dict):
+        # Single-stock charts hold "dates"; comparisons one dict per ticker
+        points = len(data.get("dates") or []) or sum(
+            len(v.get("dates") or []) for v in data.values() if isinstance(v, dict)
+        )
+    summary = {
+        "answer": (result.get("answer") or "")[:MAX_ANSWER_CHARS],
+        "chart_type": result.get("chart_type"),
+        "tickers": result.get("tickers", []),
+        "points": points,
+        "session_id": result.get("session_id"),
+    }
+    return {
+        "question": question,
+        "ticker": ticker,
+        "timestamp": datetime.now().isoformat(),
+        "response": json.dumps(summary),
+    }
+
+
+def nocodb_bulk_writer(base_url: str, token: str, table_id: str, timeout: float = 10):
+    """post(records) inserting a batch through NocoDB's bulk API; raises on failure"""
+    session = requests.Session()
+    url = f"{base_url}/api/v1/db/data/bulk/noco/{table_id}"
+    headers = {"xc-token": token, "Content-Type": "application/json"}
+
+    def post(records: list):
+        response = session.post(url, headers=headers, json=records, timeout=timeout)
+        response.raise_for_status()
+    return post
+
+
+class HistorySpool:
+    """Append-only SQLite table of records waiting for NocoDB"""
+
+    def __init__(self, path: str = HISTORY_SPOOL_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY AUTOINCREMENT, record TEXT NOT NULL)")
+        self.db.commit()
+        self.lock = threading.Lock()
+
+    def append(self, records: list):
+        with self.lock:
+            self.db.executemany("INSERT INTO spool (record) VALUES (?)", [(json.dumps(r),) for r in records])
+            self.db.commit()
+
+    def oldest(self, limit: int) -> list:
+        """[(id, record)] in insertion order"""
+        with self.lock:
+            rows = self.db.execute("SELECT id, record FROM spool ORDER BY id LIMIT ?", (limit,)).fetchall()
+        return [(row_id, json.loads(record)) for row_id, record in rows]
+
+    def delete_through(self, row_id: int):
+        with self.lock:
+            self.db.execute("DELETE FROM spool WHERE id <= ?", (row_id,))
+            self.db.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+
+class HistorySink:
+    """Batching write-behind queue in front of a bulk writer"""
+
+    def __init__(self, post, spool: HistorySpool = None, batch_size: int = HISTORY_BATCH_SIZE,
+                 flush_seconds: float = HISTORY_FLUSH_SECONDS):
+        self.post = post
+        self.spool = spool or HistorySpool()
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue = queue.Queue(MAX_QUEUED)
+        self.sent = self.spooled = self.replayed = self.dropped = 0
+        self._next_replay = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="history-sink", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: dict):
+        """Enqueue a record; never blocks the caller"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _collect(self) -> list:
+        """Block for the first record, then take what arrives within flush_seconds"""
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = REPLAY_SECONDS if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                record = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if record is _STOP:
+                break
+            batch.append(record)
+            deadline = deadline or time.monotonic() + self.flush_seconds
+        return batch
+
+    def _send(self, batch: list) -> bool:
+        try:
+            self.post(batch)
+            return True
+        except Exception as e:
+            print(f"History flush error ({len(batch)} records): {e}")
+            return False
+
+    def _flush(self, batch: list):
+        if batch and self._send(batch):
+            self.sent += len(batch)
+            self._replay()
+        elif batch:
+            self.spool.append(batch)
+            self.spooled += len(batch)
+            self._next_replay = time.monotonic() + REPLAY_SECONDS
+        elif time.monotonic() >= self._next_replay:
+            self._replay()
+
+    def _replay(self):
+        """Resend spooled records oldest first, stopping at the first failure"""
+        while True:
+            rows = self.spool.oldest(self.batch_size)
+            if not rows:
+                return
+            if not self._send([record for _, record in rows]):
+                self._next_replay = time.monotonic() + REPLAY_SECONDS
+                return
+            self.spool.delete_through(rows[-1][0])
+            self.replayed += len(rows)
+
+    def _run(self):
+        # Records spooled by an earlier run go first
+        try:
+            self._replay()
+        except Exception as e:
+            print(f"History spool replay error: {e}")
+        while not self._stop.is_set():
+            try:
+                self._flush(self._collect())
+            except Exception as e:
+                print(f"History sink error: {e}")
+
+    def close(self, timeout: float = 5):
+        """Flush what is queued (to NocoDB or the spool) before shutdown"""
+        self._stop.set()
+        try:
+            self.queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        batch = []
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is not _STOP:
+                batch.append(record)
+        for start in range(0, len(batch), self.batch_size):
+            chunk = batch[start:start + self.batch_size]
+            if self._send(chunk):
+                self.sent += len(chunk)
+            else:
+                self.spool.append(chunk)
+                self.spooled += len(chunk)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "sent": self.sent,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "dropped": self.dropped,
+            "spool_backlog": len(self.spool),
+        }
@@ -0,0 +1,29 @@
+"""Content-hash ETags and conditional GET responses"""
+import hashlib
+
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+
+
+def etag_for(payload) -> str:
+    """Strong ETag: hash of the payload's canonical JSON"""
+    body = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check (weak comparison, lists and * allowed)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+
+def conditional_response(payload, if_none_match: str = None, max_age: int = 0) -> Response:
+    """200 with ETag and Cache-Control, or an empty 304 when the client's
+    copy is current"""
+    etag = etag_for(payload)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max(int(max_age), 0)}, must-revalidate"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(payload, headers=headers)
@@ -0,0 +1,132 @@
+"""Time-partitioned indices: naming, routing and retention
+
+A partitioned index "news_articles" is stored as one physical index per
+period ("news_articles-2024.10.18" daily, "chat_history-2024.w42" weekly)
+and searched through the base name, which OpenSearch exposes as an alias.
+Searches with a date window only touch the partitions that overlap it, and
+partitions older than the retention period are deleted.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+PARTITIONING_ENABLED = os.getenv("INDEX_PARTITIONING", "true").lower() == "true"
+
+PARTITION_POLICIES = {
+    "news_articles": {
+        "granularity": "daily",
+        "retention_days": int(os.getenv("NEWS_RETENTION_DAYS", "90")),
+        "date_field": "published_at",
+    },
+    "chat_history": {
+        "granularity": "weekly",
+        "retention_days": int(os.getenv("CHAT_RETENTION_DAYS", "180")),
+        "date_field": "timestamp",
+    },
+    "stock_data": {
+        "granularity": "weekly",
+        "retention_days": int(os.getenv("STOCK_DATA_RETENTION_DAYS", "365")),
+        "date_field": "timestamp",
+    },
+}
+
+GRANULARITY_STEP = {"daily": timedelta(days=1), "weekly": timedelta(weeks=1)}
+
+# Retention sweeps run at most this often per base index
+RETENTION_CHECK_INTERVAL = 3600
+_last_retention_check = {}
+
+
+def get_policy(base: str):
+    """Partition policy for a base index name, or None if it is monolithic"""
+    return PARTITION_POLICIES.get(base) if PARTITIONING_ENABLED else None
+
+
+def period_start(dt: datetime, granularity: str) -> datetime:
+    """Start of the day or ISO week containing dt"""
+    day = datetime(dt.year, dt.month, dt.day)
+    if granularity == "weekly":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def partition_name(base: str, dt: datetime, granularity: str) -> str:
+    """Physical index name for the period containing dt"""
+    if granularity == "weekly":
+        year, week, _ = dt.isocalendar()
+        return f"{base}-{year}.w{week:02d}"
+    return f"{base}-{dt:%Y.%m.%d}"
+
+
+def parse_partition_start(name: str, base: str, granularity: str):
+    """Inverse of partition_name: start of the partition's period, or None"""
+    suffix = name[len(base) + 1:] if name.startswith(base + "-") else ""
+    try:
+        if granularity == "weekly":
+            year, week = suffix.split(".w")
+            return datetime.fromisocalendar(int(year), int(week), 1)
+        return datetime.strptime(suffix, "%Y.%m.%d")
+    except ValueError:
+        return None
+
+
+def partitions_for_window(base: str, policy: dict, days: float, now: datetime = None):
+    """Names of every partition overlapping the last `days` days"""
+    now = now or datetime.now()
+    step = GRANULARITY_STEP[policy["granularity"]]
+    current = period_start(now - timedelta(days=days), policy["granularity"])
+    names = []
+    while current <= now:
+        names.append(partition_name(base, current, policy["granularity"]))
+        current += step
+    return names
+
+
+def window_partitions(base: str, filters: dict, now: datetime = None):
+    """Partitions a search needs, or None when it must cover all of them.
+
+    Pruning only applies when the filter window is on the same date field the
+    index is partitioned by.
+    """
+    policy = get_policy(base)
+    if not policy or not filters or "days" not in filters:
+        return None
+    if filters.get("date_field", policy["date_field"]) != policy["date_field"]:
+        return None
+    return partitions_for_window(base, policy, filters["days"], now)
+
+
+def expired_partitions(names, base: str, policy: dict, now: datetime = None):
+    """Partitions whose whole period is older than the retention window"""
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=policy["retention_days"])
+    step = GRANULARITY_STEP[policy["granularity"]]
+    expired = []
+    for name in names:
+        start = parse_partition_start(name, base, policy["granularity"])
+        if start is not None and start + step <= cutoff:
+            expired.append(name)
+    return expired
+
+
+def document_partition(base: str, document: dict, now: datetime = None):
+    """Partition a document belongs in, or None if it is already past retention"""
+    policy = get_policy(base)
+    now = now or datetime.now()
+    value = document.get(policy["date_field"])
+    try:
+        dt = datetime.fromisoformat(str(value)).replace(tzinfo=None) if value else now
+    except ValueError:
+        dt = now
+    if dt < now - timedelta(days=policy["retention_days"]):
+        return None
+    return partition_name(base, min(dt, now), policy["granularity"])
+
+
+def retention_due(base: str) -> bool:
+    """Throttle retention sweeps to one per RETENTION_CHECK_INTERVAL"""
+    now = time.time()
+    if now - _last_retention_check.get(base, 0) < RETENTION_CHECK_INTERVAL:
+        return False
+    _last_retention_check[base] = now
+    return True
@@ -0,0 +1,389 @@
+"""Vectorized technical indicators with per-ticker memoization
+
+Every indicator is a function of (bars, params, state) -> (outputs, state):
+it processes one contiguous run of bars, starting from the state left by the
+bars before it. Computing the full history is one call with no state; when
+a refetch only appends bars (or revises today's still-open bar), only the
+new tail is processed, seeded with the state memoized for the last settled
+bar. All the work inside a call is NumPy array arithmetic.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Exponential smoothing is evaluated in closed form over blocks this long;
+# short enough that decay ** BLOCK never underflows for the alphas used here
+EWM_BLOCK = 64
+
+MAX_MEMO_ENTRIES = 2000
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def ewm(values, alpha: float, seed: float = None):
+    """y[t] = (1 - alpha) * y[t-1] + alpha * x[t], seeded with y[-1] = seed.
+
+    Without a seed the first output equals the first input (pandas
+    ewm(adjust=False) semantics).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    if not len(values):
+        return out
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[:] = values
+        return out
+    start = 0
+    if seed is None or np.isnan(seed):
+        out[0] = prev = values[0]
+        start = 1
+    else:
+        prev = seed
+    for begin in range(start, len(values), EWM_BLOCK):
+        block = values[begin:begin + EWM_BLOCK]
+        powers = decay ** np.arange(1, len(block) + 1)
+        out[begin:begin + len(block)] = powers * (prev + alpha * np.cumsum(block / powers))
+        prev = out[begin + len(block) - 1]
+    return out
+
+
+def rolling_mean_std(values, window: int):
+    """Trailing-window mean and population std; NaN until the window fills"""
+    values = np.asarray(values, dtype=np.float64)
+    mean = np.full(len(values), np.nan)
+    std = np.full(len(values), np.nan)
+    if len(values) < window:
+        return mean, std
+    # Shift by the first value so the running sums do not cancel catastrophically
+    shifted = values - values[0]
+    sums = np.concatenate(([0.0], np.cumsum(shifted)))
+    squares = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+    window_sum = sums[window:] - sums[:-window]
+    window_sq = squares[window:] - squares[:-window]
+    mean[window - 1:] = window_sum / window + values[0]
+    std[window - 1:] = np.sqrt(np.maximum(window_sq / window - (window_sum / window) ** 2, 0.0))
+    return mean, std
+
+
+def _warmup(values, count: int, warmup: int):
+    """NaN out outputs for bars before the indicator has enough history"""
+    masked = min(max(warmup - count, 0), len(values))
+    if masked:
+        values[:masked] = np.nan
+    return values
+
+
+def _with_tail(state, key: str, values, keep: int):
+    """Prefix values with the bars carried in state.
+
+    Returns (series, number of carried bars, last `keep` bars to carry on).
+    """
+    carried = state.get(key, np.zeros(0)) if state else np.zeros(0)
+    series = np.concatenate((carried, values))
+    return series, len(carried), (series[-keep:] if keep else np.zeros(0))
+
+
+def sma(bars: dict, params, state=None):
+    (window,) = params
+    series, offset, tail = _with_tail(state, "tail", bars["close"], window - 1)
+    mean, _ = rolling_mean_std(series, window)
+    return {"sma": mean[offset:]}, {"tail": tail}
+
+
+def ema(bars: dict, params, state=None):
+    (span,) = params
+    state = state or {"ema": None, "count": 0}
+    values = ewm(bars["close"], 2.0 / (span + 1), state["ema"])
+    new_state = {"ema": values[-1] if len(values) else state["ema"], "count": state["count"] + len(values)}
+    return {"ema": _warmup(values, state["count"], span - 1)}, new_state
+
+
+def _ewm_from_first_valid(values, alpha: float, seed=None):
+    """ewm that leaves a leading NaN in place instead of propagating it"""
+    if len(values) and np.isnan(values[0]):
+        return np.concatenate(([np.nan], ewm(values[1:], alpha, seed)))
+    return ewm(values, alpha, seed)
+
+
+def rsi(bars: dict, params, state=None):
+    """Wilder RSI: gains and losses smoothed with alpha = 1 / period"""
+    (period,) = params
+    close = bars["close"]
+    state = state or {"prev_close": None, "avg_gain": None, "avg_loss": None, "count": 0}
+    if not len(close):
+        return {"rsi": np.zeros(0)}, state
+    if state["prev_close"] is None:
+        # The very first bar has no change; smoothing starts from the second
+        delta = np.concatenate(([np.nan], np.diff(close)))
+    else:
+        delta = np.diff(close, prepend=state["prev_close"])
+    avg_gain = _ewm_from_first_valid(np.maximum(delta, 0.0), 1.0 / period, state["avg_gain"])
+    avg_loss = _ewm_from_first_valid(np.maximum(-delta, 0.0), 1.0 / period, state["avg_loss"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    values = np.where((avg_gain == 0) & (avg_loss == 0), 50.0, values)
+    new_state = {"prev_close": close[-1], "avg_gain": avg_gain[-1], "avg_loss": avg_loss[-1],
+                 "count": state["count"] + len(close)}
+    return {"rsi": _warmup(values, state["count"], period)}, new_state
+
+
+def macd(bars: dict, params, state=None):
+    fast, slow, signal = params
+    state = state or {"fast": None, "slow": None, "signal": None, "count": 0}
+    close = bars["close"]
+    fast_ema = ewm(close, 2.0 / (fast + 1), state["fast"])
+    slow_ema = ewm(close, 2.0 / (slow + 1), state["slow"])
+    line = fast_ema - slow_ema
+    signal_line = ewm(line, 2.0 / (signal + 1), state["signal"])
+    new_state = {"count": state["count"] + len(close)}
+    for key, values in (("fast", fast_ema), ("slow", slow_ema), ("signal", signal_line)):
+        new_state[key] = values[-1] if len(values) else state[key]
+    histogram = line - signal_line
+    return {
+        "macd": _warmup(line, state["count"], slow - 1),
+        "signal": _warmup(signal_line, state["count"], slow + signal - 2),
+        "histogram": _warmup(histogram, state["count"], slow + signal - 2),
+    }, new_state
+
+
+def bollinger(bars: dict, params, state=None):
+    window, width = params
+    series, offset, tail = _with_tail(state, "tail", bars["close"], window - 1)
+    mean, std = rolling_mean_std(series, window)
+    mean, std = mean[offset:], std[offset:]
+    return {"middle": mean, "upper": mean + width * std, "lower": mean - width * std}, {"tail": tail}
+
+
+def atr(bars: dict, params, state=None):
+    """Wilder average true range"""
+    (period,) = params
+    high, low, close = bars["high"], bars["low"], bars["close"]
+    state = state or {"prev_close": None, "atr": None, "count": 0}
+    if not len(close):
+        return {"atr": np.zeros(0)}, state
+    prev_close = np.concatenate(([np.nan if state["prev_close"] is None else state["prev_close"]], close[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    values = ewm(true_range, 1.0 / period, state["atr"])
+    new_state = {"prev_close": close[-1], "atr": values[-1], "count": state["count"] + len(close)}
+    return {"atr": _warmup(values, state["count"], period - 1)}, new_state
+
+
+def vwap(bars: dict, params, state=None):
+    """Volume-weighted average typical price, anchored at the first bar"""
+    state = state or {"pv": 0.0, "volume": 0.0}
+    typical = (bars["high"] + bars["low"] + bars["close"]) / 3.0
+    cum_pv = state["pv"] + np.cumsum(typical * bars["volume"])
+    cum_volume = state["volume"] + np.cumsum(bars["volume"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = np.where(cum_volume > 0, cum_pv / cum_volume, np.nan)
+    new_state = {"pv": cum_pv[-1], "volume": cum_volume[-1]} if len(values) else state
+    return {"vwap": values}, new_state
+
+
+# name -> (function, default params, drawn on the price axis?)
+INDICATORS = {
+    "sma": (sma, (20,), True),
+    "ema": (ema, (20,), True),
+    "rsi": (rsi, (14,), False),
+    "macd": (macd, (12, 26, 9), False),
+    "bbands": (bollinger, (20, 2.0), True),
+    "atr": (atr, (14,), False),
+    "vwap": (vwap, (), True),
+}
+
+# Question keywords -> indicator specs to compute and chart
+INDICATOR_KEYWORDS = {
+    "rsi": ["rsi:14"], "relative strength": ["rsi:14"],
+    "macd": ["macd:12,26,9"],
+    "bollinger": ["bbands:20,2"],
+    "moving average": ["sma:20", "sma:50"], "sma": ["sma:20", "sma:50"],
+    "ema": ["ema:20"], "exponential": ["ema:20"],
+    "atr": ["atr:14"], "average true range": ["atr:14"],
+    "vwap": ["vwap"],
+}
+
+
+def parse_spec(spec: str):
+    """'sma:50' -> ('sma', (50,)); a bare name uses the default params"""
+    name, _, raw = str(spec).strip().lower().partition(":")
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator '{name}'")
+    defaults = INDICATORS[name][1]
+    if not raw:
+        return name, defaults
+    values = [float(v) for v in raw.split(",")]
+    params = tuple(int(v) if v.is_integer() and i < len(defaults) and isinstance(defaults[i], int) else v
+                   for i, v in enumerate(values))
+    if len(params) != len(defaults) or any(p <= 0 for p in params):
+        raise ValueError(f"Indicator '{name}' expects {len(defaults)} positive parameters")
+    return name, params
+
+
+def spec_label(name: str, params) -> str:
+    return f"{name.upper()}({','.join(f'{p:g}' for p in params)})" if params else name.upper()
+
+
+def detect_indicator_request(question: str):
+    """Indicator specs a question asks about, in first-mention order"""
+    q_lower = question.lower()
+    specs = []
+    for keyword, keyword_specs in INDICATOR_KEYWORDS.items():
+        if keyword in q_lower:
+            specs.extend(s for s in keyword_specs if s not in specs)
+    return specs
+
+
+def _bars(hist):
+    """OHLCV float64 arrays plus int64 bar timestamps from a history frame"""
+    bars = {column.lower(): hist[column].to_numpy(dtype=np.float64) for column in ("High", "Low", "Close")}
+    bars["volume"] = hist["Volume"].to_numpy(dtype=np.float64) if "Volume" in hist else np.zeros(len(hist))
+    return bars, hist.index.asi8
+
+
+def _slice(bars: dict, start: int, end: int = None):
+    return {key: values[start:end] for key, values in bars.items()}
+
+
+def compute_indicator(ticker: str, period: str, hist, name: str, params=None, prepared=None):
+    """Outputs of one indicator over a history frame, memoized per
+    (ticker, period, indicator, params).
+
+    A memo entry keeps the outputs and the state after the last settled bar
+    (all but the newest, which may still be revised). If the new history
+    starts on the same bar and agrees up to that settled bar, only the tail
+    is recomputed; an unchanged history returns the memoized outputs.
+    prepared (from _bars) lets callers computing several indicators convert
+    hist once.
+    """
+    fn, defaults, _ = INDICATORS[name]
+    params = tuple(params) if params is not None else defaults
+    key = (ticker.upper(), period, name, params)
+    bars, stamps = prepared or _bars(hist)
+    count = len(stamps)
+    if not count:
+        return {}
+
+    with _memo_lock:
+        entry = _memo.get(key)
+        if entry is not None:
+            _memo.move_to_end(key)
+
+    settled = None
+    if entry is not None:
+        if len(entry["stamps"]) == count and entry["last_close"] == bars["close"][-1] \
+                and np.array_equal(entry["stamps"], stamps):
+            return entry["outputs"]
+        settled = entry["settled"]
+        if settled > count or not np.array_equal(stamps[:settled], entry["stamps"][:settled]) \
+                or (settled and bars["close"][settled - 1] != entry["last_settled_close"]):
+            settled = None
+
+    if settled is None:
+        # Full computation, split so the state after the settled bars is kept
+        settled = count - 1
+        head, head_state = fn(_slice(bars, 0, settled), params, None)
+        prefix = head
+    else:
+        head_state = entry["state"]
+        prefix = {out: values[:settled] for out, values in entry["outputs"].items()}
+        # Bars between the old and new settled points become settled too
+        if count - 1 > settled:
+            middle, head_state = fn(_slice(bars, settled, count - 1), params, head_state)
+            prefix = {out: np.concatenate((prefix[out], middle[out])) for out in prefix}
+            settled = count - 1
+
+    tail, _ = fn(_slice(bars, settled), params, head_state)
+    outputs = {out: np.concatenate((prefix[out], tail[out])) for out in tail}
+
+    with _memo_lock:
+        _memo[key] = {
+            "stamps": stamps.copy(),
+            "settled": settled,
+            "last_settled_close": bars["close"][settled - 1] if settled else None,
+            "last_close": bars["close"][-1],
+            "state": head_state,
+            "outputs": outputs,
+        }
+        while len(_memo) > MAX_MEMO_ENTRIES:
+            _memo.popitem(last=False)
+    return outputs
+
+
+def _payload(values, decimals: int = 4):
+    """JSON-safe list with NaN warm-up values as None"""
+    rounded = np.round(values, decimals)
+    return [None if np.isnan(v) else float(v) for v in rounded]
+
+
+def indicator_overlays(ticker: str, period: str, hist, specs):
+    """Chart series for the requested specs.
+
+    Returns {"overlays": {label: values}, "oscillators": {label: values}}:
+    overlays share the price axis, oscillators get their own panel.
+    Unknown or malformed specs are skipped.
+    """
+    overlays, oscillators = {}, {}
+    for spec in specs or []:
+        try:
+            name, params = parse_spec(spec)
+        except ValueError as e:
+            print(f"Indicator spec error: {e}")
+            continue
+        outputs = compute_indicator(ticker, period, hist, name, params)
+        target = overlays if INDICATORS[name][2] else oscillators
+        label = spec_label(name, params)
+        for out, values in outputs.items():
+            series_label = label if len(outputs) == 1 else f"{label} {out}"
+            target[series_label] = _payload(values)
+    return {"overlays": overlays, "oscillators": oscillators}
+
+
+def _last(values):
+    return float(values[-1]) if len(values) and not np.isnan(values[-1]) else None
+
+
+def indicator_summary(ticker: str, period: str, hist) -> str:
+    """Latest values of the standard indicators, as prompt text"""
+    if hist is None or hist.empty or len(hist) < 2:
+        return ""
+    close = float(hist["Close"].iloc[-1])
+    prepared = _bars(hist)
+    lines = []
+
+    def compute(name, params):
+        return compute_indicator(ticker, period, hist, name, params, prepared)
+
+    for window in (20, 50, 200):
+        value = _last(compute("sma", (window,))["sma"])
+        if value:
+            lines.append(f"- SMA({window}): ${value:.2f} (price {'above' if close > value else 'below'})")
+    value = _last(compute("ema", (20,))["ema"])
+    if value:
+        lines.append(f"- EMA(20): ${value:.2f}")
+
+    value = _last(compute("rsi", (14,))["rsi"])
+    if value is not None:
+        zone = "overbought" if value >= 70 else "oversold" if value <= 30 else "neutral"
+        lines.append(f"- RSI(14): {value:.1f} ({zone})")
+
+    outputs = compute("macd", (12, 26, 9))
+    line, signal = _last(outputs["macd"]), _last(outputs["signal"])
+    if line is not None and signal is not None:
+        lines.append(f"- MACD(12,26,9): {line:.3f}, signal {signal:.3f} "
+                     f"({'bullish' if line > signal else 'bearish'} crossover side)")
+
+    outputs = compute("bbands", (20, 2.0))
+    upper, lower = _last(outputs["upper"]), _last(outputs["lower"])
+    if upper is not None and lower is not None and upper > lower:
+        lines.append(f"- Bollinger(20,2): ${lower:.2f} - ${upper:.2f} (%B {(close - lower) / (upper - lower):.2f})")
+
+    value = _last(compute("atr", (14,))["atr"])
+    if value:
+        lines.append(f"- ATR(14): ${value:.2f} ({value / close * 100:.1f}% of price)")
+    value = _last(compute("vwap", ())["vwap"])
+    if value:
+        lines.append(f"- VWAP ({period}): ${value:.2f}")
+
+    return "\nTechnical Indicators:\n" + "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,203 @@
+"""Append-only intraday bar buffers
+
+Each (ticker, interval) keeps its bars in preallocated NumPy columns. A
+refresh asks yfinance only for bars from the last stored timestamp onward:
+the still-forming last bar is overwritten and newer bars are appended.
+Bars older than the interval's retention window are dropped, so memory per
+buffer stays bounded however long the server runs.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+# interval -> (bar length, retention window). Retention stays inside what
+# Yahoo serves for the interval (1m: 7 days, 5m/15m: 60 days, 1h: 730 days)
+INTRADAY_INTERVALS = {
+    "1m": (timedelta(minutes=1), timedelta(days=int(os.getenv("INTRADAY_RETENTION_DAYS_1M", "5")))),
+    "5m": (timedelta(minutes=5), timedelta(days=int(os.getenv("INTRADAY_RETENTION_DAYS_5M", "30")))),
+    "15m": (timedelta(minutes=15), timedelta(days=int(os.getenv("INTRADAY_RETENTION_DAYS_15M", "60")))),
+    "1h": (timedelta(hours=1), timedelta(days=int(os.getenv("INTRADAY_RETENTION_DAYS_1H", "180")))),
+}
+# Period used when the sidebar asks for intraday bars over a daily period
+PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 366, "2y": 731}
+MAX_BUFFERS = int(os.getenv("INTRADAY_MAX_BUFFERS", "200"))
+
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+_buffers = OrderedDict()
+_buffers_lock = threading.Lock()
+
+
+def is_intraday(interval: str) -> bool:
+    return interval in INTRADAY_INTERVALS
+
+
+def series_key(period: str, interval: str = "1d") -> str:
+    """Memo key for indicator caches: daily and intraday bars of the same
+    period are different series"""
+    return period if not is_intraday(interval) else f"{period}@{interval}"
+
+
+def format_bar_dates(index, interval: str = "1d") -> list:
+    """Chart x-axis labels: dates for daily bars, minutes for intraday ones"""
+    return index.strftime("%Y-%m-%d %H:%M" if is_intraday(interval) else "%Y-%m-%d").tolist()
+
+
+class BarBuffer:
+    """One ticker's bars at one interval, stored column-wise.
+
+    timestamps are UTC epoch nanoseconds; the OHLCV values are one float64
+    block. Rows [start, end) are live: trimming only advances start, and the
+    live rows are moved to the front when an append reaches the array end.
+    """
+
+    def __init__(self, retention: timedelta, capacity: int = 1024):
+        self.retention_ns = int(retention.total_seconds() * 1e9)
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        self.values = np.empty((capacity, len(COLUMNS)), dtype=np.float64)
+        self.start = self.end = 0
+        self.tz = "UTC"
+        self.fetched_at = 0.0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def last_timestamp(self):
+        return int(self.timestamps[self.end - 1]) if len(self) else None
+
+    def _reserve(self, rows: int):
+        live = len(self)
+        if self.end + rows <= len(self.timestamps):
+            return
+        capacity = len(self.timestamps)
+        while live + rows > capacity:
+            capacity *= 2
+        if capacity != len(self.timestamps) or self.start:
+            timestamps = np.empty(capacity, dtype=np.int64)
+            values = np.empty((capacity, len(COLUMNS)), dtype=np.float64)
+            timestamps[:live] = self.timestamps[self.start:self.end]
+            values[:live] = self.values[self.start:self.end]
+            self.timestamps, self.values = timestamps, values
+            self.start, self.end = 0, live
+
+    def append(self, frame: pd.DataFrame) -> int:
+        """Merge freshly fetched bars; returns the number of new bars"""
+        if frame is None or frame.empty:
+            return 0
+        index = pd.DatetimeIndex(frame.index)
+        if index.tz is not None:
+            self.tz = str(index.tz)
+            index = index.tz_convert("UTC")
+        timestamps = index.as_unit("ns").asi8
+        values = frame.reindex(columns=list(COLUMNS)).to_numpy(dtype=np.float64)
+
+        last = self.last_timestamp
+        if last is not None:
+            # The last stored bar may still have been forming: overwrite it
+            keep = timestamps >= last
+            timestamps, values = timestamps[keep], values[keep]
+            if len(timestamps) and timestamps[0] == last:
+                self.values[self.end - 1] = values[0]
+                timestamps, values = timestamps[1:], values[1:]
+        added = len(timestamps)
+        if added:
+            self._reserve(added)
+            self.timestamps[self.end:self.end + added] = timestamps
+            self.values[self.end:self.end + added] = values
+            self.end += added
+        self.trim()
+        return added
+
+    def trim(self):
+        """Drop bars older than the retention window"""
+        if not len(self):
+            return
+        cutoff = self.timestamps[self.end - 1] - self.retention_ns
+        self.start += int(np.searchsorted(self.timestamps[self.start:self.end], cutoff, side="left"))
+
+    def frame(self, since_ns: int = None) -> pd.DataFrame:
+        """History frame (tz-aware index) of the bars at or after since_ns"""
+        start = self.start
+        if since_ns is not None:
+            start += int(np.searchsorted(self.timestamps[self.start:self.end], since_ns, side="left"))
+        index = pd.DatetimeIndex(self.timestamps[start:self.end].copy(), tz="UTC").tz_convert(self.tz)
+        frame = pd.DataFrame(self.values[start:self.end].copy(), index=index, columns=list(COLUMNS))
+        frame["Volume"] = frame["Volume"].fillna(0).astype(np.int64)
+        return frame
+
+    def memory_bytes(self) -> int:
+        return self.timestamps.nbytes + self.values.nbytes
+
+
+def _fetch(ticker: str, interval: str, start=None, days: int = None) -> pd.DataFrame:
+    try:
+        stock = yf.Ticker(ticker)
+        if start is not None:
+            return stock.history(start=start, interval=interval, auto_adjust=True, actions=False)
+        return stock.history(period=f"{days}d", interval=interval, auto_adjust=True, actions=False)
+    except Exception as e:
+        print(f"Intraday fetch error for {ticker} {interval}: {e}")
+        return pd.DataFrame()
+
+
+def _get_buffer(ticker: str, interval: str) -> BarBuffer:
+    key = (ticker, interval)
+    with _buffers_lock:
+        buffer = _buffers.get(key)
+        if buffer is None:
+            buffer = _buffers[key] = BarBuffer(INTRADAY_INTERVALS[interval][1])
+            while len(_buffers) > MAX_BUFFERS:
+                _buffers.popitem(last=False)
+        else:
+            _buffers.move_to_end(key)
+        return buffer
+
+
+def get_intraday_history(ticker: str, interval: str, period: str = "1d") -> pd.DataFrame:
+    """Intraday bars for the last `period`, clipped to the retention window.
+
+    The first call downloads the retention window once; later calls fetch
+    only from the last stored bar, and at most once per bar length.
+    """
+    ticker = ticker.upper()
+    bar, retention = INTRADAY_INTERVALS[interval]
+    buffer = _get_buffer(ticker, interval)
+    with buffer.lock:
+        now = time.time()
+        if not len(buffer):
+            buffer.append(_fetch(ticker, interval, days=retention.days))
+            buffer.fetched_at = now
+        elif now - buffer.fetched_at >= bar.total_seconds():
+            last = pd.Timestamp(buffer.last_timestamp, tz="UTC")
+            buffer.append(_fetch(ticker, interval, start=last))
+            buffer.fetched_at = now
+        if not len(buffer):
+            return pd.DataFrame(columns=list(COLUMNS))
+
+        days = min(PERIOD_DAYS.get(period, retention.days), retention.days)
+        if period == "1d":
+            # The latest session, not the last 24 hours
+            last = pd.Timestamp(buffer.last_timestamp, tz="UTC").tz_convert(buffer.tz)
+            since = last.normalize().tz_convert("UTC").value
+        else:
+            since = buffer.last_timestamp - int(timedelta(days=days).total_seconds() * 1e9)
+        return buffer.frame(since)
+
+
+def buffer_stats() -> dict:
+    """Buffer count, stored bars and memory, for status endpoints"""
+    with _buffers_lock:
+        buffers = list(_buffers.values())
+    return {
+        "buffers": len(buffers),
+        "bars": sum(len(b) for b in buffers),
+        "memory_bytes": sum(b.memory_bytes() for b in buffers),
+    }
@@ -0,0 +1,566 @@
+"""Embedded vector index used when OpenSearch is not reachable"""
+import os
+import re
+import json
+import math
+import time
+import heapq
+import atexit
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from embeddings import (
+    EMBEDDING_DIM, QUANTIZED_DTYPES, load_embedding_model, get_quantization_mode, quantize, dequantize
+)
+from index_partitions import (
+    get_policy, document_partition, window_partitions, expired_partitions, retention_due
+)
+from retrieval import (
+    FILTER_FIELDS, reciprocal_rank_fusion, resolve_leg_sizes, run_search_legs, normalize_filters
+)
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vector_data")
+
+# Same field boosts as the OpenSearch multi_match query
+TEXT_FIELD_BOOSTS = {"title": 3, "summary": 2, "text": 1}
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Date fields that a "days" filter can target
+DATE_FIELDS = ("published_at", "timestamp")
+
+# Rows dequantized per matrix product, bounding the float32 scratch memory
+SEARCH_BLOCK_ROWS = 1024
+
+
+def tokenize(text: str):
+    """Lowercase word tokenizer used for both documents and queries"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def parse_epoch(value):
+    """ISO date string to epoch seconds (NaN when missing or unparseable)"""
+    if not value:
+        return np.nan
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return np.nan
+
+
+class BM25Index:
+    """Minimal in-memory BM25 keyword index over boosted text fields"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> {row: boosted term frequency}
+        self.doc_terms = {}  # row -> terms, so a row can be replaced
+        self.doc_lengths = {}
+        self.total_length = 0
+
+    def add(self, row: int, document: dict):
+        """Index the text fields of a document under the given row"""
+        self.remove(row)
+        frequencies = {}
+        length = 0
+        for field, boost in TEXT_FIELD_BOOSTS.items():
+            tokens = tokenize(str(document.get(field) or ""))
+            length += len(tokens)
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + boost
+        for term, freq in frequencies.items():
+            self.postings.setdefault(term, {})[row] = freq
+        self.doc_terms[row] = list(frequencies)
+        self.doc_lengths[row] = length
+        self.total_length += length
+
+    def remove(self, row: int):
+        """Drop a row from the index if present"""
+        terms = self.doc_terms.pop(row, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(row, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(row, 0)
+
+    def search(self, query_text: str, k: int, allowed=None):
+        """Return [(row, score)] for the top-k BM25 matches among allowed rows"""
+        doc_count = len(self.doc_lengths)
+        if not doc_count:
+            return []
+        avg_length = self.total_length / doc_count or 1.0
+        scores = {}
+        for term in set(tokenize(query_text)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for row, freq in posting.items():
+                if allowed is not None and row not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[row] / avg_length)
+                scores[row] = scores.get(row, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+class LocalIndex:
+    """One named index: a dense embedding matrix plus a BM25 keyword index"""
+
+    def __init__(self, name: str, data_dir: str, dim: int = EMBEDDING_DIM, quantization: str = "none"):
+        self.name = name
+        self.dim = dim
+        self.quantization = quantization
+        self.dtype = QUANTIZED_DTYPES[quantization]
+        self.vectors_path = os.path.join(data_dir, f"{name}.npy")
+        self.docs_path = os.path.join(data_dir, f"{name}.json")
+        self.lock = threading.RLock()
+        self.vectors = np.zeros((0, dim), dtype=self.dtype)
+        self.sq_norms = np.zeros(0, dtype=np.float32)
+        self.count = 0
+        self.ids = []
+        self.docs = []
+        self.id_to_row = {}
+        self.keywords = BM25Index()
+        # Filter structures: keyword field -> value -> rows, date field -> epoch seconds
+        self.facets = {field: {} for field in FILTER_FIELDS}
+        self.row_facets = {}
+        self.dates = {field: np.zeros(0) for field in DATE_FIELDS}
+        self.dirty = False
+
+    def _ensure_capacity(self, size: int):
+        """Grow the embedding matrix geometrically so appends stay amortized O(1)"""
+        capacity = self.vectors.shape[0]
+        if size <= capacity:
+            return
+        new_capacity = max(size, capacity * 2, 1024)
+        vectors = np.zeros((new_capacity, self.dim), dtype=self.dtype)
+        vectors[:self.count] = self.vectors[:self.count]
+        sq_norms = np.full(new_capacity, np.inf, dtype=np.float32)
+        sq_norms[:self.count] = self.sq_norms[:self.count]
+        self.vectors, self.sq_norms = vectors, sq_norms
+        for field, values in self.dates.items():
+            grown = np.full(new_capacity, np.nan)
+            grown[:self.count] = values[:self.count]
+            self.dates[field] = grown
+
+    def _index_filters(self, row: int, document: dict):
+        """Refresh the facet sets and date columns for a row"""
+        for field, value in self.row_facets.pop(row, []):
+            rows = self.facets[field].get(value)
+            if rows is not None:
+                rows.discard(row)
+        entries = []
+        for field in FILTER_FIELDS:
+            values = document.get(field)
+            if values is None:
+                continue
+            for value in values if isinstance(values, list) else [values]:
+                self.facets[field].setdefault(value, set()).add(row)
+                entries.append((field, value))
+        self.row_facets[row] = entries
+        for field in DATE_FIELDS:
+            self.dates[field][row] = parse_epoch(document.get(field))
+
+    def candidate_rows(self, filters: dict):
+        """Rows passing normalized filters, or None when nothing is filtered"""
+        if not filters:
+            return None
+        with self.lock:
+            mask = np.ones(self.count, dtype=bool)
+            for field in FILTER_FIELDS:
+                if field in filters:
+                    rows = set().union(*(self.facets[field].get(value, ()) for value in filters[field]))
+                    field_mask = np.zeros(self.count, dtype=bool)
+                    field_mask[list(rows)] = True
+                    mask &= field_mask
+            if "days" in filters:
+                cutoff = time.time() - filters["days"] * 86400
+                dates = self.dates.get(filters["date_field"])
+                if dates is None:
+                    return np.zeros(0, dtype=np.int64)
+                # NaN (undated) rows compare False and drop out, as in a range query
+                mask &= dates[:self.count] >= cutoff
+            return np.flatnonzero(mask)
+
+    def upsert(self, doc_id: str, document: dict, embedding):
+        """Insert or replace a document and its embedding"""
+        with self.lock:
+            row = self.id_to_row.get(doc_id)
+            if row is None:
+                row = self.count
+                self._ensure_capacity(row + 1)
+                self.ids.append(doc_id)
+                self.docs.append(document)
+                self.id_to_row[doc_id] = row
+                self.count += 1
+            else:
+                self.docs[row] = document
+            if embedding is not None:
+                self.vectors[row] = quantize(embedding, self.quantization)
+                # Norm of the stored (lossy) vector keeps distances consistent
+                vector = dequantize(self.vectors[row])
+                self.sq_norms[row] = float(vector @ vector)
+            else:
+                # Rows without an embedding are only reachable through BM25
+                self.vectors[row] = 0
+                self.sq_norms[row] = np.inf
+            self.keywords.add(row, document)
+            self._index_filters(row, document)
+            self.dirty = True
+
+    def knn(self, query_vector, k: int, rows=None):
+        """Return [(row, score)] for the k nearest rows by L2 distance.
+
+        rows restricts the scan to pre-filtered candidates, so a selective
+        filter shrinks the matrix product instead of trimming results after.
+        """
+        with self.lock:
+            vectors = self.vectors[:self.count] if rows is None else self.vectors[rows]
+            sq_norms = self.sq_norms[:self.count] if rows is None else self.sq_norms[rows]
+            size = len(sq_norms)
+            if not size:
+                return []
+            q = np.asarray(query_vector, dtype=np.float32)
+            # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2; the query stays full
+            # precision and only the stored side is quantized
+            if self.dtype == np.float32:
+                dots = vectors @ q
+            else:
+                dots = np.empty(size, dtype=np.float32)
+                for start in range(0, size, SEARCH_BLOCK_ROWS):
+                    end = min(start + SEARCH_BLOCK_ROWS, size)
+                    dots[start:end] = dequantize(vectors[start:end]) @ q
+            distances = sq_norms - 2.0 * dots + float(q @ q)
+            k = min(k, size)
+            top = np.argpartition(distances, k - 1)[:k] if k < size else np.arange(size)
+            top = top[np.argsort(distances[top])]
+            row_ids = top if rows is None else rows[top]
+            # Same score transform OpenSearch uses for the l2 space
+            return [(int(row), float(1.0 / (1.0 + max(distance, 0.0))))
+                    for row, distance in zip(row_ids, distances[top]) if np.isfinite(distance)]
+
+    def bm25(self, query_text: str, k: int, rows=None):
+        """Return [(row, score)] for the top-k keyword matches"""
+        with self.lock:
+            allowed = None if rows is None else set(rows.tolist())
+            return self.keywords.search(query_text, k, allowed)
+
+    def get(self, doc_id: str):
+        """Get a stored document by ID"""
+        with self.lock:
+            row = self.id_to_row.get(doc_id)
+            return None if row is None else self.docs[row]
+
+    def save(self):
+        """Persist embeddings and documents to the data directory"""
+        with self.lock:
+            if not self.dirty:
+                return
+            os.makedirs(os.path.dirname(self.vectors_path), exist_ok=True)
+            # Both files are written in full before either is swapped in, so
+            # a crash mid-write leaves the previous pair intact
+            vectors_tmp, docs_tmp = self.vectors_path + ".tmp", self.docs_path + ".tmp"
+            with open(vectors_tmp, "wb") as f:
+                np.save(f, self.vectors[:self.count])
+            with open(docs_tmp, "w", encoding="utf-8") as f:
+                json.dump({"ids": self.ids, "docs": self.docs}, f)
+            os.replace(vectors_tmp, self.vectors_path)
+            os.replace(docs_tmp, self.docs_path)
+            self.dirty = False
+
+    def load(self):
+        """Load a previously persisted index, if one exists"""
+        if not os.path.exists(self.docs_path):
+            return
+        with self.lock:
+            with open(self.docs_path, encoding="utf-8") as f:
+                stored = json.load(f)
+            vectors = np.load(self.vectors_path) if os.path.exists(self.vectors_path) else None
+            for row, (doc_id, document) in enumerate(zip(stored["ids"], stored["docs"])):
+                embedding = None
+                if vectors is not None and row < len(vectors) and vectors[row].any():
+                    embedding = dequantize(vectors[row])
+                self.upsert(doc_id, document, embedding)
+            self.dirty = False
+
+    def delete_files(self):
+        """Remove the persisted files for this index"""
+        for path in (self.vectors_path, self.docs_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class LocalVectorDB:
+    """In-process replacement for OpenSearchVectorDB with the same interface"""
+
+    backend = "local"
+
+    def __init__(self, model=None, data_dir: str = None, quantization: str = None):
+        """Open the local index directory and embedding model
+
+        model=None loads the default embedding model; model=False skips it for
+        callers that only pass precomputed vectors.
+        """
+        self.data_dir = data_dir or os.getenv("LOCAL_VECTOR_DB_PATH", DEFAULT_DATA_DIR)
+        self.quantization = get_quantization_mode(quantization)
+        self.indices = {}
+        self.partitions = {}  # base name -> physical partition names
+        self.lock = threading.Lock()
+        self.model = model if model is not None else load_embedding_model()
+        atexit.register(self.save_all)
+        print(f"✅ Local vector index ready at {self.data_dir} (quantization: {self.quantization})")
+
+    def is_available(self):
+        """The local index is always usable (keyword search works without a model)"""
+        return True
+
+    def _get_index(self, index_name: str, create: bool = True):
+        with self.lock:
+            index = self.indices.get(index_name)
+            if index is None and create:
+                index = LocalIndex(index_name, self.data_dir, quantization=self.quantization)
+                try:
+                    index.load()
+                except Exception as e:
+                    print(f"⚠️ Could not load local index '{index_name}': {e}")
+                self.indices[index_name] = index
+            return index
+
+    def _read_indices(self, index_name: str, filters: dict = None):
+        """Physical indices a read needs: the window's partitions, or all of them"""
+        if index_name not in self.partitions:
+            index = self._get_index(index_name, create=False)
+            return [index] if index else []
+        names = window_partitions(index_name, filters)
+        existing = self.partitions[index_name]
+        selected = existing if names is None else existing.intersection(names)
+        return [self._get_index(name) for name in sorted(selected)]
+
+    def create_index(self, index_name: str):
+        """Create (or load) a local index, discovering its partitions on disk"""
+        policy = get_policy(index_name)
+        if not policy:
+            index = self._get_index(index_name)
+            print(f"✅ Local index '{index_name}' ready ({index.count} documents)")
+            return True
+
+        prefix = index_name + "-"
+        on_disk = os.listdir(self.data_dir) if os.path.isdir(self.data_dir) else []
+        with self.lock:
+            self.partitions.setdefault(index_name, set()).update(
+                name[:-len(".json")] for name in on_disk
+                if name.startswith(prefix) and name.endswith(".json")
+            )
+        self.enforce_retention(index_name)
+        count = sum(index.count for index in self._read_indices(index_name))
+        print(f"✅ Local partitioned index '{index_name}' ready "
+              f"({len(self.partitions[index_name])} partitions, {count} documents)")
+        return True
+
+    def enforce_retention(self, index_name: str):
+        """Delete partitions of an index that are past its retention period"""
+        policy = get_policy(index_name)
+        if index_name not in self.partitions:
+            return []
+        expired = expired_partitions(self.partitions[index_name], index_name, policy)
+        for name in expired:
+            with self.lock:
+                self.partitions[index_name].discard(name)
+                index = self.indices.pop(name, None) or LocalIndex(name, self.data_dir)
+            index.delete_files()
+        if expired:
+            print(f"🗑️ Dropped {len(expired)} expired partitions of '{index_name}'")
+        return expired
+
+    def embed_text(self, text: str):
+        """Generate embedding for text"""
+        if not self.model:
+            return None
+        try:
+            return self.model.encode(text).tolist()
+        except Exception as e:
+            print(f"Embedding error: {e}")
+            return None
+
+    def index_document(self, index_name: str, doc_id: str, document: dict, skip_if_exists=True):
+        """Index a document with vector embedding"""
+        try:
+            target = index_name
+            if index_name in self.partitions:
+                target = document_partition(index_name, document)
+                if target is None:
+                    return True  # Older than retention, would be dropped anyway
+
+            if skip_if_exists and self.get_document(index_name, doc_id) is not None:
+                return True  # Already indexed
+
+            embedding = document.get('embedding')
+            if embedding is None:
+                text_to_embed = document.get('text', document.get('summary', document.get('title', '')))
+                embedding = self.embed_text(text_to_embed)
+
+            document = {key: value for key, value in document.items() if key != 'embedding'}
+            document['timestamp'] = datetime.now().isoformat()
+            self._get_index(target).upsert(doc_id, document, embedding)
+            if target != index_name:
+                with self.lock:
+                    self.partitions[index_name].add(target)
+                if retention_due(index_name):
+                    self.enforce_retention(index_name)
+            return True
+        except Exception as e:
+            print(f"Indexing error: {e}")
+            return False
+
+    def bulk_index(self, index_name: str, documents, chunk_size: int = 500):
+        """Index many (doc_id, document) pairs, embedding missing vectors in batches"""
+        documents = list(documents)
+        indexed = 0
+        for start in range(0, len(documents), chunk_size):
+            chunk = documents[start:start + chunk_size]
+            missing = [doc for _, doc in chunk if doc.get('embedding') is None]
+            if missing and self.model:
+                texts = [doc.get('text', doc.get('summary', doc.get('title', ''))) for doc in missing]
+                for doc, vector in zip(missing, self.model.encode(texts, batch_size=64)):
+                    doc['embedding'] = vector
+            for doc_id, doc in chunk:
+                indexed += self.index_document(index_name, doc_id, doc, skip_if_exists=False)
+        return indexed
+
+    def refresh(self, index_name: str):
+        """Persist pending writes for an index to disk"""
+        names = sorted(self.partitions[index_name]) if index_name in self.partitions else [index_name]
+        for name in names:
+            index = self._get_index(name, create=False)
+            if index:
+                try:
+                    index.save()
+                except Exception as e:
+                    print(f"Local index save error: {e}")
+
+    def save_all(self):
+        """Persist every open index"""
+        for index in list(self.indices.values()):
+            try:
+                index.save()
+            except Exception as e:
+                print(f"Local index save error: {e}")
+
+    def _knn_hits(self, scoped, query_embedding, k: int):
+        """Merge per-partition kNN results into a global top-k of (key, doc)"""
+        hits = []
+        for index, rows in scoped:
+            hits.extend(((index.name, row), score, index.docs[row])
+                        for row, score in index.knn(query_embedding, k, rows))
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return [(key, doc) for key, _, doc in hits[:k]]
+
+    def _bm25_hits(self, scoped, query_text: str, k: int):
+        """Merge per-partition BM25 results into a global top-k of (key, doc)"""
+        hits = []
+        for index, rows in scoped:
+            hits.extend(((index.name, row), score, index.docs[row])
+                        for row, score in index.bm25(query_text, k, rows))
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return [(key, doc) for key, _, doc in hits[:k]]
+
+    def _scope(self, index_name: str, filters: dict):
+        """(index, candidate rows) pairs for a filtered read"""
+        return [(index, index.candidate_rows(filters)) for index in self._read_indices(index_name, filters)]
+
+    def search_similar(self, index_name: str, query_text: str, k: int = 5, filters: dict = None,
+                       query_vector=None):
+        """Search for similar documents using vector similarity"""
+        if not self.model and query_vector is None:
+            return []
+
+        try:
+            query_embedding = self.embed_text(query_text) if query_vector is None else query_vector
+            if query_embedding is None or not len(query_embedding):
+                return []
+            scoped = self._scope(index_name, normalize_filters(filters))
+            return [doc for _, doc in self._knn_hits(scoped, query_embedding, k)]
+        except Exception as e:
+            print(f"Search error: {e}")
+            return []
+
+    def hybrid_search(self, index_name: str, query_text: str, k: int = 5, knn_k: int = None,
+                      bm25_k: int = None, oversample: int = 2, with_stats: bool = False,
+                      filters: dict = None, query_vector=None):
+        """Hybrid search: kNN and BM25 legs run concurrently, fused with RRF"""
+        knn_k, bm25_k = resolve_leg_sizes(k, knn_k, bm25_k, oversample)
+
+        try:
+            start = time.perf_counter()
+            scoped = self._scope(index_name, normalize_filters(filters))
+
+            def knn_leg():
+                query_embedding = self.embed_text(query_text) if query_vector is None else query_vector
+                if query_embedding is None or not len(query_embedding):
+                    return []
+                return self._knn_hits(scoped, query_embedding, knn_k)
+
+            legs, latencies = run_search_legs({
+                "knn": knn_leg,
+                "bm25": lambda: self._bm25_hits(scoped, query_text, bm25_k)
+            })
+            docs = {key: doc for hits in legs.values() for key, doc in hits}
+            fused = reciprocal_rank_fusion(
+                [[key for key, _ in legs["knn"]], [key for key, _ in legs["bm25"]]], k
+            )
+            results = [docs[key] for key, _ in fused]
+            stats = {
+                "knn_ms": latencies["knn"],
+                "bm25_ms": latencies["bm25"],
+                "total_ms": (time.perf_counter() - start) * 1000,
+                "knn_hits": len(legs["knn"]),
+                "bm25_hits": len(legs["bm25"]),
+                "partitions": len(scoped)
+            }
+            return (results, stats) if with_stats else results
+        except Exception as e:
+            print(f"Hybrid search error: {e}")
+            return ([], {}) if with_stats else []
+
+    def get_document(self, index_name: str, doc_id: str):
+        """Get a specific document by ID"""
+        for index in self._read_indices(index_name):
+            document = index.get(doc_id)
+            if document is not None:
+                return document
+        return None
+
+    def delete_index(self, index_name: str):
+        """Delete an index (and all of its partitions) and its files"""
+        with self.lock:
+            names = self.partitions.pop(index_name, None) or {index_name}
+            indices = [self.indices.pop(name, None) or LocalIndex(name, self.data_dir) for name in names]
+        try:
+            for index in indices:
+                index.delete_files()
+            print(f"✅ Deleted local index '{index_name}'")
+            return True
+        except Exception as e:
+            print(f"Delete index error: {e}")
+            return False
+
+    def status(self):
+        """Summarize the local indices for the status endpoint"""
+        indices = {}
+        for name in ("news_articles", "stock_data", "chat_history"):
+            indices[name] = sum(index.count for index in self._read_indices(name))
+        return {
+            "status": "local",
+            "message": "Using embedded local vector index",
+            "path": self.data_dir,
+            "quantization": self.quantization,
+            "indices": indices,
+            "partitions": {base: sorted(names) for base, names in self.partitions.items()}
+        }
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import yfinance as yf
@@ -10,11 +11,36 @@ from typing import Optional
 import google.generativeai as genai
 from dotenv import load_dotenv
 from opensearch_client import get_vector_db
+from news_tagging import tag_article
+from conversation_memory import ConversationMemory
+from indicators import detect_indicator_request, indicator_overlays, indicator_summary
+from market_data import get_close_panel, closes_from_history, normalize_tickers
+from correlation import get_correlation, aligned_pair, MAX_CORRELATION_TICKERS
+from portfolio import portfolio_report, summarize as summarize_portfolio, DEFAULT_BENCHMARK
+from screener import (
+    start_screener, get_snapshot, screen, parse_screen_question, describe_filters, snapshot_status
+)
+from intraday import get_intraday_history, is_intraday, series_key, format_bar_dates
+from downsampling import downsample_chart_data, DEFAULT_MAX_POINTS
+from series_sync import BAR_COLUMNS, SeriesLog, slice_bars
+from http_cache import conditional_response
+from compression import CompressionMiddleware
+from chart_encoding import compact_chart_data, encode_response
+from backtesting import backtest_report, parse_backtest_question, start_pool, summarize as summarize_backtest
+from quotes import QuoteHub, QuoteStream, HEARTBEAT_SECONDS, parse_tickers
+from alerts import AlertEngine, AlertFeed, parse_alert_text
+from history_sink import HistorySink, compact_record, nocodb_bulk_writer
+import anyio
+import asyncio
 import hashlib
+import json
 
 load_dotenv()
 
-app = FastAPI(title="FinancePilot API")
+# Backtest sweep workers are forked before any background thread starts
+start_pool()
+
+app = FastAPI(title="FinancePilot API", default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -25,11 +51,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip / brotli / zstd for bodies over COMPRESSION_MIN_SIZE, with repeats served from cache
+app.add_middleware(CompressionMiddleware)
+
 # NocoDB configuration
 NOCODB_URL = os.getenv("NOCODB_URL", "http://localhost:8080")
 NOCODB_TOKEN = os.getenv("NOCODB_TOKEN", "")
 NOCODB_TABLE_ID = os.getenv("NOCODB_TABLE_ID", "")
 
+# Query history is written behind the request: batched bulk inserts, spooled
+# to local SQLite while NocoDB is unreachable
+history_sink = None
+if NOCODB_TOKEN and NOCODB_TABLE_ID:
+    history_sink = HistorySink(nocodb_bulk_writer(NOCODB_URL, NOCODB_TOKEN, NOCODB_TABLE_ID))
+
+
+@app.on_event("shutdown")
+def flush_history():
+    if history_sink is not None:
+        history_sink.close()
+
 # Gemini configuration
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 if GEMINI_API_KEY:
@@ -47,30 +88,71 @@ else:
 # SerpAPI configuration
 SERPAPI_KEY = os.getenv("SERPAPI_KEY", "")
 
-# Initialize OpenSearch Vector DB (disabled for performance)
-# Uncomment when OpenSearch is running
-# vector_db = get_vector_db()
-# if vector_db and vector_db.client:
-#     vector_db.create_index("news_articles")
-#     vector_db.create_index("stock_data")
-#     vector_db.create_index("chat_history")
-vector_db = None  # Disabled for now
+# Initialize Vector DB: OpenSearch when reachable, embedded local index otherwise
+# Set VECTOR_DB_BACKEND=none to disable retrieval entirely
+vector_db = None
+if os.getenv("VECTOR_DB_BACKEND", "auto").lower() != "none":
+    vector_db = get_vector_db()
+    vector_db.create_index("news_articles")
+    vector_db.create_index("stock_data")
+    vector_db.create_index("chat_history")
+
+# Fundamentals snapshot for the screener, refreshed nightly in the background
+if os.getenv("SCREENER_ENABLED", "true").lower() == "true":
+    start_screener()
+
+# Server-side conversation sessions, stored in chat_history
+conversation_memory = ConversationMemory(vector_db)
+
+# Revisions of the price series sent to clients, for delta sync
+series_log = SeriesLog()
+SYNCED_CHART_TYPES = ("candlestick", "line", "volume")
+
+# Live quotes: one shared poller for every subscribed ticker
+quote_hub = QuoteHub()
+
+# Price alerts, evaluated on every quote the poller fetches for their tickers
+alert_engine = AlertEngine()
+alert_subscription = quote_hub.subscribe(alert_engine.tickers(), alert_engine.on_quotes)
+alert_engine.on_tickers_changed = lambda tickers: quote_hub.update_subscription(alert_subscription, tickers)
+
+# Only news from this many recent days is used as RAG context
+NEWS_RAG_WINDOW_DAYS = int(os.getenv("NEWS_RAG_WINDOW_DAYS", "30"))
 
 # Simple in-memory cache for news (5 minutes TTL)
 news_cache = {"data": None, "timestamp": None}
 CACHE_TTL = 300  # 5 minutes
+# Same TTL for the gainers/losers/most active snapshot
+market_overview_cache = {"data": None, "timestamp": None}
+
+
+def cache_seconds_left(cache: dict) -> int:
+    """Seconds until a snapshot cache entry expires (0 when empty)"""
+    if not cache["timestamp"]:
+        return 0
+    return max(int(CACHE_TTL - (datetime.now() - cache["timestamp"]).total_seconds()), 0)
 
 class QueryRequest(BaseModel):
     question: str
     ticker: Optional[str] = None
     period: Optional[str] = "1mo"
     compare_tickers: Optional[list] = None  # For stock comparisons
+    session_id: Optional[str] = None  # Returned by the first /query of a conversation
+    indicators: Optional[list] = None  # Chart overlays, e.g. ["sma:50", "rsi:14", "macd", "bbands:20,2"]
+    interval: Optional[str] = "1d"  # Bar size: 1d, or intraday 1h/15m/5m/1m
+    max_points: Optional[int] = None  # Chart points per series (default CHART_MAX_POINTS); 0 = full resolution
+    compact: Optional[bool] = False  # Chart data in the columnar-v1 layout (shared epoch-day axes)
+    known_series: Optional[list] = None  # Cached series markers [{ticker, period, interval, chart_type, epoch, revision, last}]
 
 class QueryResponse(BaseModel):
     answer: str
     data: dict
     chart_type: str
     suggestions: list = []
+    session_id: Optional[str] = None
+    tickers: list = []
+    downsampled: Optional[dict] = None  # {"method", "points", "original_points"} when the chart was reduced
+    series: Optional[dict] = None  # Sync marker of a cacheable price series; data holds only a delta if "delta_from" is set
 
 class ChatRequest(BaseModel):
     question: str
@@ -81,50 +163,44 @@ class ChatResponse(BaseModel):
     suggestions: list = []
 
 def save_to_nocodb(question: str, ticker: str, response: dict):
-    """Save query history to NocoDB"""
-    if not NOCODB_TOKEN or not NOCODB_TABLE_ID:
-        return
-    
+    """Queue a compact query history record; it reaches NocoDB in a background batch"""
+    if history_sink is not None:
+        history_sink.submit(compact_record(question, ticker, response))
+
+def fetch_history(stock, ticker: str, period: str, interval: str = "1d"):
+    """Price history frame: intraday bars from the incremental per-ticker
+    buffer, daily bars from yfinance"""
+    hist = pd.DataFrame()
     try:
-        headers = {
-            "xc-token": NOCODB_TOKEN,
-            "Content-Type": "application/json"
-        }
-        data = {
-            "question": question,
-            "ticker": ticker,
-            "timestamp": datetime.now().isoformat(),
-            "response": str(response)
-        }
-        requests.post(
-            f"{NOCODB_URL}/api/v1/db/data/noco/{NOCODB_TABLE_ID}",
-            headers=headers,
-            json=data,
-            timeout=5
-        )
+        if is_intraday(interval):
+            hist = get_intraday_history(ticker, interval, period)
+        else:
+            hist = stock.history(period=period, interval="1d", actions=False, auto_adjust=True, back_adjust=False, repair=True, keepna=False, proxy=None, rounding=False, timeout=30)
     except Exception as e:
-        # Silently fail if NocoDB is not available
-        pass
-
-def get_stock_data(ticker: str, period: str):
-    """Fetch comprehensive stock data"""
+        print(f"History fetch error: {e}")
+        # Try alternative method
+        try:
+            import yfinance.shared as shared
+            shared._ERRORS.clear()
+            hist = stock.history(period=period)
+        except:
+            pass
+    return hist
+
+def get_stock_data(ticker: str, period: str, interval: str = "1d"):
+    """Fetch comprehensive stock data
+    
+    Intraday intervals come from the incremental per-ticker bar buffer; any
+    other interval means daily bars.
+    """
+    if not is_intraday(interval):
+        interval = "1d"
     try:
         # Create ticker with proper headers to avoid rate limiting
         stock = yf.Ticker(ticker)
         
         # Fetch history - yfinance v0.2.32+ uses different method
-        hist = pd.DataFrame()
-        try:
-            hist = stock.history(period=period, interval="1d", actions=False, auto_adjust=True, back_adjust=False, repair=True, keepna=False, proxy=None, rounding=False, timeout=30)
-        except Exception as e:
-            print(f"History fetch error: {e}")
-            # Try alternative method
-            try:
-                import yfinance.shared as shared
-                shared._ERRORS.clear()
-                hist = stock.history(period=period)
-            except:
-                pass
+        hist = fetch_history(stock, ticker, period, interval)
         
         # Get info with fallback
         info = {}
@@ -161,20 +237,22 @@ def get_stock_data(ticker: str, period: str):
             "history": hist,
             "info": info,
             "dividends": dividends,
-            "ticker": ticker
+            "ticker": ticker,
+            "period": period,
+            "interval": interval
         }
     except Exception as e:
         print(f"Stock data error: {e}")
         raise HTTPException(status_code=400, detail=f"Unable to fetch data for {ticker}. Please check the ticker symbol and try again.")
 
-def analyze_with_gemini(question: str, stock_data: dict):
+def analyze_with_gemini(question: str, stock_data: dict, memory_context: str = ""):
     """Use Gemini with RAG to understand user intent and generate response"""
     if not model:
         # Fallback to simple keyword matching
         return analyze_without_gemini(question, stock_data)
     
-    # RAG: Retrieve relevant context from OpenSearch (only if available and connected)
-    relevant_context = ""
+    # RAG: relevant earlier turns of this conversation
+    relevant_context = memory_context
     # Skip RAG if OpenSearch is not properly connected
     # This prevents timeouts when OpenSearch is unavailable
     
@@ -183,6 +261,8 @@ def analyze_with_gemini(question: str, stock_data: dict):
         info = stock_data["info"]
         hist = stock_data["history"]
         dividends = stock_data["dividends"]
+        interval = stock_data.get("interval", "1d")
+        bar_unit = "days" if interval == "1d" else f"{interval} bars"
         
         # Calculate additional metrics
         price_change = 0
@@ -214,9 +294,9 @@ Current Metrics:
 
 Recent Performance:
 - Price Change: ${price_change:.2f} ({price_change_pct:+.2f}%)
-- Historical Data Points: {len(hist)} days
+- Historical Data Points: {len(hist)} {bar_unit}
 - Has Dividends: {'Yes' if not dividends.empty else 'No'}
-{relevant_context}
+{indicator_summary(ticker, series_key(stock_data.get("period", ""), stock_data.get("interval", "1d")), hist)}{relevant_context}
 User Question: "{question}"
 
 Instructions:
@@ -359,23 +439,42 @@ def detect_chart_request(question: str):
 def extract_tickers_from_question(question: str):
     """Extract stock tickers from question"""
     import re
-    # Look for patterns like AAPL, MSFT, etc.
-    tickers = re.findall(r'\b[A-Z]{1,5}\b', question)
+    # Look for patterns like AAPL, MSFT, etc. ("P/E" and "P/B" are ratios, not tickers)
+    tickers = re.findall(r'\b[A-Z]{1,5}\b', re.sub(r'\b[A-Z]/[A-Z]\b', ' ', question))
     # Filter out common words
     common_words = ['I', 'A', 'THE', 'AND', 'OR', 'VS', 'PE', 'EPS', 'CEO', 'CFO', 'AI', 'IT']
     return [t for t in tickers if t not in common_words and len(t) <= 5]
 
 
-def parse_question_enhanced(question: str, ticker: str, period: str, compare_tickers: list = None):
-    """Enhanced RAG-enabled question parser with dynamic chart support"""
+def parse_question_enhanced(question: str, ticker: str, period: str, compare_tickers: list = None,
+                            memory_context: str = "", session_ticker: str = None, indicators: list = None,
+                            interval: str = "1d"):
+    """Enhanced RAG-enabled question parser with dynamic chart support
+    
+    session_ticker is the ticker the conversation is about; follow-ups that
+    name no ticker of their own are answered for it. indicators (or the ones
+    the question mentions) are added to price charts as overlay series.
+    interval picks daily or intraday bars for single-stock charts.
+    """
+    
+    # Screening questions ("tech stocks with P/E under 20") are answered from
+    # the fundamentals snapshot; a question about named tickers is not a screen
+    detected_tickers = [] if ticker or compare_tickers else extract_tickers_from_question(question)
+    if not ticker and not compare_tickers and not detected_tickers:
+        screen_query = parse_screen_question(question)
+        if screen_query:
+            return handle_screen_question(question, screen_query, memory_context)
+    
+    # "How would a 50/200-day crossover have done on MSFT" is simulated, not guessed
+    backtest_query = parse_backtest_question(question)
+    if backtest_query and not compare_tickers:
+        return handle_backtest_question(question, backtest_query, ticker or session_ticker, memory_context)
     
     # Auto-detect tickers from question if not provided
-    if not ticker and not compare_tickers:
-        detected_tickers = extract_tickers_from_question(question)
-        if len(detected_tickers) >= 2:
-            compare_tickers = detected_tickers
-        elif len(detected_tickers) == 1:
-            ticker = detected_tickers[0]
+    if len(detected_tickers) >= 2:
+        compare_tickers = detected_tickers
+    elif len(detected_tickers) == 1:
+        ticker = detected_tickers[0]
     
     # Check if it's a comparison request
     is_comparison = compare_tickers or any(word in question.lower() for word in ["compare", "vs", "versus"])
@@ -384,13 +483,20 @@ def parse_question_enhanced(question: str, ticker: str, period: str, compare_tic
     general_keywords = ["market", "stocks", "which", "better", "what's happening"]
     is_general = any(keyword in question.lower() for keyword in general_keywords) and not ticker and not compare_tickers
     
+    if not ticker and not compare_tickers and not is_general:
+        ticker = session_ticker
+    
     if is_comparison and compare_tickers:
         # Handle comparison with dynamic charts
-        return handle_comparison_question(question, compare_tickers, period)
+        result = handle_comparison_question(question, compare_tickers, period, memory_context)
+        result["tickers"] = result.get("tickers") or list(compare_tickers)
+        return result
     
     if is_general:
         # Handle general market questions with RAG
-        return handle_rag_question(question, ticker, compare_tickers, period)
+        result = handle_rag_question(question, ticker, compare_tickers, period, memory_context)
+        result["tickers"] = [ticker] if ticker else []
+        return result
     
     if not ticker:
         return {
@@ -400,19 +506,27 @@ def parse_question_enhanced(question: str, ticker: str, period: str, compare_tic
         }
     
     try:
+        # A one-day period on daily bars would be a single bar; single-stock
+        # charts use 5m bars instead (comparisons and RAG keep daily bars)
+        if period == "1d" and not is_intraday(interval):
+            interval = "5m"
         # Fetch stock data
-        stock_data = get_stock_data(ticker, period)
+        stock_data = get_stock_data(ticker, period, interval)
+        interval = stock_data["interval"]
         
         # Analyze with Gemini + RAG
-        chart_type, answer = analyze_with_gemini(question, stock_data)
+        chart_type, answer = analyze_with_gemini(question, stock_data, memory_context)
         
         # Prepare chart data based on chart type
         data_dict = {}
         hist = stock_data["history"]
+        indicator_specs = indicators or detect_indicator_request(question)
+        if indicator_specs and chart_type == "none":
+            chart_type = "line"
         
         if chart_type == "candlestick" and not hist.empty:
             data_dict = {
-                "dates": hist.index.strftime("%Y-%m-%d").tolist(),
+                "dates": format_bar_dates(hist.index, interval),
                 "open": hist["Open"].tolist(),
                 "high": hist["High"].tolist(),
                 "low": hist["Low"].tolist(),
@@ -421,15 +535,19 @@ def parse_question_enhanced(question: str, ticker: str, period: str, compare_tic
             }
         elif chart_type == "line" and not hist.empty:
             data_dict = {
-                "dates": hist.index.strftime("%Y-%m-%d").tolist(),
+                "dates": format_bar_dates(hist.index, interval),
                 "close": hist["Close"].tolist()
             }
         elif chart_type == "volume" and not hist.empty:
             data_dict = {
-                "dates": hist.index.strftime("%Y-%m-%d").tolist(),
+                "dates": format_bar_dates(hist.index, interval),
                 "volume": hist["Volume"].tolist()
             }
-        elif chart_type == "bar":
+        
+        if chart_type in ("candlestick", "line") and data_dict and indicator_specs:
+            data_dict.update(indicator_overlays(ticker, series_key(period, interval), hist, indicator_specs))
+        
+        if chart_type == "bar":
             dividends = stock_data["dividends"]
             if not dividends.empty:
                 recent_divs = dividends.tail(10)
@@ -438,17 +556,22 @@ def parse_question_enhanced(question: str, ticker: str, period: str, compare_tic
                     "dividends": recent_divs.tolist()
                 }
         
-        return {
+        result = {
             "answer": answer,
             "data": data_dict,
-            "chart_type": chart_type
+            "chart_type": chart_type,
+            "tickers": [ticker]
         }
+        if chart_type in SYNCED_CHART_TYPES and data_dict:
+            # Price series the client can cache and later receive as deltas
+            result["series"] = {"ticker": ticker, "period": period, "interval": interval}
+        return result
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error: {str(e)}")
 
 
-def handle_comparison_question(question: str, compare_tickers: list, period: str = "1mo"):
+def handle_comparison_question(question: str, compare_tickers: list, period: str = "1mo", memory_context: str = ""):
     """Handle stock comparison questions with dynamic charts"""
     try:
         # Detect chart type from user request
@@ -509,6 +632,24 @@ Stock Data:
             context += f"- Market Cap: ${data['market_cap_b']:.2f}B\n"
             context += f"- Dividend Yield: {data['dividend_yield']:.2f}%\n"
         
+        # Correlation charts replace chart_data below
+        tickers = list(chart_data)
+        
+        # Correlation charts get the small aligned-returns result, not raw series
+        if chart_type in ("heatmap", "scatter"):
+            closes = {t: closes_from_history(stocks_data[t]["history"]) for t in chart_data}
+            correlation = get_correlation(list(closes), period, closes=closes)
+            context += "\nCorrelation of daily log returns (date-aligned, "
+            context += f"{correlation['observations']} days):\n"
+            for i, first in enumerate(correlation["tickers"]):
+                for j in range(i + 1, len(correlation["tickers"])):
+                    context += f"- {first} / {correlation['tickers'][j]}: {correlation['correlation'][i][j]}\n"
+            if chart_type == "heatmap":
+                chart_data = correlation
+            else:
+                chart_data = aligned_pair(closes, *list(closes)[:2]) if len(closes) >= 2 else {}
+        
+        context += memory_context
         context += f"\nUser Question: {question}\n\n"
         context += """Provide a comprehensive comparison:
 1. Brief overview of each stock
@@ -521,12 +662,13 @@ Stock Data:
             response = model.generate_content(context)
             answer = format_ai_response(response.text.strip())
         else:
-            answer = f"Comparing {', '.join(chart_data.keys())}..."
+            answer = f"Comparing {', '.join(tickers)}..."
         
         return {
             "answer": answer,
             "data": chart_data,
-            "chart_type": chart_type
+            "chart_type": chart_type,
+            "tickers": tickers
         }
         
     except Exception as e:
@@ -537,20 +679,140 @@ Stock Data:
         }
 
 
-def handle_rag_question(question: str, ticker: str = None, compare_tickers: list = None, period: str = "1mo"):
+def handle_screen_question(question: str, screen_query: dict, memory_context: str = ""):
+    """Answer a screening question from the columnar fundamentals snapshot"""
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return {
+            "answer": "The stock screener is still loading its fundamentals snapshot. Please try again in a minute.",
+            "data": {},
+            "chart_type": "none",
+            "tickers": []
+        }
+    
+    found = screen(snapshot, screen_query["filters"], screen_query["sort"], screen_query["descending"], limit=10)
+    matches = found["results"]
+    criteria = describe_filters(screen_query["filters"])
+    
+    table = f"Screen: {criteria} (sorted by {screen_query['sort']}, "
+    table += f"{found['total']} of {len(snapshot)} stocks match)\n"
+    for row in matches:
+        table += f"- {row['ticker']} ({row['shortName']}, {row['sector'] or 'N/A'}): "
+        table += f"price {row['currentPrice'] or 0:.2f}, P/E {row['trailingPE'] or 0:.1f}, "
+        table += f"market cap ${(row['marketCap'] or 0) / 1e9:.1f}B, dividend yield {row['dividendYield'] or 0:.2f}%, "
+        table += f"beta {row['beta'] or 0:.2f}\n"
+    
+    if not matches:
+        answer = f"No stocks in the screener universe match: {criteria}."
+    elif model:
+        try:
+            prompt = f"""You are a financial analyst. Answer the user's screening question using only these screener results.
+{memory_context}
+{table}
+User Question: {question}
+
+Instructions:
+1. List the matching stocks with the metrics that matter for the question
+2. Use bullet points (•)
+3. Mention how many stocks matched in total
+4. Be concise"""
+            answer = format_ai_response(model.generate_content(prompt).text.strip())
+        except Exception as e:
+            print(f"Gemini screen error: {e}")
+            answer = table
+    else:
+        answer = table
+    
+    # Top matches in the metrics_comparison chart format
+    chart_data = {
+        row["ticker"]: {
+            "price": row["currentPrice"] or 0,
+            "pe_ratio": row["trailingPE"] or 0,
+            "market_cap_b": (row["marketCap"] or 0) / 1e9,
+            "dividend_yield": row["dividendYield"] or 0
+        }
+        for row in matches[:5]
+    }
+    return {
+        "answer": answer,
+        "data": chart_data,
+        "chart_type": "metrics_comparison" if chart_data else "none",
+        "tickers": [row["ticker"] for row in matches[:5]]
+    }
+
+
+def handle_backtest_question(question: str, backtest_query: dict, ticker: str = None, memory_context: str = ""):
+    """Answer a strategy question from a vectorized backtest on daily closes"""
+    strategy_words = {"RSI", "MA", "SMA", "EMA", "MACD", "DAY"}
+    detected = [t for t in extract_tickers_from_question(question) if t not in strategy_words]
+    ticker = detected[0] if detected else ticker
+    if not ticker:
+        return {
+            "answer": "Which stock should I backtest? Include a ticker, e.g. \"50/200-day crossover on MSFT\".",
+            "data": {},
+            "chart_type": "none",
+            "tickers": []
+        }
+    
+    try:
+        result = backtest_report(
+            ticker, backtest_query["strategy"], backtest_query["params"],
+            period=backtest_query["period"], loader=get_close_panel
+        )
+    except ValueError as e:
+        return {"answer": f"Could not run the backtest: {str(e)}", "data": {}, "chart_type": "none", "tickers": [ticker]}
+    
+    summary = summarize_backtest(result)
+    answer = summary
+    if model:
+        try:
+            prompt = f"""You are a quantitative analyst. Answer the user's question using only this backtest.
+{memory_context}
+{summary}
+
+User Question: {question}
+
+Instructions:
+1. Compare the strategy with buy & hold on return, risk and drawdown
+2. Use bullet points (•)
+3. Note that past performance does not guarantee future results
+4. Be concise"""
+            answer = format_ai_response(model.generate_content(prompt).text.strip())
+        except Exception as e:
+            print(f"Gemini backtest error: {e}")
+    
+    # Equity curves in the performance_comparison chart format
+    dates = result["equity"]["dates"]
+    return {
+        "answer": answer,
+        "data": {
+            "Strategy": {"dates": dates, "close": result["equity"]["strategy"]},
+            "Buy & Hold": {"dates": dates, "close": result["equity"]["benchmark"]}
+        },
+        "chart_type": "performance_comparison",
+        "tickers": [ticker]
+    }
+
+
+def handle_rag_question(question: str, ticker: str = None, compare_tickers: list = None, period: str = "1mo",
+                        memory_context: str = ""):
     """Handle RAG-enabled questions including comparisons"""
     try:
         # Retrieve relevant context from news
         relevant_context = ""
-        if vector_db and vector_db.client:
+        if vector_db and vector_db.is_available():
             try:
-                search_query = question
-                if ticker:
-                    search_query = f"{ticker} {question}"
-                if compare_tickers:
-                    search_query = f"{' '.join(compare_tickers)} {question}"
-                
-                relevant_articles = vector_db.hybrid_search("news_articles", search_query, k=3)
+                # Filter by ticker and recency inside the search instead of
+                # stuffing tickers into the query text
+                tickers = list(compare_tickers or []) + ([ticker] if ticker else [])
+                filters = {"tickers": tickers, "days": NEWS_RAG_WINDOW_DAYS}
+                # Oversample both legs so RRF has enough overlap to pick a good top 3
+                relevant_articles = vector_db.hybrid_search("news_articles", question, k=3, oversample=4, filters=filters)
+                if not relevant_articles and tickers:
+                    # No tagged coverage for these tickers, fall back to recent market news
+                    relevant_articles = vector_db.hybrid_search(
+                        "news_articles", question, k=3, oversample=4, filters={"days": NEWS_RAG_WINDOW_DAYS}
+                    )
                 if relevant_articles:
                     relevant_context = "\n\nRelevant Recent News:\n"
                     for idx, article in enumerate(relevant_articles[:3], 1):
@@ -593,6 +855,7 @@ def handle_rag_question(question: str, ticker: str = None, compare_tickers: list
                     context += f"- Sector: {info.get('sector', 'N/A')}\n"
         
         context += relevant_context
+        context += memory_context
         context += f"\nUser Question: {question}\n\n"
         context += """Instructions:
 1. Provide a clear, well-structured answer
@@ -672,7 +935,17 @@ def generate_suggestions(ticker: str, question: str) -> list:
 def read_root():
     return {
         "message": "FinancePilot API - Powered by Gemini 2.0 Flash + OpenSearch Vector DB",
-        "opensearch_status": "connected" if vector_db and vector_db.client else "disconnected"
+        "opensearch_status": "connected" if vector_db and vector_db.is_available() else "disconnected",
+        "vector_db_backend": vector_db.backend if vector_db else None
+    }
+
+
+def news_filters_from_request(request: dict) -> dict:
+    """Search filters from the optional tickers/sources/days request fields"""
+    return {
+        "tickers": [t.upper() for t in request.get("tickers") or []],
+        "source": request.get("sources"),
+        "days": request.get("days")
     }
 
 
@@ -683,11 +956,18 @@ def search_news(request: dict):
         query = request.get("query", "")
         k = request.get("k", 5)
         
-        if not vector_db or not vector_db.client:
-            return {"error": "OpenSearch not available", "results": []}
+        if not vector_db or not vector_db.is_available():
+            return {"error": "Vector DB not available", "results": []}
         
-        results = vector_db.hybrid_search("news_articles", query, k=k)
-        return {"results": results, "count": len(results)}
+        results, stats = vector_db.hybrid_search(
+            "news_articles", query, k=k,
+            knn_k=request.get("knn_k"),
+            bm25_k=request.get("bm25_k"),
+            oversample=request.get("oversample", 2),
+            with_stats=True,
+            filters=news_filters_from_request(request)
+        )
+        return {"results": results, "count": len(results), "latency": stats}
     except Exception as e:
         return {"error": str(e), "results": []}
 
@@ -702,9 +982,12 @@ def rag_query(request: dict):
         
         # Retrieve relevant context from OpenSearch
         relevant_articles = []
-        if vector_db and vector_db.client:
+        if vector_db and vector_db.is_available():
             try:
-                relevant_articles = vector_db.hybrid_search("news_articles", question, k=5)
+                relevant_articles = vector_db.hybrid_search(
+                    "news_articles", question, k=request.get("k", 5),
+                    filters=news_filters_from_request(request)
+                )
             except Exception as e:
                 print(f"RAG retrieval error: {e}")
         
@@ -760,30 +1043,162 @@ Answer:"""
         return {"error": str(e), "answer": "Error processing question"}
 
 
+@app.post("/correlation")
+def correlation_matrix(request: dict):
+    """Correlation and covariance of date-aligned daily log returns
+    
+    Body: {"tickers": [...], "period": "1y", "window": 30 (optional rolling
+    window in days)}. At most MAX_CORRELATION_TICKERS tickers. Results are
+    cached per ticker set and period.
+    """
+    tickers = normalize_tickers(request.get("tickers"))
+    if len(tickers) < 2:
+        raise HTTPException(status_code=400, detail="Provide at least two tickers")
+    if len(tickers) > MAX_CORRELATION_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CORRELATION_TICKERS} tickers per request")
+    window = request.get("window")
+    if window is not None and int(window) < 2:
+        raise HTTPException(status_code=400, detail="window must be at least 2 days")
+    try:
+        result = get_correlation(
+            tickers, request.get("period", "1y"), int(window) if window else None, loader=get_close_panel
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Correlation error: {str(e)}")
+    if len(result["tickers"]) < 2:
+        raise HTTPException(status_code=404, detail="Not enough price data for these tickers")
+    return result
+
+
+@app.post("/portfolio")
+def portfolio_analytics(request: dict):
+    """Risk and return analytics for a weighted portfolio
+    
+    Body: {"holdings": {"AAPL": 0.3, ...} or [{"ticker", "weight"}],
+    "period": "1y", "benchmark": "^GSPC", "confidence": 0.95,
+    "question": optional, answered by Gemini from the computed summary}.
+    Prices for every holding come from one batched, cached download.
+    """
+    try:
+        result = portfolio_report(
+            request.get("holdings"),
+            period=request.get("period", "1y"),
+            benchmark=request.get("benchmark", DEFAULT_BENCHMARK),
+            confidence=float(request.get("confidence", 0.95)),
+            loader=get_close_panel
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Portfolio error: {str(e)}")
+    
+    result["summary"] = summarize_portfolio(result, result["benchmark"])
+    question = request.get("question")
+    if question and model:
+        try:
+            # Gemini sees the computed summary, never the raw price panel
+            prompt = f"""You are a portfolio analyst. Answer using these computed portfolio statistics.
+
+{result["summary"]}
+
+User Question: {question}
+
+Instructions:
+1. Ground every number in the statistics above
+2. Use bullet points (•) for key points
+3. Be concise and explain risk terms briefly"""
+            result["answer"] = format_ai_response(model.generate_content(prompt).text.strip())
+        except Exception as e:
+            print(f"Gemini portfolio error: {e}")
+    return result
+
+
+@app.post("/screen")
+def screen_stocks(request: dict):
+    """Filter and sort the fundamentals snapshot
+    
+    Body: {"filters": [{"field": "trailingPE", "op": "lt", "value": 20},
+    {"field": "sector", "op": "in", "value": ["Technology"]}], "sort": "marketCap",
+    "descending": true, "limit": 20} or {"question": "tech stocks with P/E under 20"}.
+    """
+    snapshot = get_snapshot()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Screener snapshot is still loading")
+    
+    filters = request.get("filters")
+    sort, descending = request.get("sort"), request.get("descending", False)
+    if not filters and request.get("question"):
+        parsed = parse_screen_question(request["question"])
+        if not parsed:
+            raise HTTPException(status_code=400, detail="Could not find screening criteria in the question")
+        filters, sort, descending = parsed["filters"], parsed["sort"], parsed["descending"]
+    
+    try:
+        found = screen(snapshot, filters, sort, descending, limit=int(request.get("limit", 20)))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        **found,
+        "filters": filters or [],
+        "sort": sort,
+        "descending": descending,
+        "snapshot": snapshot_status(snapshot)
+    }
+
+
+@app.post("/backtest")
+def run_backtest(request: dict):
+    """Backtest a rule-based strategy on daily closes
+    
+    Body: {"ticker": "MSFT", "strategy": "ma_crossover" | "rsi" | "buy_and_hold"
+    | "rebalance", "params": {"fast": 50, "slow": 200}, "period": "10y",
+    "fee_bps": 5, "sweep": {"fast": [20, 50], "slow": [100, 200]} (optional,
+    best combination by "rank_by", default sharpe)}. For rebalance, params are
+    {"weights": {"SPY": 0.6, "TLT": 0.4}, "every": 21}.
+    """
+    strategy = request.get("strategy", "ma_crossover")
+    ticker = str(request.get("ticker") or "").strip().upper()
+    if not ticker and strategy != "rebalance":
+        raise HTTPException(status_code=400, detail="Provide a ticker")
+    try:
+        result = backtest_report(
+            ticker, strategy, request.get("params"),
+            period=request.get("period", "10y"),
+            fee_bps=float(request.get("fee_bps", 0.0)),
+            grid=request.get("sweep"),
+            rank_by=request.get("rank_by", "sharpe"),
+            loader=get_close_panel
+        )
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Backtest error: {str(e)}")
+    result["summary"] = summarize_backtest(result)
+    return result
+
+
 @app.get("/opensearch-status")
 def opensearch_status():
     """Check OpenSearch connection status"""
-    if not vector_db or not vector_db.client:
+    if not vector_db:
         return {"status": "disconnected", "message": "OpenSearch not available"}
     
     try:
-        info = vector_db.client.info()
-        return {
-            "status": "connected",
-            "cluster_name": info.get("cluster_name"),
-            "version": info.get("version", {}).get("number"),
-            "indices": {
-                "news_articles": vector_db.client.indices.exists(index="news_articles"),
-                "stock_data": vector_db.client.indices.exists(index="stock_data"),
-                "chat_history": vector_db.client.indices.exists(index="chat_history")
-            }
-        }
+        return vector_db.status()
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 @app.get("/market-news")
-def get_market_news():
-    """Get latest market news headlines using SerpAPI with Gemini summaries (cached)"""
+def get_market_news(background_tasks: BackgroundTasks, if_none_match: Optional[str] = Header(None)):
+    """Latest market news, with an ETag: a matching If-None-Match gets a 304"""
+    return conditional_response(load_market_news(background_tasks), if_none_match, cache_seconds_left(news_cache))
+
+
+def load_market_news(background_tasks: BackgroundTasks):
+    """Get latest market news headlines using SerpAPI with Gemini summaries (cached)
+
+    Fresh articles are indexed into the vector DB after the response is sent.
+    """
     try:
         # Check cache first
         if news_cache["data"] and news_cache["timestamp"]:
@@ -793,7 +1208,7 @@ def get_market_news():
                 return news_cache["data"]
         
         if not SERPAPI_KEY or SERPAPI_KEY == "your_serpapi_key_here":
-            return get_market_news_fallback()
+            return get_market_news_fallback(background_tasks)
         
         # Use SerpAPI to get stock market news with better parameters
         params = {
@@ -814,7 +1229,7 @@ def get_market_news():
             
             if not news_results:
                 print("No news results from SerpAPI, using fallback")
-                return get_market_news_fallback()
+                return get_market_news_fallback(background_tasks)
             
             all_news = []
             articles_to_summarize = []
@@ -876,12 +1291,9 @@ def get_market_news():
                                     break
                 except Exception as e:
                     print(f"Batch Gemini error: {e}")
-                
-                # Skip OpenSearch indexing to avoid timeouts
-                # Can be re-enabled when OpenSearch is properly set up
             
             print(f"✅ Fetched {len(all_news)} news articles from SerpAPI")
-            print(f"✅ Stored {len(all_news)} articles in OpenSearch vector DB")
+            background_tasks.add_task(index_news_articles, all_news)
             
             # Cache the result
             result = {"news": all_news}
@@ -891,14 +1303,33 @@ def get_market_news():
             return result
         else:
             print(f"SerpAPI returned status {response.status_code}, using fallback")
-            return get_market_news_fallback()
+            return get_market_news_fallback(background_tasks)
             
     except Exception as e:
         print(f"SerpAPI news fetch error: {e}")
-        return get_market_news_fallback()
+        return get_market_news_fallback(background_tasks)
 
 
-def get_market_news_fallback():
+def index_news_articles(articles: list) -> int:
+    """Store news articles in the vector DB so RAG queries can retrieve them"""
+    if not vector_db or not vector_db.is_available():
+        return 0
+    
+    stored = 0
+    for article in articles:
+        url = article.get("url", "#")
+        key = url if url != "#" else article.get("title", "")
+        doc_id = hashlib.md5(key.encode("utf-8")).hexdigest()
+        document = tag_article({k: v for k, v in article.items() if k != "index"})
+        if vector_db.index_document("news_articles", doc_id, document):
+            stored += 1
+    vector_db.refresh("news_articles")
+    if stored:
+        print(f"✅ Stored {stored} articles in {vector_db.backend} vector DB")
+    return stored
+
+
+def get_market_news_fallback(background_tasks: BackgroundTasks):
     """Fallback method using yfinance"""
     try:
         import yfinance as yf
@@ -933,6 +1364,7 @@ def get_market_news_fallback():
                 unique_news.append(article)
         
         unique_news.sort(key=lambda x: x["published"], reverse=True)
+        background_tasks.add_task(index_news_articles, unique_news[:10])
         return {"news": unique_news[:10]}
     except Exception as e:
         print(f"Fallback news fetch error: {e}")
@@ -1012,8 +1444,16 @@ Format the summary in clear paragraphs."""
 
 
 @app.get("/market-overview")
-def get_market_overview():
-    """Get top gainers, losers, and most active stocks"""
+def get_market_overview(if_none_match: Optional[str] = Header(None)):
+    """Top gainers, losers and most active, with an ETag: a matching
+    If-None-Match gets a 304"""
+    return conditional_response(load_market_overview(), if_none_match, cache_seconds_left(market_overview_cache))
+
+
+def load_market_overview():
+    """Get top gainers, losers, and most active stocks (cached)"""
+    if market_overview_cache["data"] and cache_seconds_left(market_overview_cache):
+        return market_overview_cache["data"]
     try:
         # Popular stocks to check
         tickers = [
@@ -1066,11 +1506,15 @@ def get_market_overview():
                        key=lambda x: x["change_pct"])[:5]
         active = sorted(all_stocks, key=lambda x: x["volume"], reverse=True)[:5]
         
-        return {
+        result = {
             "gainers": gainers,
             "losers": losers,
             "active": active
         }
+        if all_stocks:
+            market_overview_cache["data"] = result
+            market_overview_cache["timestamp"] = datetime.now()
+        return result
     except Exception as e:
         print(f"Market overview error: {e}")
         return {
@@ -1134,26 +1578,291 @@ If you need a stock ticker to answer, say so clearly.
         )
 
 @app.post("/query", response_model=QueryResponse)
-def query_stock(request: QueryRequest):
-    """Process natural language query about stocks with RAG (supports comparisons)"""
+def query_stock(request: QueryRequest, background_tasks: BackgroundTasks, accept: Optional[str] = Header(None)):
+    """Process natural language query about stocks with RAG (supports comparisons)
+    
+    Pass the returned session_id back on follow-ups: the conversation's ticker
+    carries over and the most relevant earlier turns are added to the prompt.
+    Send compact=true for columnar chart data, and Accept: application/msgpack
+    or application/vnd.apache.arrow.stream for binary responses.
+    """
+    session_id, session = conversation_memory.session(request.session_id)
+    turns = conversation_memory.relevant_turns(session_id, session, request.question)
+    
+    # A resent, unchanged sidebar ticker must not override tickers named in
+    # the question; it only fills in for follow-ups that name none
     result = parse_question_enhanced(
         request.question, 
-        request.ticker, 
+        conversation_memory.selected_ticker(session, request.ticker),
         request.period,
-        request.compare_tickers
+        request.compare_tickers,
+        memory_context=conversation_memory.format_context(turns),
+        session_ticker=session["ticker"] or session["client_ticker"],
+        indicators=request.indicators,
+        interval=request.interval or "1d"
     )
+    result["session_id"] = session_id
+    
+    # Long series are reduced to about max_points per series before serializing
+    max_points = DEFAULT_MAX_POINTS if request.max_points is None else request.max_points
+    result["data"], result["downsampled"] = downsample_chart_data(result["chart_type"], result["data"], max_points)
     
     # Add suggestions
-    if request.ticker:
-        result["suggestions"] = generate_suggestions(request.ticker, request.question)
+    used_ticker = result["tickers"][0] if len(result.get("tickers", [])) == 1 else None
+    if used_ticker:
+        result["suggestions"] = generate_suggestions(used_ticker, request.question)
     
     # Save to NocoDB
-    save_to_nocodb(request.question, request.ticker or "", result)
+    save_to_nocodb(request.question, used_ticker or "", result)
     
-    # Skip chat history storage to avoid timeouts
-    # Can be re-enabled when OpenSearch is properly set up
+    # Embedding and indexing the turn happens after the response is sent
+    turn = conversation_memory.remember(
+        session_id, session, request.question, result["answer"], result.get("tickers", [])
+    )
+    background_tasks.add_task(conversation_memory.store_turn, turn)
     
-    return result
+    if result.get("series") and not result.get("downsampled"):
+        result["data"], result["series"] = sync_series(result, request.known_series)
+    else:
+        result.pop("series", None)
+    
+    if request.compact:
+        result["data"] = compact_chart_data(result["data"])
+    return encode_response(QueryResponse(**result).model_dump(), accept)
+
+
+def sync_series(result: dict, known_series: list = None):
+    """Record a price chart's bars and, when the client already caches that
+    series, cut the data down to the bars it is missing.
+    
+    Returns (data, marker). Non-bar fields such as indicator overlays are
+    always sent in full.
+    """
+    series = {**result["series"], "chart_type": result["chart_type"]}
+    key = (series["ticker"], series["period"], series["interval"], series["chart_type"])
+    data = result["data"]
+    marker = {**series, **series_log.observe(key, data["dates"], data)}
+    
+    held = next((s for s in known_series or [] if isinstance(s, dict) and
+                 (s.get("ticker"), s.get("period"), s.get("interval"), s.get("chart_type")) == key), None)
+    if held:
+        start = series_log.delta_start(key, held.get("epoch"), held.get("revision"), held.get("last"))
+        if start is not None:
+            delta = {k: v for k, v in data.items() if k != "dates" and k not in BAR_COLUMNS}
+            delta.update(slice_bars(data, start))
+            delta["delta_from"] = data["dates"][start]
+            return delta, marker
+    return data, marker
+
+
+@app.get("/series/{ticker}")
+def get_series(ticker: str, period: str = "1mo", interval: str = "1d", epoch: str = None,
+               revision: int = None, last: str = None, compact: bool = True):
+    """OHLCV bars of one ticker, or only the bars a client is missing
+    
+    Pass the epoch, revision and last date from the previous response to
+    receive a delta: bars from "delta_from" onward replace the client's
+    bars from that date. Without them (or when the server cannot tell what
+    the client holds) the full series is returned.
+    """
+    ticker = ticker.strip().upper()
+    if not is_intraday(interval):
+        interval = "5m" if period == "1d" else "1d"
+    hist = fetch_history(yf.Ticker(ticker), ticker, period, interval)
+    if hist is None or hist.empty:
+        raise HTTPException(status_code=404, detail=f"No price history for {ticker}")
+    
+    key = (ticker, period, interval, "candlestick")
+    data = {
+        "dates": format_bar_dates(hist.index, interval),
+        "open": hist["Open"].tolist(),
+        "high": hist["High"].tolist(),
+        "low": hist["Low"].tolist(),
+        "close": hist["Close"].tolist(),
+        "volume": hist["Volume"].tolist()
+    }
+    marker = {"ticker": ticker, "period": period, "interval": interval, "chart_type": "candlestick",
+              **series_log.observe(key, data["dates"], data)}
+    start = series_log.delta_start(key, epoch, revision, last)
+    if start is not None:
+        data = {**slice_bars(data, start), "delta_from": data["dates"][start]}
+    return {"series": marker, "data": compact_chart_data(data) if compact else data}
+
+
+def quote_tickers(tickers: str) -> list:
+    try:
+        parsed = parse_tickers(tickers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="tickers is required, e.g. ?tickers=AAPL,MSFT")
+    return parsed
+
+
+@app.get("/quotes")
+def get_quotes(tickers: str, if_none_match: Optional[str] = Header(None)):
+    """Latest quotes, shared with every other client watching the same tickers
+    
+    Cache-Control max-age is the time until the oldest quote is refreshed,
+    so polling clients never ask more often than the poller fetches.
+    """
+    quotes = quote_hub.snapshot(quote_tickers(tickers))
+    now = datetime.now().timestamp()
+    max_age = min((quote_hub.interval - (now - q["updated"]) for q in quotes.values()), default=0)
+    payload = {"quotes": list(quotes.values()), "poll_seconds": quote_hub.interval}
+    return conditional_response(payload, if_none_match, max_age)
+
+
+@app.get("/quotes/stream")
+async def stream_quotes(tickers: str, request: Request):
+    """Server-sent events: a "quotes" event with the current quotes, then one per change"""
+    watched = quote_tickers(tickers)
+    stream = QuoteStream(quote_hub, watched)
+    
+    async def events():
+        try:
+            snapshot = await anyio.to_thread.run_sync(quote_hub.snapshot, watched)
+            yield f"event: quotes\ndata: {json.dumps(list(snapshot.values()))}\n\n"
+            while not await request.is_disconnected():
+                batch = await stream.next()
+                # Comment lines keep idle connections open through proxies
+                yield f"event: quotes\ndata: {json.dumps(batch)}\n\n" if batch else ": keep-alive\n\n"
+        finally:
+            stream.close()
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.websocket("/ws/quotes")
+async def quotes_socket(websocket: WebSocket, tickers: str = ""):
+    """WebSocket feed; send {"tickers": [...]} at any time to change the watched set"""
+    await websocket.accept()
+    try:
+        watched = parse_tickers(tickers)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    stream = QuoteStream(quote_hub, watched)
+    
+    async def receive_updates():
+        nonlocal watched
+        while True:
+            message = await websocket.receive_json()
+            try:
+                watched = parse_tickers(message.get("tickers", []))
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            stream.update(watched)
+            snapshot = await anyio.to_thread.run_sync(quote_hub.snapshot, watched)
+            await websocket.send_json({"type": "quotes", "quotes": list(snapshot.values())})
+    
+    receiver = asyncio.create_task(receive_updates())
+    try:
+        if watched:
+            snapshot = await anyio.to_thread.run_sync(quote_hub.snapshot, watched)
+            await websocket.send_json({"type": "quotes", "quotes": list(snapshot.values())})
+        while not receiver.done():
+            batch = await stream.next()
+            if batch:
+                await websocket.send_json({"type": "quotes", "quotes": batch})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        if receiver.done() and not receiver.cancelled():
+            receiver.exception()  # a disconnect, already handled
+        stream.close()
+
+
+@app.get("/quotes/stats")
+def quote_stats():
+    return {**quote_hub.stats(), "alerts": alert_engine.stats()}
+
+
+@app.post("/alerts")
+def create_alert(request: dict):
+    """Create a price alert
+    
+    Body: {"user": "u1", "ticker": "NVDA", "kind": "price_above", "threshold": 150, "note": ""}
+    or {"user": "u1", "text": "NVDA crosses 150"}. Kinds: price_above, price_below,
+    price_crosses (direction taken from the current price), change_pct_above and
+    change_pct_below (percent change from the previous close, e.g. -3).
+    """
+    try:
+        rule = parse_alert_text(request["text"]) if request.get("text") else {
+            "ticker": request.get("ticker", ""), "kind": request.get("kind", ""),
+            "threshold": request.get("threshold")
+        }
+        if rule["threshold"] is None:
+            raise ValueError("threshold is required")
+        ticker = rule["ticker"].strip().upper()
+        quote = quote_hub.snapshot([ticker]).get(ticker)
+        if quote is None:
+            raise HTTPException(status_code=404, detail=f"No quote for {ticker}")
+        created = alert_engine.add_rule(request.get("user", ""), ticker, rule["kind"], rule["threshold"],
+                                        request.get("note", ""), quote=quote)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"rule": created, "quote": quote}
+
+
+@app.get("/alerts")
+def list_alerts(user: str, include_inactive: bool = False):
+    return {"rules": alert_engine.list_rules(user, include_inactive)}
+
+
+@app.delete("/alerts/{rule_id}")
+def delete_alert(rule_id: int, user: str):
+    if not alert_engine.delete_rule(user, rule_id):
+        raise HTTPException(status_code=404, detail="No active alert with that id")
+    return {"status": "ok"}
+
+
+@app.get("/alerts/triggered")
+def triggered_alerts(user: str, after: int = 0, limit: int = 100):
+    """Triggered alerts with id > after; pass the last id seen to poll for new ones"""
+    return {"events": alert_engine.events(user, after, min(max(limit, 1), 500))}
+
+
+@app.get("/alerts/stream")
+async def stream_alerts(user: str, request: Request, after: int = None):
+    """Server-sent events: an "alerts" event per batch of triggered alerts
+    
+    With after, alerts triggered since that event id are sent first.
+    """
+    feed = AlertFeed(alert_engine, user)
+    
+    async def events():
+        try:
+            if after is not None:
+                missed = await anyio.to_thread.run_sync(alert_engine.events, user, after, 500)
+                if missed:
+                    yield f"event: alerts\ndata: {json.dumps(missed)}\n\n"
+            while not await request.is_disconnected():
+                batch = await feed.next(HEARTBEAT_SECONDS)
+                yield f"event: alerts\ndata: {json.dumps(batch)}\n\n" if batch else ": keep-alive\n\n"
+        finally:
+            feed.close()
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.delete("/session/{session_id}")
+def end_session(session_id: str):
+    """Forget a conversation's in-process state (e.g. when the chat is cleared)"""
+    conversation_memory.forget(session_id)
+    return {"status": "ok"}
+
+@app.get("/history/sink")
+def history_sink_status():
+    """Write-behind queue counters (sent, spooled, replayed, backlog)"""
+    if history_sink is None:
+        return {"message": "NocoDB not configured"}
+    return history_sink.stats()
+
 
 @app.get("/history")
 def get_history():
@@ -0,0 +1,88 @@
+"""Batched, cached daily close prices for multi-ticker analytics"""
+import threading
+import time
+
+import pandas as pd
+import yfinance as yf
+
+# Same freshness as the news cache in main.py
+CLOSE_CACHE_TTL = 300
+MAX_CACHED_SERIES = 5000
+
+# (ticker, period) -> (fetched_at, close Series indexed by date)
+_close_cache = {}
+_close_cache_lock = threading.Lock()
+
+
+def normalize_tickers(tickers) -> list:
+    """Upper-cased tickers with duplicates and blanks removed, order kept"""
+    seen = []
+    for ticker in tickers or []:
+        ticker = str(ticker).strip().upper()
+        if ticker and ticker not in seen:
+            seen.append(ticker)
+    return seen
+
+
+def _download_closes(tickers: list, period: str) -> dict:
+    """One batched yfinance request for every ticker's adjusted closes"""
+    try:
+        frame = yf.download(
+            tickers, period=period, interval="1d", auto_adjust=True,
+            progress=False, threads=True, group_by="column"
+        )
+    except Exception as e:
+        print(f"Batch download error: {e}")
+        return {}
+    if frame is None or frame.empty or "Close" not in frame:
+        return {}
+    closes = frame["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(tickers[0])
+    result = {}
+    for ticker in tickers:
+        if ticker in closes:
+            series = closes[ticker].dropna()
+            # Dates only, so tickers on different exchanges line up by day
+            series.index = pd.DatetimeIndex(series.index).tz_localize(None).normalize()
+            result[ticker] = series
+    return result
+
+
+def get_close_panel(tickers, period: str = "1y") -> dict:
+    """Adjusted daily closes per ticker ({ticker: Series}).
+
+    Series are cached per (ticker, period) for CLOSE_CACHE_TTL seconds, and
+    all tickers missing from the cache are fetched in a single batched
+    request. Tickers with no data are left out.
+    """
+    tickers = normalize_tickers(tickers)
+    now = time.time()
+    panel, missing = {}, []
+    with _close_cache_lock:
+        for ticker in tickers:
+            cached = _close_cache.get((ticker, period))
+            if cached and now - cached[0] < CLOSE_CACHE_TTL:
+                panel[ticker] = cached[1]
+            else:
+                missing.append(ticker)
+
+    if missing:
+        fetched = _download_closes(missing, period)
+        with _close_cache_lock:
+            for ticker, series in fetched.items():
+                _close_cache[(ticker, period)] = (now, series)
+            if len(_close_cache) > MAX_CACHED_SERIES:
+                # Drop the oldest fetches first
+                for key, _ in sorted(_close_cache.items(), key=lambda item: item[1][0])[:len(_close_cache) - MAX_CACHED_SERIES]:
+                    del _close_cache[key]
+        panel.update(fetched)
+
+    return {ticker: panel[ticker] for ticker in tickers if ticker in panel and not panel[ticker].empty}
+
+
+def closes_from_history(history) -> pd.Series:
+    """Close Series from a get_stock_data history frame, keyed by calendar date"""
+    series = history["Close"].dropna()
+    series.index = pd.DatetimeIndex(series.index).tz_localize(None).normalize()
+    return series
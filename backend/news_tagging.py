@@ -0,0 +1,104 @@
+"""Ticker and publish-date tagging for ingested news articles"""
+import re
+from datetime import datetime, timedelta
+
+# Company names that headlines use instead of symbols
+COMPANY_TICKERS = {
+    "apple": "AAPL", "microsoft": "MSFT", "alphabet": "GOOGL", "google": "GOOGL",
+    "amazon": "AMZN", "meta": "META", "facebook": "META", "nvidia": "NVDA",
+    "tesla": "TSLA", "netflix": "NFLX", "disney": "DIS", "paypal": "PYPL",
+    "intel": "INTC", "coinbase": "COIN", "snap": "SNAP", "palantir": "PLTR",
+    "rivian": "RIVN", "lucid": "LCID", "nio": "NIO", "alibaba": "BABA",
+    "jd.com": "JD", "pfizer": "PFE", "moderna": "MRNA", "boeing": "BA",
+    "general electric": "GE", "ford": "F", "broadcom": "AVGO", "oracle": "ORCL",
+    "salesforce": "CRM", "adobe": "ADBE", "berkshire": "BRK-B", "jpmorgan": "JPM",
+    "goldman sachs": "GS", "walmart": "WMT", "exxon": "XOM", "chevron": "CVX",
+    "advanced micro devices": "AMD",
+}
+
+KNOWN_TICKERS = set(COMPANY_TICKERS.values())
+
+# "$AAPL", "(NASDAQ: AAPL)", "(AAPL)" are unambiguous even for unknown symbols
+CASHTAG_PATTERN = re.compile(r"\$([A-Z]{1,5})\b")
+EXCHANGE_PATTERN = re.compile(r"\((?:NASDAQ|NYSE|AMEX|NYSEARCA)\s*:\s*([A-Z.\-]{1,6})\)")
+PAREN_PATTERN = re.compile(r"\(([A-Z]{1,5})\)")
+SYMBOL_PATTERN = re.compile(r"\b[A-Z]{2,5}\b")
+NAME_PATTERN = re.compile(r"\b(" + "|".join(re.escape(name) for name in COMPANY_TICKERS) + r")\b", re.IGNORECASE)
+
+RELATIVE_DATE_PATTERN = re.compile(r"(\d+)\s+(second|minute|min|hour|day|week|month|year)s?\s+ago", re.IGNORECASE)
+RELATIVE_UNITS = {
+    "second": timedelta(seconds=1), "minute": timedelta(minutes=1), "min": timedelta(minutes=1),
+    "hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1),
+    "month": timedelta(days=30), "year": timedelta(days=365),
+}
+DATE_FORMATS = [
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d",
+    "%m/%d/%Y, %I:%M %p, %z UTC",  # SerpAPI google news
+    "%b %d, %Y",
+    "%B %d, %Y",
+]
+
+
+def resolve_tickers(text: str, extra=None):
+    """Resolve the ticker symbols an article is about.
+
+    Bare uppercase words only count when they are known symbols, so acronyms
+    like "CEO" or "GDP" are not mistaken for tickers.
+    """
+    if not text:
+        return sorted(set(extra or []))
+    tickers = set(extra or [])
+    tickers.update(CASHTAG_PATTERN.findall(text))
+    tickers.update(EXCHANGE_PATTERN.findall(text))
+    tickers.update(t for t in PAREN_PATTERN.findall(text) if t in KNOWN_TICKERS)
+    tickers.update(t for t in SYMBOL_PATTERN.findall(text) if t in KNOWN_TICKERS)
+    tickers.update(COMPANY_TICKERS[name.lower()] for name in NAME_PATTERN.findall(text))
+    return sorted(tickers)
+
+
+def parse_published_date(value, now: datetime = None):
+    """Parse the publish dates our news sources emit into a naive datetime.
+
+    Handles relative SerpAPI dates ("3 hours ago", "yesterday"), yfinance's
+    "%Y-%m-%d %H:%M", epoch seconds and a few absolute formats. Returns None
+    when the value is unusable.
+    """
+    now = now or datetime.now()
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value) if value > 0 else None
+
+    text = str(value).strip()
+    lowered = text.lower()
+    if lowered in ("recently", "just now", "today"):
+        return now
+    if lowered == "yesterday":
+        return now - timedelta(days=1)
+
+    match = RELATIVE_DATE_PATTERN.search(text)
+    if match:
+        return now - int(match.group(1)) * RELATIVE_UNITS[match.group(2).lower()]
+
+    for fmt in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+            return parsed.replace(tzinfo=None)
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(text).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def tag_article(article: dict, now: datetime = None) -> dict:
+    """Return a copy of an article with tickers and published_at fields"""
+    tagged = dict(article)
+    text = f"{article.get('title', '')} {article.get('summary', '')}"
+    tagged["tickers"] = resolve_tickers(text, article.get("tickers") or article.get("relatedTickers"))
+    published = parse_published_date(article.get("published"), now)
+    tagged["published_at"] = published.isoformat() if published else None
+    return tagged
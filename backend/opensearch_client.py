@@ -1,12 +1,22 @@
 """OpenSearch Vector Database Client"""
 import os
-from opensearchpy import OpenSearch
-from sentence_transformers import SentenceTransformer
+from opensearchpy import OpenSearch, helpers
 from datetime import datetime
 import json
+import time
+
+from embeddings import EMBEDDING_DIM, load_embedding_model, get_quantization_mode, vector_payload
+from index_partitions import (
+    get_policy, partition_name, document_partition, window_partitions, expired_partitions, retention_due
+)
+from retrieval import (
+    reciprocal_rank_fusion, resolve_leg_sizes, run_search_legs, normalize_filters, build_filter_clauses
+)
 
 
 class OpenSearchVectorDB:
+    backend = "opensearch"
+
     def __init__(self):
         """Initialize OpenSearch client and embedding model"""
         self.host = os.getenv("OPENSEARCH_HOST", "localhost")
@@ -24,72 +34,183 @@ class OpenSearchVectorDB:
                 verify_certs=False,
                 ssl_show_warn=False
             )
+            # The constructor never touches the network, so ping before trusting it
+            if not self.client.ping(request_timeout=2):
+                raise ConnectionError("cluster did not answer ping")
             print(f"✅ OpenSearch connected to {self.host}:{self.port}")
         except Exception as e:
             print(f"⚠️ OpenSearch connection failed: {e}")
             self.client = None
         
         # Initialize embedding model
-        try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            print("✅ Sentence Transformer model loaded")
-        except Exception as e:
-            print(f"⚠️ Embedding model load failed: {e}")
-            self.model = None
+        self.model = load_embedding_model()
+        self.quantization = get_quantization_mode()
+        self.partitioned = set()
+        # HNSW graph parameters; set_ef_search overrides ef_search per query
+        self.hnsw = {
+            "m": int(os.getenv("OPENSEARCH_HNSW_M", "16")),
+            "ef_construction": int(os.getenv("OPENSEARCH_HNSW_EF_CONSTRUCTION", "128")),
+            "ef_search": int(os.getenv("OPENSEARCH_EF_SEARCH", "100")),
+        }
+        # index name -> ef_search sent with each knn query
+        self.ef_search = {}
+    
+    def is_available(self):
+        """Whether the cluster answered at startup"""
+        return self.client is not None
     
-    def create_index(self, index_name: str):
-        """Create an index with vector search capabilities"""
+    def _index_body(self, hnsw: dict):
+        """Settings and mappings shared by every vector index"""
+        return {
+            "settings": {
+                "index": {
+                    "knn": True,
+                    "knn.algo_param.ef_search": hnsw["ef_search"]
+                }
+            },
+            "mappings": {
+                "properties": {
+                    "embedding": self._embedding_mapping(hnsw),
+                    "text": {"type": "text"},
+                    "title": {"type": "text"},
+                    "summary": {"type": "text"},
+                    "url": {"type": "keyword"},
+                    "source": {"type": "keyword"},
+                    "tickers": {"type": "keyword"},
+                    # Raw source string ("2 hours ago"); published_at is the parsed date
+                    "published": {"type": "keyword"},
+                    "published_at": {"type": "date"},
+                    "timestamp": {"type": "date"},
+                    "type": {"type": "keyword"},
+                    # Conversation turns in chat_history
+                    "session_id": {"type": "keyword"},
+                    "turn_id": {"type": "keyword"},
+                    "question": {"type": "text"},
+                    "answer": {"type": "text"}
+                }
+            }
+        }
+    
+    def create_index(self, index_name: str, hnsw: dict = None):
+        """Create an index with vector search capabilities
+        
+        Names with a partition policy get an index template instead, so each
+        time partition is created on first write and joins the alias.
+        hnsw overrides m / ef_construction / ef_search for this index.
+        """
         if not self.client:
             return False
         
+        hnsw = {**self.hnsw, **(hnsw or {})}
         try:
-            if self.client.indices.exists(index=index_name):
-                print(f"Index '{index_name}' already exists")
+            policy = get_policy(index_name)
+            if policy and self.client.indices.exists(index=index_name) \
+                    and not self.client.indices.exists_alias(name=index_name):
+                print(f"⚠️ '{index_name}' is a monolithic index, partitioning disabled for it")
+                policy = None
+            
+            if not policy:
+                if self.client.indices.exists(index=index_name):
+                    print(f"Index '{index_name}' already exists")
+                    return True
+                self.client.indices.create(index=index_name, body=self._index_body(hnsw))
+                print(f"✅ Created index '{index_name}'")
                 return True
             
-            index_body = {
-                "settings": {
-                    "index": {
-                        "knn": True,
-                        "knn.algo_param.ef_search": 100
-                    }
-                },
-                "mappings": {
-                    "properties": {
-                        "embedding": {
-                            "type": "knn_vector",
-                            "dimension": 384,  # all-MiniLM-L6-v2 dimension
-                            "method": {
-                                "name": "hnsw",
-                                "space_type": "l2",
-                                "engine": "nmslib"
-                            }
-                        },
-                        "text": {"type": "text"},
-                        "title": {"type": "text"},
-                        "summary": {"type": "text"},
-                        "url": {"type": "keyword"},
-                        "source": {"type": "keyword"},
-                        "published": {"type": "date"},
-                        "timestamp": {"type": "date"},
-                        "type": {"type": "keyword"}
-                    }
-                }
-            }
+            template = self._index_body(hnsw)
+            template["aliases"] = {index_name: {}}
+            self.client.indices.put_index_template(
+                name=f"{index_name}-template",
+                body={"index_patterns": [f"{index_name}-*"], "template": template}
+            )
+            self.partitioned.add(index_name)
             
-            self.client.indices.create(index=index_name, body=index_body)
-            print(f"✅ Created index '{index_name}'")
+            # Create the current partition so the alias resolves before the first write
+            current = partition_name(index_name, datetime.now(), policy["granularity"])
+            if not self.client.indices.exists(index=current):
+                self.client.indices.create(index=current)
+            self.enforce_retention(index_name)
+            print(f"✅ Partitioned index '{index_name}' ready ({policy['granularity']}, "
+                  f"{policy['retention_days']}d retention)")
             return True
         except Exception as e:
             print(f"Error creating index: {e}")
             return False
     
+    def enforce_retention(self, index_name: str):
+        """Delete partitions of an index that are past its retention period"""
+        policy = get_policy(index_name)
+        if not self.client or index_name not in self.partitioned:
+            return []
+        try:
+            names = list(self.client.indices.get(index=f"{index_name}-*").keys())
+            expired = expired_partitions(names, index_name, policy)
+            if expired:
+                self.client.indices.delete(index=",".join(expired))
+                print(f"🗑️ Dropped {len(expired)} expired partitions of '{index_name}'")
+            return expired
+        except Exception as e:
+            print(f"Retention error: {e}")
+            return []
+    
+    def _search_target(self, index_name: str, filters: dict):
+        """Index expression and search keyword arguments covering only the
+        partitions a search needs (keyword arguments, so opensearch-py sends
+        the booleans as "true" rather than "True")"""
+        names = window_partitions(index_name, filters) if index_name in self.partitioned else None
+        if names is None:
+            return index_name, {}
+        return ",".join(names), {"ignore_unavailable": True, "allow_no_indices": True}
+    
+    def _embedding_mapping(self, hnsw: dict):
+        """knn_vector mapping for the configured quantization mode"""
+        mapping = {
+            "type": "knn_vector",
+            "dimension": EMBEDDING_DIM,
+            "method": {
+                "name": "hnsw",
+                "space_type": "l2",
+                # faiss (and lucene below) apply filters inside the HNSW
+                # traversal; nmslib can only post-filter
+                "engine": "faiss",
+                "parameters": {"m": hnsw["m"], "ef_construction": hnsw["ef_construction"]}
+            }
+        }
+        if self.quantization == "fp16":
+            # Faiss scalar quantizer stores each component in 2 bytes
+            mapping["method"]["engine"] = "faiss"
+            mapping["method"]["parameters"]["encoder"] = {"name": "sq", "parameters": {"type": "fp16"}}
+        elif self.quantization == "int8":
+            # Lucene byte vectors store each component in 1 byte
+            mapping["data_type"] = "byte"
+            mapping["method"]["engine"] = "lucene"
+        return mapping
+    
+    def set_ef_search(self, index_name: str, ef_search: int):
+        """Query-time HNSW beam width for searches of index_name, sent with
+        every knn query as method_parameters (OpenSearch 2.16+).
+
+        The index setting knn.algo_param.ef_search is ignored by lucene and,
+        depending on the version, by faiss. int8 indexes use lucene, whose
+        beam follows k, so this returns False there.
+        """
+        if not self.client or self.quantization == "int8":
+            return False
+        self.ef_search[index_name] = int(ef_search)
+        return True
+    
+    def _query_vector(self, query_text: str, query_vector=None):
+        """Embed the query text, unless a precomputed vector was given"""
+        if query_vector is not None:
+            return vector_payload(query_vector, self.quantization)
+        return self.embed_text(query_text)
+    
     def embed_text(self, text: str):
-        """Generate embedding for text"""
+        """Generate embedding for text, quantized for the index mapping"""
         if not self.model:
             return None
         try:
-            return self.model.encode(text).tolist()
+            return vector_payload(self.model.encode(text), self.quantization)
         except Exception as e:
             print(f"Embedding error: {e}")
             return None
@@ -100,100 +221,204 @@ class OpenSearchVectorDB:
             return False
         
         try:
+            target = index_name
+            if index_name in self.partitioned:
+                target = document_partition(index_name, document)
+                if target is None:
+                    return True  # Older than retention, would be dropped anyway
+            
             # Check if document already exists (skip re-indexing)
             if skip_if_exists:
                 try:
-                    if self.client.exists(index=index_name, id=doc_id):
+                    if self._document_exists(index_name, doc_id):
                         return True  # Already indexed
                 except:
                     pass
             
-            # Generate embedding from text
-            text_to_embed = document.get('text', document.get('summary', document.get('title', '')))
-            embedding = self.embed_text(text_to_embed)
+            # Generate embedding from text, unless the caller precomputed one
+            if document.get('embedding') is not None:
+                embedding = vector_payload(document['embedding'], self.quantization)
+            else:
+                text_to_embed = document.get('text', document.get('summary', document.get('title', '')))
+                embedding = self.embed_text(text_to_embed)
             
             if embedding:
                 document['embedding'] = embedding
                 document['timestamp'] = datetime.now().isoformat()
                 
                 self.client.index(
-                    index=index_name,
+                    index=target,
                     id=doc_id,
                     body=document,
                     refresh=False  # Don't refresh immediately for better performance
                 )
+                if target != index_name and retention_due(index_name):
+                    self.enforce_retention(index_name)
                 return True
         except Exception as e:
             print(f"Indexing error: {e}")
             return False
     
-    def search_similar(self, index_name: str, query_text: str, k: int = 5):
-        """Search for similar documents using vector similarity"""
-        if not self.client or not self.model:
+    def bulk_index(self, index_name: str, documents, chunk_size: int = 500):
+        """Index many (doc_id, document) pairs with batched embedding and _bulk requests
+        
+        Existing documents with the same ID are overwritten. Returns the number
+        of documents indexed.
+        """
+        if not self.client:
+            return 0
+        
+        documents = list(documents)
+        missing = [doc for _, doc in documents if doc.get('embedding') is None]
+        if missing and self.model:
+            texts = [doc.get('text', doc.get('summary', doc.get('title', ''))) for doc in missing]
+            for doc, vector in zip(missing, self.model.encode(texts, batch_size=64)):
+                doc['embedding'] = vector
+        
+        now = datetime.now().isoformat()
+        actions = []
+        for doc_id, doc in documents:
+            if doc.get('embedding') is None:
+                continue
+            target = document_partition(index_name, doc) if index_name in self.partitioned else index_name
+            if target is None:
+                continue
+            source = {**doc, 'embedding': vector_payload(doc['embedding'], self.quantization), 'timestamp': now}
+            actions.append({"_index": target, "_id": doc_id, "_source": source})
+        
+        try:
+            indexed, errors = helpers.bulk(
+                self.client, actions, chunk_size=chunk_size, raise_on_error=False, refresh=False
+            )
+            if errors:
+                print(f"Bulk indexing: {len(errors)} documents failed")
+            return indexed
+        except Exception as e:
+            print(f"Bulk indexing error: {e}")
+            return 0
+    
+    def _document_exists(self, index_name: str, doc_id: str):
+        """Existence check that also works across the partitions behind an alias"""
+        if index_name not in self.partitioned:
+            return self.client.exists(index=index_name, id=doc_id)
+        body = {"query": {"ids": {"values": [doc_id]}}}
+        return self.client.count(index=index_name, body=body)["count"] > 0
+    
+    def refresh(self, index_name: str):
+        """Make recently indexed documents searchable"""
+        if not self.client:
+            return
+        try:
+            self.client.indices.refresh(index=index_name)
+        except Exception as e:
+            print(f"Refresh error: {e}")
+    
+    def _knn_query(self, index_name: str, query_embedding, k: int, filters: dict):
+        """knn clause, with filters applied during the ANN search itself"""
+        knn = {"vector": query_embedding, "k": k}
+        if index_name in self.ef_search:
+            knn["method_parameters"] = {"ef_search": self.ef_search[index_name]}
+        clauses = build_filter_clauses(filters)
+        if clauses:
+            knn["filter"] = {"bool": {"filter": clauses}}
+        return {"knn": {"embedding": knn}}
+    
+    def search_similar(self, index_name: str, query_text: str, k: int = 5, filters: dict = None,
+                       query_vector=None):
+        """Search for similar documents using vector similarity
+        
+        filters may restrict tickers, source, type and a "days" window.
+        query_vector skips embedding query_text (used by the benchmarks).
+        """
+        if not self.client or (not self.model and query_vector is None):
             return []
         
         try:
-            query_embedding = self.embed_text(query_text)
+            query_embedding = self._query_vector(query_text, query_vector)
             if not query_embedding:
                 return []
             
             search_body = {
                 "size": k,
-                "query": {
-                    "knn": {
-                        "embedding": {
-                            "vector": query_embedding,
-                            "k": k
-                        }
-                    }
-                }
+                "_source": {"excludes": ["embedding"]},
+                "query": self._knn_query(index_name, query_embedding, k, normalize_filters(filters))
             }
             
-            response = self.client.search(index=index_name, body=search_body)
+            target, options = self._search_target(index_name, normalize_filters(filters))
+            response = self.client.search(index=target, body=search_body, **options)
             return [hit['_source'] for hit in response['hits']['hits']]
         except Exception as e:
             print(f"Search error: {e}")
             return []
     
-    def hybrid_search(self, index_name: str, query_text: str, k: int = 5):
-        """Hybrid search combining vector and keyword search"""
-        if not self.client or not self.model:
-            return []
+    def hybrid_search(self, index_name: str, query_text: str, k: int = 5, knn_k: int = None,
+                      bm25_k: int = None, oversample: int = 2, with_stats: bool = False,
+                      filters: dict = None, query_vector=None):
+        """Hybrid search: kNN and BM25 legs run concurrently, fused with RRF
         
-        try:
-            query_embedding = self.embed_text(query_text)
+        Each leg fetches knn_k / bm25_k candidates (default k * oversample).
+        filters apply to both legs (see search_similar).
+        With with_stats=True, returns (results, stats) including per-leg latency.
+        """
+        if not self.client:
+            return ([], {}) if with_stats else []
+        
+        knn_k, bm25_k = resolve_leg_sizes(k, knn_k, bm25_k, oversample)
+        filters = normalize_filters(filters)
+        target, options = self._search_target(index_name, filters)
+        source_filter = {"excludes": ["embedding"]}
+        
+        def knn_leg():
+            query_embedding = self._query_vector(query_text, query_vector)
             if not query_embedding:
                 return []
-            
-            search_body = {
-                "size": k,
+            body = {
+                "size": knn_k,
+                "_source": source_filter,
+                "query": self._knn_query(index_name, query_embedding, knn_k, filters)
+            }
+            return self.client.search(index=target, body=body, **options)['hits']['hits']
+        
+        def bm25_leg():
+            body = {
+                "size": bm25_k,
+                "_source": source_filter,
                 "query": {
                     "bool": {
-                        "should": [
-                            {
-                                "knn": {
-                                    "embedding": {
-                                        "vector": query_embedding,
-                                        "k": k
-                                    }
-                                }
-                            },
-                            {
-                                "multi_match": {
-                                    "query": query_text,
-                                    "fields": ["title^3", "summary^2", "text"]
-                                }
+                        "must": {
+                            "multi_match": {
+                                "query": query_text,
+                                "fields": ["title^3", "summary^2", "text"]
                             }
-                        ]
+                        },
+                        "filter": build_filter_clauses(filters)
                     }
                 }
             }
-            
-            response = self.client.search(index=index_name, body=search_body)
-            return [hit['_source'] for hit in response['hits']['hits']]
+            return self.client.search(index=target, body=body, **options)['hits']['hits']
+        
+        try:
+            start = time.perf_counter()
+            legs, latencies = run_search_legs({"knn": knn_leg, "bm25": bm25_leg})
+            sources = {}
+            for hits in legs.values():
+                for hit in hits:
+                    sources.setdefault(hit['_id'], hit['_source'])
+            fused = reciprocal_rank_fusion(
+                [[hit['_id'] for hit in legs["knn"]], [hit['_id'] for hit in legs["bm25"]]], k
+            )
+            results = [sources[doc_id] for doc_id, _ in fused]
+            stats = {
+                "knn_ms": latencies["knn"],
+                "bm25_ms": latencies["bm25"],
+                "total_ms": (time.perf_counter() - start) * 1000,
+                "knn_hits": len(legs["knn"]),
+                "bm25_hits": len(legs["bm25"])
+            }
+            return (results, stats) if with_stats else results
         except Exception as e:
             print(f"Hybrid search error: {e}")
-            return []
+            return ([], {}) if with_stats else []
     
     def get_document(self, index_name: str, doc_id: str):
         """Get a specific document by ID"""
@@ -201,6 +426,10 @@ class OpenSearchVectorDB:
             return None
         
         try:
+            if index_name in self.partitioned:
+                body = {"size": 1, "query": {"ids": {"values": [doc_id]}}}
+                hits = self.client.search(index=index_name, body=body)['hits']['hits']
+                return hits[0]['_source'] if hits else None
             response = self.client.get(index=index_name, id=doc_id)
             return response['_source']
         except Exception as e:
@@ -213,6 +442,12 @@ class OpenSearchVectorDB:
             return False
         
         try:
+            if index_name in self.partitioned:
+                self.client.indices.delete(index=f"{index_name}-*")
+                self.client.indices.delete_index_template(name=f"{index_name}-template")
+                self.partitioned.discard(index_name)
+                print(f"✅ Deleted partitioned index '{index_name}'")
+                return True
             if self.client.indices.exists(index=index_name):
                 self.client.indices.delete(index=index_name)
                 print(f"✅ Deleted index '{index_name}'")
@@ -220,14 +455,48 @@ class OpenSearchVectorDB:
         except Exception as e:
             print(f"Delete index error: {e}")
             return False
+    
+    def status(self):
+        """Summarize cluster and index state for the status endpoint"""
+        if not self.client:
+            return {"status": "disconnected", "message": "OpenSearch not available"}
+        
+        info = self.client.info()
+        return {
+            "status": "connected",
+            "cluster_name": info.get("cluster_name"),
+            "version": info.get("version", {}).get("number"),
+            "indices": {
+                name: self.client.indices.exists(index=name)
+                for name in ("news_articles", "stock_data", "chat_history")
+            },
+            "partitions": {
+                name: sorted(self.client.indices.get(index=f"{name}-*").keys())
+                for name in sorted(self.partitioned)
+            }
+        }
 
 
 # Global instance
 vector_db = None
 
 def get_vector_db():
-    """Get or create OpenSearch vector DB instance"""
+    """Get or create the vector DB instance.
+    
+    VECTOR_DB_BACKEND selects "opensearch", "local" or "auto" (default), which
+    uses OpenSearch when the cluster is reachable and the embedded local index
+    otherwise.
+    """
     global vector_db
     if vector_db is None:
-        vector_db = OpenSearchVectorDB()
+        backend = os.getenv("VECTOR_DB_BACKEND", "auto").lower()
+        model = None
+        if backend in ("auto", "opensearch"):
+            db = OpenSearchVectorDB()
+            if db.client or backend == "opensearch":
+                vector_db = db
+            model = db.model
+        if vector_db is None:
+            from local_vector_db import LocalVectorDB
+            vector_db = LocalVectorDB(model=model)
     return vector_db
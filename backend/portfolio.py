@@ -0,0 +1,228 @@
+"""Portfolio analytics over an aligned daily returns panel
+
+Everything is computed from the (days x holdings) simple-returns matrix with
+matrix-vector products, so the cost grows linearly with the number of
+holdings: the full covariance matrix is never formed. Risk contributions use
+cov(R_i, portfolio) = R_c^T p_c / (T - 1) directly.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+DEFAULT_BENCHMARK = "^GSPC"
+# Gaps up to this many days (holidays, halts) are forward-filled
+MAX_FILL_DAYS = 5
+# Holdings with less coverage than this over the period are reported, not used
+MIN_COVERAGE = 0.9
+
+PANEL_CACHE_TTL = 300
+MAX_CACHED_PANELS = 50
+_panel_cache = {}
+_panel_cache_lock = threading.Lock()
+
+
+def parse_holdings(holdings):
+    """Tickers and weights from {"AAPL": 0.3, ...} or [{"ticker", "weight"}].
+
+    Weights may be fractions, percentages or position values; they are
+    normalized to sum to 1. Duplicate tickers are merged.
+    """
+    if isinstance(holdings, dict):
+        items = holdings.items()
+    elif isinstance(holdings, list):
+        items = [(h.get("ticker"), h.get("weight", h.get("value"))) for h in holdings if isinstance(h, dict)]
+    else:
+        raise ValueError("holdings must be an object or a list of {ticker, weight}")
+
+    merged = {}
+    for ticker, weight in items:
+        ticker = str(ticker or "").strip().upper()
+        if not ticker or weight is None:
+            continue
+        merged[ticker] = merged.get(ticker, 0.0) + float(weight)
+    total = sum(merged.values())
+    if not merged or abs(total) < 1e-12:
+        raise ValueError("holdings need at least one ticker with a non-zero weight")
+    tickers = list(merged)
+    return tickers, np.array([merged[t] for t in tickers]) / total
+
+
+def aligned_returns(closes: dict, tickers: list, benchmark: str):
+    """Daily simple returns on the benchmark's trading calendar.
+
+    Returns (dates, used tickers, returns (T x N), benchmark returns or None,
+    excluded tickers).
+    """
+    available = [t for t in tickers if t in closes]
+    if not available:
+        return pd.DatetimeIndex([]), [], np.zeros((0, 0)), None, list(tickers)
+    frame = pd.concat([closes[t] for t in available], axis=1, keys=available)
+    if benchmark in closes:
+        calendar = closes[benchmark].index
+        frame = frame.reindex(calendar)
+    frame = frame.ffill(limit=MAX_FILL_DAYS)
+
+    prices = frame.to_numpy(dtype=np.float64)
+    coverage = np.isfinite(prices).mean(axis=0) if len(prices) else np.zeros(len(available))
+    keep = coverage >= MIN_COVERAGE
+    prices = prices[:, keep]
+    used = [t for t, k in zip(available, keep) if k]
+    excluded = [t for t in tickers if t not in used]
+
+    # Start where every kept holding has a price
+    complete = np.isfinite(prices).all(axis=1)
+    first = int(np.argmax(complete)) if complete.any() else len(prices)
+    prices, dates = prices[first:], frame.index[first:]
+    complete = np.isfinite(prices).all(axis=1)
+    prices, dates = prices[complete], dates[complete]
+    returns = prices[1:] / prices[:-1] - 1.0 if len(prices) > 1 else np.zeros((0, prices.shape[1]))
+
+    benchmark_returns = None
+    if benchmark in closes and len(dates) > 1:
+        bench = closes[benchmark].reindex(dates).ffill().to_numpy(dtype=np.float64)
+        benchmark_returns = bench[1:] / bench[:-1] - 1.0
+    return dates[1:], used, returns, benchmark_returns, excluded
+
+
+def get_returns_panel(tickers: list, period: str, benchmark: str, loader):
+    """aligned_returns for a holdings set, cached per (tickers, period, benchmark)"""
+    key = (tuple(sorted(tickers)), period, benchmark)
+    now = time.time()
+    with _panel_cache_lock:
+        cached = _panel_cache.get(key)
+    if cached and now - cached[0] < PANEL_CACHE_TTL:
+        return cached[1]
+    closes = loader(list(key[0]) + [benchmark], period)
+    panel = aligned_returns(closes, list(key[0]), benchmark)
+    with _panel_cache_lock:
+        _panel_cache[key] = (now, panel)
+        if len(_panel_cache) > MAX_CACHED_PANELS:
+            oldest = min(_panel_cache, key=lambda k: _panel_cache[k][0])
+            del _panel_cache[oldest]
+    return panel
+
+
+def max_drawdown(returns, dates):
+    """Largest peak-to-trough fall of the compounded return series"""
+    # Index 0 is the starting value, before the first return
+    wealth = np.concatenate(([1.0], np.cumprod(1.0 + returns)))
+    drawdowns = wealth / np.maximum.accumulate(wealth) - 1.0
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(wealth[:trough + 1]))
+    return {
+        "max_drawdown": float(drawdowns[trough]),
+        "peak_date": dates[peak - 1].strftime("%Y-%m-%d") if peak else None,
+        "trough_date": dates[trough - 1].strftime("%Y-%m-%d") if trough else None,
+    }
+
+
+def historical_var(returns, confidence: float):
+    """One-day historical VaR and expected shortfall, as positive losses"""
+    cutoff = np.quantile(returns, 1.0 - confidence)
+    tail = returns[returns <= cutoff]
+    return float(-cutoff), float(-tail.mean()) if len(tail) else float(-cutoff)
+
+
+def analyze_portfolio(dates, tickers: list, weights, returns, benchmark_returns=None,
+                      confidence: float = 0.95, top: int = 10):
+    """Return, volatility, beta, drawdown, risk contributions and VaR"""
+    count = returns.shape[0]
+    if count < 2:
+        raise ValueError("Not enough overlapping price history for these holdings")
+
+    portfolio = returns @ weights
+    centered = returns - returns.mean(axis=0)
+    portfolio_centered = portfolio - portfolio.mean()
+    variance = float(portfolio_centered @ portfolio_centered / (count - 1))
+    volatility = np.sqrt(variance)
+
+    # Euler decomposition: w_i * cov(R_i, p) / sigma_p sums to sigma_p
+    covariance_with_portfolio = centered.T @ portfolio_centered / (count - 1)
+    contributions = weights * covariance_with_portfolio / volatility if volatility > 0 else np.zeros(len(weights))
+    shares = contributions / volatility if volatility > 0 else contributions
+
+    result = {
+        "holdings": len(tickers),
+        "observations": int(count),
+        "start": dates[0].strftime("%Y-%m-%d"),
+        "end": dates[-1].strftime("%Y-%m-%d"),
+        "total_return": float(np.prod(1.0 + portfolio) - 1.0),
+        "annualized_return": float((1.0 + portfolio).prod() ** (TRADING_DAYS / count) - 1.0),
+        "annualized_volatility": float(volatility * np.sqrt(TRADING_DAYS)),
+        **max_drawdown(portfolio, dates),
+    }
+    var, expected_shortfall = historical_var(portfolio, confidence)
+    result.update({"confidence": confidence, "var_1d": var, "expected_shortfall_1d": expected_shortfall})
+
+    if benchmark_returns is not None and len(benchmark_returns) == count:
+        bench_centered = benchmark_returns - benchmark_returns.mean()
+        bench_variance = float(bench_centered @ bench_centered / (count - 1))
+        if bench_variance > 0:
+            result["beta"] = float(portfolio_centered @ bench_centered / (count - 1) / bench_variance)
+            holding_betas = centered.T @ bench_centered / (count - 1) / bench_variance
+        result["benchmark_return"] = float(np.prod(1.0 + benchmark_returns) - 1.0)
+
+    order = np.argsort(-np.abs(shares))[:top]
+    result["top_risk_contributors"] = [
+        {
+            "ticker": tickers[i],
+            "weight": round(float(weights[i]), 6),
+            "risk_share": round(float(shares[i]), 6),
+            **({"beta": round(float(holding_betas[i]), 4)} if "beta" in result else {}),
+        }
+        for i in order
+    ]
+    return result
+
+
+def summarize(result: dict, benchmark: str) -> str:
+    """Compact plain-text summary for the LLM prompt"""
+    lines = [
+        f"Portfolio of {result['holdings']} holdings, {result['start']} to {result['end']} "
+        f"({result['observations']} trading days)",
+        f"- Total return: {result['total_return'] * 100:+.2f}% "
+        f"(annualized {result['annualized_return'] * 100:+.2f}%)",
+        f"- Annualized volatility: {result['annualized_volatility'] * 100:.2f}%",
+        f"- Max drawdown: {result['max_drawdown'] * 100:.2f}% "
+        f"(peak {result['peak_date'] or 'start'}, trough {result['trough_date'] or 'none'})",
+        f"- 1-day historical VaR ({result['confidence'] * 100:.0f}%): {result['var_1d'] * 100:.2f}%, "
+        f"expected shortfall {result['expected_shortfall_1d'] * 100:.2f}%",
+    ]
+    if "beta" in result:
+        lines.append(f"- Beta vs {benchmark}: {result['beta']:.2f} "
+                     f"(benchmark return {result['benchmark_return'] * 100:+.2f}%)")
+    top = ", ".join(f"{h['ticker']} {h['risk_share'] * 100:.1f}% of risk at {h['weight'] * 100:.1f}% weight"
+                    for h in result["top_risk_contributors"][:5])
+    lines.append(f"- Largest risk contributors: {top}")
+    if result.get("excluded"):
+        lines.append(f"- Excluded for missing data: {', '.join(result['excluded'][:10])}")
+    return "\n".join(lines)
+
+
+def portfolio_report(holdings, period: str = "1y", benchmark: str = DEFAULT_BENCHMARK,
+                     confidence: float = 0.95, loader=None) -> dict:
+    """Parse holdings, load the aligned panel and compute every metric"""
+    tickers, weights = parse_holdings(holdings)
+    benchmark = (benchmark or DEFAULT_BENCHMARK).upper()
+    dates, used, returns, benchmark_returns, _ = get_returns_panel(tickers, period, benchmark, loader)
+    if not used:
+        raise ValueError("No price data for any of the holdings")
+
+    # Panel columns are in sorted order; excluded holdings drop out and the
+    # remaining weights are renormalized
+    weight_by_ticker = dict(zip(tickers, weights))
+    used_weights = np.array([weight_by_ticker[t] for t in used if t in weight_by_ticker])
+    columns = [i for i, t in enumerate(used) if t in weight_by_ticker]
+    used = [used[i] for i in columns]
+    returns = returns[:, columns]
+    if abs(used_weights.sum()) < 1e-12:
+        raise ValueError("Holdings with price data have zero net weight")
+    used_weights = used_weights / used_weights.sum()
+
+    result = analyze_portfolio(dates, used, used_weights, returns, benchmark_returns, confidence)
+    result["benchmark"] = benchmark
+    result["excluded"] = [t for t in tickers if t not in used]
+    return result
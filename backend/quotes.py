@@ -0,0 +1,216 @@
+"""Shared live quote poller with WebSocket / SSE fan-out
+
+One background thread polls the union of every subscriber's tickers in a
+single batched yfinance request per interval, and pushes the quotes that
+changed to each subscriber watching them. Snapshot reads (GET /quotes)
+reuse quotes younger than the interval and fetch stale tickers in one
+coalesced request. Upstream cost therefore follows the number of unique
+tickers, not the number of connected clients.
+"""
+import asyncio
+import itertools
+import os
+import threading
+import time
+
+import pandas as pd
+import yfinance as yf
+
+from market_data import normalize_tickers
+
+QUOTE_POLL_SECONDS = float(os.getenv("QUOTE_POLL_SECONDS", "15"))
+MAX_QUOTE_TICKERS = int(os.getenv("MAX_QUOTE_TICKERS", "25"))
+# Idle streams get a comment line this often so proxies keep them open
+HEARTBEAT_SECONDS = 15
+
+
+def fetch_quotes(tickers: list) -> dict:
+    """Latest price per ticker from one batched daily-bar request"""
+    if not tickers:
+        return {}
+    try:
+        frame = yf.download(
+            tickers, period="5d", interval="1d", auto_adjust=False,
+            progress=False, threads=True, group_by="column"
+        )
+    except Exception as e:
+        print(f"Quote fetch error: {e}")
+        return {}
+    if frame is None or frame.empty or "Close" not in frame:
+        return {}
+    closes, volumes = frame["Close"], frame.get("Volume")
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(tickers[0])
+        volumes = volumes.to_frame(tickers[0]) if volumes is not None else None
+    now = time.time()
+    quotes = {}
+    for ticker in tickers:
+        if ticker not in closes:
+            continue
+        series = closes[ticker].dropna()
+        if series.empty:
+            continue
+        price = float(series.iloc[-1])
+        previous = float(series.iloc[-2]) if len(series) > 1 else price
+        volume = volumes[ticker].dropna() if volumes is not None and ticker in volumes else None
+        quotes[ticker] = {
+            "ticker": ticker,
+            "price": round(price, 4),
+            "previous_close": round(previous, 4),
+            "change": round(price - previous, 4),
+            "change_pct": round((price / previous - 1) * 100, 2) if previous else 0.0,
+            "volume": int(volume.iloc[-1]) if volume is not None and len(volume) else 0,
+            "session": str(series.index[-1].date()),
+            "updated": now,
+        }
+    return quotes
+
+
+def parse_tickers(value) -> list:
+    """Ticker list from "AAPL,MSFT" or a list; ValueError past MAX_QUOTE_TICKERS"""
+    if isinstance(value, str):
+        value = value.replace(" ", ",").split(",")
+    tickers = normalize_tickers(value)
+    if len(tickers) > MAX_QUOTE_TICKERS:
+        raise ValueError(f"At most {MAX_QUOTE_TICKERS} tickers per subscription")
+    return tickers
+
+
+def _changed(old, new) -> bool:
+    return old is None or (old["price"], old["volume"], old["session"]) != (new["price"], new["volume"], new["session"])
+
+
+class QuoteHub:
+    """Latest quotes for every watched ticker, refreshed by one poll thread"""
+
+    def __init__(self, fetch=fetch_quotes, interval: float = QUOTE_POLL_SECONDS):
+        self.fetch = fetch
+        self.interval = interval
+        self.quotes = {}
+        self.upstream_requests = 0
+        self.tickers_fetched = 0
+        self._subscribers = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def watched(self) -> list:
+        with self._lock:
+            return sorted({t for tickers, _ in self._subscribers.values() for t in tickers})
+
+    def subscribe(self, tickers: list, callback) -> int:
+        """Register callback(quotes) for updates to tickers; returns a token"""
+        with self._lock:
+            token = next(self._ids)
+            self._subscribers[token] = (set(tickers), callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._poll_loop, name="quote-poller", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return token
+
+    def update_subscription(self, token: int, tickers: list):
+        with self._lock:
+            if token in self._subscribers:
+                self._subscribers[token] = (set(tickers), self._subscribers[token][1])
+        self._wake.set()
+
+    def unsubscribe(self, token: int):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def _refresh(self, tickers: list) -> dict:
+        """Fetch tickers whose quote is older than the interval; returns the changed ones"""
+        with self._fetch_lock:
+            # Concurrent callers wait here and then find the quotes fresh
+            now = time.time()
+            stale = [t for t in tickers if now - self.quotes.get(t, {}).get("updated", 0) >= self.interval]
+            if not stale:
+                return {}
+            fetched = self.fetch(stale)
+            self.upstream_requests += 1
+            self.tickers_fetched += len(stale)
+            changed = {}
+            with self._lock:
+                for ticker, quote in fetched.items():
+                    if _changed(self.quotes.get(ticker), quote):
+                        changed[ticker] = quote
+                    self.quotes[ticker] = quote
+        if changed:
+            self._publish(changed)
+        return changed
+
+    def snapshot(self, tickers: list) -> dict:
+        """Quotes for tickers, fetching only the stale ones"""
+        self._refresh(tickers)
+        with self._lock:
+            return {t: self.quotes[t] for t in tickers if t in self.quotes}
+
+    def _publish(self, changed: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for tickers, callback in subscribers:
+            batch = [quote for ticker, quote in changed.items() if ticker in tickers]
+            if batch:
+                try:
+                    callback(batch)
+                except Exception as e:
+                    print(f"Quote subscriber error: {e}")
+
+    def _poll_loop(self):
+        while True:
+            tickers = self.watched()
+            if tickers:
+                try:
+                    self._refresh(tickers)
+                except Exception as e:
+                    print(f"Quote poll error: {e}")
+            self._wake.wait(self.interval if tickers else None)
+            self._wake.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscribers = len(self._subscribers)
+        return {
+            "subscribers": subscribers,
+            "watched_tickers": len(self.watched()),
+            "poll_seconds": self.interval,
+            "upstream_requests": self.upstream_requests,
+            "tickers_fetched": self.tickers_fetched,
+        }
+
+
+class QuoteStream:
+    """One client's quote feed as an asyncio queue, filled from the poll thread.
+
+    A slow client loses its oldest batches rather than growing the queue.
+    """
+
+    def __init__(self, hub: QuoteHub, tickers: list, maxsize: int = 32):
+        self.hub = hub
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.token = hub.subscribe(tickers, self._push)
+
+    def _push(self, quotes: list):
+        self.loop.call_soon_threadsafe(self._offer, quotes)
+
+    def _offer(self, quotes: list):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(quotes)
+
+    def update(self, tickers: list):
+        self.hub.update_subscription(self.token, tickers)
+
+    async def next(self, timeout: float = HEARTBEAT_SECONDS):
+        """Next batch of quotes, or None after timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self.token)
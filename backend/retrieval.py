@@ -0,0 +1,85 @@
+"""Retrieval helpers shared by the vector DB backends"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Standard RRF damping constant (Cormack et al.); larger values flatten the
+# advantage of top ranks
+RRF_RANK_CONSTANT = 60
+
+# Hybrid search runs its kNN and BM25 legs side by side on this pool
+_leg_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search-leg")
+
+
+def reciprocal_rank_fusion(ranked_lists, k: int, rank_constant: int = RRF_RANK_CONSTANT):
+    """Fuse several ranked ID lists into one, ignoring their raw scores.
+
+    Each ID scores sum(1 / (rank_constant + rank)) over the lists it appears
+    in, so BM25 and L2 scores never have to share a scale.
+    """
+    scores = {}
+    for ranked in ranked_lists:
+        for rank, doc_id in enumerate(ranked, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rank_constant + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run_search_legs(legs: dict):
+    """Run named zero-argument search callables concurrently.
+
+    Returns ({name: result}, {name: latency_ms}). A failing leg yields an
+    empty result so the other leg can still answer.
+    """
+    futures = {name: _leg_executor.submit(_timed, fn) for name, fn in legs.items()}
+    results, latencies = {}, {}
+    for name, future in futures.items():
+        try:
+            results[name], latencies[name] = future.result()
+        except Exception as e:
+            print(f"{name} search leg error: {e}")
+            results[name], latencies[name] = [], None
+    return results, latencies
+
+
+def resolve_leg_sizes(k: int, knn_k: int = None, bm25_k: int = None, oversample: int = 2):
+    """Per-leg candidate counts: explicit sizes win, else k * oversample"""
+    oversample = max(1, oversample or 1)
+    return knn_k or k * oversample, bm25_k or k * oversample
+
+
+# Keyword fields that search filters may constrain
+FILTER_FIELDS = ("tickers", "source", "type", "session_id")
+DEFAULT_DATE_FIELD = "published_at"
+
+
+def normalize_filters(filters: dict):
+    """Drop empty values and turn scalars into lists.
+
+    Recognized keys are the FILTER_FIELDS, "days" (a window ending now) and
+    "date_field" (which date the window applies to, default published_at).
+    """
+    if not filters:
+        return {}
+    normalized = {}
+    for field in FILTER_FIELDS:
+        value = filters.get(field)
+        if value:
+            normalized[field] = list(value) if isinstance(value, (list, tuple, set)) else [value]
+    if filters.get("days"):
+        normalized["days"] = float(filters["days"])
+        normalized["date_field"] = filters.get("date_field", DEFAULT_DATE_FIELD)
+    return normalized
+
+
+def build_filter_clauses(filters: dict):
+    """OpenSearch bool.filter clauses for normalized filters"""
+    clauses = [{"terms": {field: filters[field]}} for field in FILTER_FIELDS if field in filters]
+    if "days" in filters:
+        minutes = int(filters["days"] * 24 * 60)
+        clauses.append({"range": {filters["date_field"]: {"gte": f"now-{minutes}m"}}})
+    return clauses
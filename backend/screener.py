@@ -0,0 +1,373 @@
+"""Columnar fundamentals snapshot and stock screener
+
+The snapshot holds one NumPy column per stock.info field for the whole
+universe, refreshed nightly and persisted to disk. Each numeric column has
+a sorted index (argsort order + sorted values), so a range condition is two
+binary searches instead of a scan, and sorting a result is a walk over the
+precomputed order. Screens never call yfinance.
+"""
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import yfinance as yf
+
+SNAPSHOT_DIR = os.getenv("SCREENER_DATA_PATH", os.path.join(os.path.dirname(__file__), "screener_data"))
+SNAPSHOT_MAX_AGE = 24 * 3600
+REFRESH_HOUR = int(os.getenv("SCREENER_REFRESH_HOUR", "2"))
+FETCH_WORKERS = 8
+
+# stock.info fields kept per ticker
+NUMERIC_FIELDS = (
+    "currentPrice", "marketCap", "trailingPE", "forwardPE", "priceToBook", "trailingEps",
+    "dividendYield", "beta", "profitMargins", "revenueGrowth", "fiftyTwoWeekHigh",
+    "fiftyTwoWeekLow", "averageVolume",
+)
+TEXT_FIELDS = ("shortName", "sector", "industry")
+
+# Large US companies; override with SCREENER_UNIVERSE_FILE (one ticker per line)
+DEFAULT_UNIVERSE = [
+    "AAPL", "MSFT", "GOOGL", "AMZN", "META", "NVDA", "TSLA", "AVGO", "ORCL", "CRM",
+    "ADBE", "AMD", "INTC", "CSCO", "IBM", "QCOM", "TXN", "NFLX", "DIS", "PYPL",
+    "COIN", "SNAP", "PLTR", "UBER", "SHOP", "NOW", "INTU", "AMAT", "MU", "ADI",
+    "JPM", "BAC", "WFC", "GS", "MS", "C", "BLK", "SCHW", "AXP", "V",
+    "MA", "BRK-B", "JNJ", "PFE", "MRK", "ABBV", "LLY", "UNH", "MRNA", "TMO",
+    "ABT", "BMY", "AMGN", "GILD", "CVS", "XOM", "CVX", "COP", "SLB", "OXY",
+    "WMT", "COST", "HD", "LOW", "TGT", "KO", "PEP", "PG", "MCD", "SBUX",
+    "NKE", "PM", "MO", "CL", "BA", "GE", "CAT", "DE", "HON", "LMT",
+    "RTX", "UPS", "FDX", "F", "GM", "RIVN", "LCID", "NIO", "BABA", "JD",
+    "T", "VZ", "TMUS", "NEE", "DUK", "SO", "PLD", "AMT", "O", "SPG",
+]
+
+# Ops accepted in filters; "between" takes [low, high], "in" a list of labels
+NUMERIC_OPS = ("lt", "lte", "gt", "gte", "eq", "between")
+
+
+def load_universe():
+    path = os.getenv("SCREENER_UNIVERSE_FILE")
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return [line.strip().upper() for line in f if line.strip() and not line.startswith("#")]
+    return list(DEFAULT_UNIVERSE)
+
+
+class FundamentalsSnapshot:
+    """One array per field, row i describing tickers[i]"""
+
+    def __init__(self, tickers, numeric: dict, text: dict, refreshed_at: float):
+        self.tickers = np.asarray(tickers, dtype=str)
+        self.numeric = {field: np.asarray(numeric[field], dtype=np.float64) for field in NUMERIC_FIELDS}
+        self.text = {field: np.asarray(text[field], dtype=str) for field in TEXT_FIELDS}
+        self.refreshed_at = refreshed_at
+        # Sorted indexes; NaN (missing) sorts last and is cut off by `valid`
+        self.order, self.sorted_values, self.valid = {}, {}, {}
+        for field, values in self.numeric.items():
+            order = np.argsort(values, kind="stable")
+            self.order[field] = order
+            self.sorted_values[field] = values[order]
+            self.valid[field] = int(np.count_nonzero(~np.isnan(values)))
+        self.lowered = {field: np.char.lower(values) for field, values in self.text.items()}
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def range_mask(self, field: str, low: float = -np.inf, high: float = np.inf,
+                   include_low: bool = True, include_high: bool = True):
+        """Rows with low <(=) value <(=) high, found by binary search"""
+        values = self.sorted_values[field][:self.valid[field]]
+        start = np.searchsorted(values, low, side="left" if include_low else "right")
+        end = np.searchsorted(values, high, side="right" if include_high else "left")
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.order[field][start:end]] = True
+        return mask
+
+    def text_mask(self, field: str, labels):
+        """Rows whose field contains any of the labels (case-insensitive)"""
+        mask = np.zeros(len(self), dtype=bool)
+        for label in labels:
+            mask |= np.char.find(self.lowered[field], str(label).lower()) >= 0
+        return mask
+
+    def save(self, directory: str = SNAPSHOT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "fundamentals.npz")
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, tickers=self.tickers, refreshed_at=self.refreshed_at,
+                 **{f"num_{k}": v for k, v in self.numeric.items()},
+                 **{f"txt_{k}": v for k, v in self.text.items()})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, directory: str = SNAPSHOT_DIR):
+        path = os.path.join(directory, "fundamentals.npz")
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as stored:
+                numeric = {k: stored[f"num_{k}"] if f"num_{k}" in stored else np.full(len(stored["tickers"]), np.nan)
+                           for k in NUMERIC_FIELDS}
+                text = {k: stored[f"txt_{k}"] if f"txt_{k}" in stored else np.full(len(stored["tickers"]), "")
+                        for k in TEXT_FIELDS}
+                return cls(stored["tickers"], numeric, text, float(stored["refreshed_at"]))
+        except Exception as e:
+            print(f"Screener snapshot load error: {e}")
+            return None
+
+
+def _fetch_info(ticker: str):
+    try:
+        return ticker, yf.Ticker(ticker).info or {}
+    except Exception as e:
+        print(f"Screener info error for {ticker}: {e}")
+        return ticker, None
+
+
+def build_snapshot(universe=None) -> FundamentalsSnapshot:
+    """Fetch stock.info for the universe (in parallel) into columns"""
+    universe = universe or load_universe()
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        infos = [(t, info) for t, info in executor.map(_fetch_info, universe) if info]
+    numeric = {field: [] for field in NUMERIC_FIELDS}
+    text = {field: [] for field in TEXT_FIELDS}
+    for ticker, info in infos:
+        for field in NUMERIC_FIELDS:
+            value = info.get(field)
+            try:
+                value = float(value) if value is not None else np.nan
+            except (TypeError, ValueError):
+                value = np.nan
+            if field == "dividendYield" and not np.isnan(value):
+                value *= 100  # stored as a percentage, like the rest of the app shows it
+            numeric[field].append(value)
+        for field in TEXT_FIELDS:
+            text[field].append(str(info.get(field) or ""))
+    return FundamentalsSnapshot([t for t, _ in infos], numeric, text, time.time())
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_refresh_thread = None
+
+
+def get_snapshot():
+    return _snapshot
+
+
+def refresh_snapshot(universe=None):
+    """Rebuild, swap in and persist the snapshot"""
+    global _snapshot
+    start = time.perf_counter()
+    snapshot = build_snapshot(universe)
+    if not len(snapshot):
+        print("⚠️ Screener refresh returned no data, keeping previous snapshot")
+        return _snapshot
+    with _snapshot_lock:
+        _snapshot = snapshot
+    try:
+        snapshot.save()
+    except Exception as e:
+        print(f"Screener snapshot save error: {e}")
+    print(f"✅ Screener snapshot refreshed: {len(snapshot)} tickers in {time.perf_counter() - start:.1f}s")
+    return snapshot
+
+
+def _seconds_until_refresh(now: datetime = None):
+    now = now or datetime.now()
+    next_run = now.replace(hour=REFRESH_HOUR, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+def _refresh_loop():
+    if _snapshot is None or time.time() - _snapshot.refreshed_at > SNAPSHOT_MAX_AGE:
+        try:
+            refresh_snapshot()
+        except Exception as e:
+            print(f"Screener refresh error: {e}")
+    while True:
+        time.sleep(_seconds_until_refresh())
+        try:
+            refresh_snapshot()
+        except Exception as e:
+            print(f"Screener refresh error: {e}")
+
+
+def start_screener():
+    """Load the persisted snapshot and start the nightly refresh thread"""
+    global _snapshot, _refresh_thread
+    _snapshot = FundamentalsSnapshot.load()
+    if _snapshot is not None:
+        print(f"✅ Screener snapshot loaded: {len(_snapshot)} tickers")
+    if _refresh_thread is None:
+        _refresh_thread = threading.Thread(target=_refresh_loop, name="screener-refresh", daemon=True)
+        _refresh_thread.start()
+
+
+def screen(snapshot: FundamentalsSnapshot, filters=None, sort: str = None, descending: bool = False,
+           limit: int = 20):
+    """Rows passing every filter, optionally ordered by a numeric field.
+
+    filters: [{"field": "trailingPE", "op": "lt", "value": 20},
+              {"field": "sector", "op": "in", "value": ["Technology"]}, ...]
+    Rows missing a filtered or sorted field are excluded / sorted last.
+    """
+    if filters and not isinstance(filters, (list, tuple)):
+        raise ValueError("filters must be a list of {\"field\", \"op\", \"value\"} objects")
+    mask = np.ones(len(snapshot), dtype=bool)
+    for condition in filters or []:
+        if not isinstance(condition, dict) or "field" not in condition:
+            raise ValueError(f"Each filter needs a \"field\", got {condition!r}")
+        field, op, value = condition.get("field"), condition.get("op", "eq"), condition.get("value")
+        if field in snapshot.numeric:
+            if op not in NUMERIC_OPS:
+                raise ValueError(f"Unsupported operator '{op}' for {field}")
+            if op == "between":
+                low, high = value
+                mask &= snapshot.range_mask(field, float(low), float(high))
+            elif op == "eq":
+                mask &= snapshot.range_mask(field, float(value), float(value))
+            elif op in ("lt", "lte"):
+                mask &= snapshot.range_mask(field, high=float(value), include_high=op == "lte")
+            else:
+                mask &= snapshot.range_mask(field, low=float(value), include_low=op == "gte")
+        elif field in snapshot.text:
+            labels = value if isinstance(value, (list, tuple)) else [value]
+            mask &= snapshot.text_mask(field, labels)
+        else:
+            raise ValueError(f"Unknown screen field '{field}'")
+
+    if sort:
+        if sort not in snapshot.numeric:
+            raise ValueError(f"Cannot sort by '{sort}'")
+        order = snapshot.order[sort][:snapshot.valid[sort]]
+        if descending:
+            order = order[::-1]
+        rows = order[mask[order]]
+        # Matching rows without a value for the sort field go last
+        missing = snapshot.order[sort][snapshot.valid[sort]:]
+        rows = np.concatenate((rows, missing[mask[missing]]))
+    else:
+        rows = np.flatnonzero(mask)
+
+    total = len(rows)
+    rows = rows[:limit]
+    results = []
+    for row in rows:
+        record = {"ticker": str(snapshot.tickers[row])}
+        record.update({field: str(snapshot.text[field][row]) for field in TEXT_FIELDS})
+        for field in NUMERIC_FIELDS:
+            value = snapshot.numeric[field][row]
+            record[field] = None if np.isnan(value) else float(value)
+        results.append(record)
+    return {"total": total, "results": results}
+
+
+# Natural-language screens: "tech stocks with P/E under 20 and dividend yield above 2%"
+FIELD_PATTERNS = [
+    (r"forward\s*p\s*/?\s*e", "forwardPE"),
+    (r"p\s*/\s*e|pe ratio|\bpe\b|price[- ]to[- ]earnings", "trailingPE"),
+    (r"p\s*/\s*b|price[- ]to[- ]book", "priceToBook"),
+    (r"market\s*cap(?:italization)?", "marketCap"),
+    (r"dividend(?:\s*yield)?|yield", "dividendYield"),
+    (r"\bbeta\b", "beta"),
+    (r"\beps\b|earnings per share", "trailingEps"),
+    (r"profit\s*margins?|margins?", "profitMargins"),
+    (r"revenue\s*growth", "revenueGrowth"),
+    (r"\bprice\b|trading at", "currentPrice"),
+]
+COMPARATORS = [
+    (r"under|below|less than|lower than|<=?|at most|no more than", "lt"),
+    (r"over|above|more than|greater than|higher than|>=?|at least", "gt"),
+]
+SECTOR_KEYWORDS = {
+    "tech": "Technology", "technology": "Technology", "software": "Technology", "semiconductor": "Technology",
+    "health": "Healthcare", "healthcare": "Healthcare", "pharma": "Healthcare", "biotech": "Healthcare",
+    "bank": "Financial Services", "financial": "Financial Services", "energy": "Energy", "oil": "Energy",
+    "consumer": "Consumer", "retail": "Consumer Cyclical", "industrial": "Industrials",
+    "utility": "Utilities", "utilities": "Utilities", "real estate": "Real Estate", "reit": "Real Estate",
+    "telecom": "Communication Services", "communication": "Communication Services", "media": "Communication Services",
+}
+SCALE_SUFFIXES = {"k": 1e3, "thousand": 1e3, "m": 1e6, "million": 1e6, "b": 1e9, "bn": 1e9,
+                  "billion": 1e9, "t": 1e12, "tn": 1e12, "trillion": 1e12}
+NUMBER_PATTERN = r"\$?\s*(\d+(?:\.\d+)?)\s*(%|k|thousand|m|million|bn|b|billion|tn|t|trillion)?\b"
+# "over 10 years" is a time span, not a threshold
+NOT_A_SPAN = r"(?!\s*(?:years?|yrs?|months?|weeks?|days?|quarters?)\b)"
+SORT_PATTERNS = [
+    (r"(highest|largest|biggest|top)\s+(?:\w+\s+){0,2}?(dividend|yield)", "dividendYield", True),
+    (r"(lowest|cheapest)\s+(?:\w+\s+){0,2}?(p\s*/\s*e|pe|valuation)", "trailingPE", False),
+    (r"(largest|biggest|highest)\s+(?:\w+\s+){0,2}?(market cap|companies)", "marketCap", True),
+    (r"(smallest)\s+(?:\w+\s+){0,2}?(market cap|companies)", "marketCap", False),
+    (r"(lowest|least)\s+(?:\w+\s+){0,2}?(beta|volatile|risk)", "beta", False),
+    (r"(highest|most)\s+(?:\w+\s+){0,2}?(beta|volatile)", "beta", True),
+]
+
+
+def parse_screen_question(question: str):
+    """Filters and sort for a screening question, or None if it is not one"""
+    q_lower = question.lower()
+    filters = []
+    for field_pattern, field in FIELD_PATTERNS:
+        for comparator_pattern, op in COMPARATORS:
+            match = re.search(rf"(?:{field_pattern})[^.,;]{{0,20}}?(?:{comparator_pattern})\s*{NUMBER_PATTERN}{NOT_A_SPAN}", q_lower)
+            if not match:
+                continue
+            value = float(match.group(1))
+            unit = match.group(2)
+            if unit and unit != "%":
+                value *= SCALE_SUFFIXES[unit]
+            elif field == "marketCap" and value < 1e6:
+                value *= 1e9  # "market cap over 100" means billions
+            if field in ("profitMargins", "revenueGrowth"):
+                value /= 100  # yfinance stores these as fractions
+            if not any(f["field"] == field for f in filters):
+                filters.append({"field": field, "op": op, "value": value})
+            break
+
+    sectors = sorted({sector for keyword, sector in SECTOR_KEYWORDS.items() if re.search(rf"\b{keyword}", q_lower)})
+    if sectors:
+        filters.append({"field": "sector", "op": "in", "value": sectors})
+
+    sort, descending = None, False
+    for pattern, field, desc in SORT_PATTERNS:
+        if re.search(pattern, q_lower):
+            sort, descending = field, desc
+            break
+
+    numeric_filters = [f for f in filters if f["field"] in NUMERIC_FIELDS]
+    asks_for_list = re.search(r"\b(stocks|companies|names|shares)\b", q_lower)
+    if not numeric_filters and not (sort and asks_for_list):
+        return None
+    if sort is None:
+        # Most useful default: biggest companies first
+        sort, descending = "marketCap", True
+    return {"filters": filters, "sort": sort, "descending": descending}
+
+
+def describe_filters(filters) -> str:
+    """Human-readable form of a filter list"""
+    names = {"lt": "<", "lte": "<=", "gt": ">", "gte": ">=", "eq": "="}
+    parts = []
+    for f in filters:
+        if f["op"] == "in":
+            parts.append(f"{f['field']} in {', '.join(f['value'])}")
+        elif f["op"] == "between":
+            parts.append(f"{f['value'][0]:g} <= {f['field']} <= {f['value'][1]:g}")
+        else:
+            parts.append(f"{f['field']} {names[f['op']]} {f['value']:g}")
+    return "; ".join(parts) if parts else "no filters"
+
+
+def snapshot_status(snapshot) -> dict:
+    if snapshot is None:
+        return {"status": "loading", "tickers": 0}
+    return {
+        "status": "ready",
+        "tickers": len(snapshot),
+        "refreshed_at": datetime.fromtimestamp(snapshot.refreshed_at).isoformat(timespec="seconds"),
+        "fields": list(NUMERIC_FIELDS) + list(TEXT_FIELDS),
+    }
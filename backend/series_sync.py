@@ -0,0 +1,111 @@
+"""Revision tracking for delta-synced price series
+
+The server remembers the last bars it sent for each (ticker, period,
+interval). When a refresh changes bars the client may already hold (a
+split or dividend adjustment, a corrected print), the series revision is
+bumped and the first changed date is logged. A client that reports the
+revision and last date it holds then receives only the bars from
+min(its last date, the earliest correction since its revision) onward. Its
+last bar is always resent because it may still have been forming.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+BAR_COLUMNS = ("open", "high", "low", "close", "volume")
+MAX_TRACKED_SERIES = 500
+# Corrections remembered per series; older client revisions get a full resend
+MAX_REVISION_LOG = 20
+# Relative change below which a re-fetched price counts as unchanged
+TOLERANCE = 1e-9
+
+
+class SeriesLog:
+    """Last-sent bars, revision and correction log per series key.
+
+    Revisions restart with the process, so markers carry an epoch that
+    changes on every start; a client with another epoch gets a full resend.
+    """
+
+    def __init__(self, max_series: int = MAX_TRACKED_SERIES):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.max_series = max_series
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, key, dates: list, columns: dict) -> dict:
+        """Record the current bars for key; returns its sync marker
+        {"epoch", "revision", "start", "last", "count"}"""
+        values = {name: np.array([np.nan if v is None else v for v in columns[name]], dtype=np.float64)
+                  for name in BAR_COLUMNS if name in columns}
+        with self._lock:
+            entry = self._series.get(key)
+            if entry is None:
+                entry = {"revision": 1, "log": []}
+            else:
+                changed = self._first_correction(entry, dates, values)
+                if changed is not None:
+                    entry["revision"] += 1
+                    entry["log"] = (entry["log"] + [(entry["revision"], changed)])[-MAX_REVISION_LOG:]
+            entry["dates"], entry["values"] = list(dates), values
+            self._series[key] = entry
+            self._series.move_to_end(key)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+            return {"epoch": self.epoch, "revision": entry["revision"], "start": dates[0] if dates else None,
+                    "last": dates[-1] if dates else None, "count": len(dates)}
+
+    @staticmethod
+    def _first_correction(entry: dict, dates: list, values: dict):
+        """Earliest date before the previous last bar that changed or vanished.
+
+        Bars that slid out of the front of the window are not corrections.
+        """
+        old_dates = entry["dates"]
+        if not old_dates or not dates:
+            return None
+        new_index = {d: i for i, d in enumerate(dates)}
+        held = [(i, d) for i, d in enumerate(old_dates[:-1]) if d >= dates[0]]
+        corrections = [d for _, d in held if d not in new_index]
+        pairs = [(new_index[d], i) for i, d in held if d in new_index]
+        if pairs:
+            new_rows = np.array([p[0] for p in pairs])
+            old_rows = np.array([p[1] for p in pairs])
+            differs = np.zeros(len(pairs), dtype=bool)
+            for name, column in values.items():
+                old = entry["values"].get(name)
+                if old is not None:
+                    differs |= ~np.isclose(column[new_rows], old[old_rows], rtol=TOLERANCE, atol=0.0, equal_nan=True)
+            if differs.any():
+                corrections.append(dates[new_rows[int(np.argmax(differs))]])
+        return min(corrections) if corrections else None
+
+    def delta_start(self, key, epoch: str, revision, last: str):
+        """Index of the first bar to send a client at (epoch, revision, last),
+        or None when it needs the full series"""
+        with self._lock:
+            entry = self._series.get(key)
+            if entry is None or epoch != self.epoch or not revision or not last:
+                return None
+            if revision > entry["revision"]:
+                return None
+            # Labels are "YYYY-MM-DD HH:MM"; accept the ISO "T" separator too
+            from_date = last.replace("T", " ")
+            if revision < entry["revision"]:
+                corrections = [date for rev, date in entry["log"] if rev > revision]
+                if len(corrections) < entry["revision"] - revision:
+                    # Part of the log was dropped
+                    return None
+                from_date = min([from_date] + corrections)
+            dates = entry["dates"]
+        if from_date < dates[0] or from_date > dates[-1]:
+            return None
+        return int(np.searchsorted(np.array(dates), from_date, side="left"))
+
+
+def slice_bars(data: dict, start: int) -> dict:
+    """The bar columns (and dates) of a price-chart payload from index start"""
+    return {key: values[start:] for key, values in data.items()
+            if key == "dates" or key in BAR_COLUMNS}
@@ -3,7 +3,9 @@ import streamlit as st
 from components.sidebar import render_sidebar
 from components.market_overview import render_market_overview
 from components.news_feed import render_news_feed
+from components.watchlist import render_watchlist, watchlist_url
 from components.chat_interface import render_chat_messages, handle_chat_input
+from components.api_client import prefetch_json, completed_order
 
 # Page config
 st.set_page_config(
@@ -26,6 +28,8 @@ if "active_tab" not in st.session_state:
     st.session_state.active_tab = "chat"
 if "news_loaded" not in st.session_state:
     st.session_state.news_loaded = False
+if "session_id" not in st.session_state:
+    st.session_state.session_id = None
 
 # Title
 st.title("📈 FinancePilot")
@@ -44,9 +48,25 @@ with tab1:
 with tab2:
     # Only load when tab is clicked
     if st.session_state.get("news_loaded", False):
-        render_market_overview(API_URL)
-        st.markdown("---")
-        render_news_feed(API_URL)
+        # Panels load concurrently; each renders in its own slot as its data arrives
+        panels = {
+            watchlist_url(API_URL): (10, render_watchlist),
+            f"{API_URL}/market-overview": (10, render_market_overview),
+            f"{API_URL}/market-news": (60, render_news_feed),
+        }
+        prefetch_json({url: timeout for url, (timeout, _) in panels.items()})
+        slots = {}
+        for idx, url in enumerate(panels):
+            if idx:
+                st.markdown("---")
+            slot = st.container()
+            slots[url] = (slot, slot.empty())
+            slots[url][1].caption("⏳ Loading...")
+        for url in completed_order(list(panels)):
+            slot, placeholder = slots[url]
+            placeholder.empty()
+            with slot:
+                panels[url][1](API_URL)
     else:
         # Show loading button
         st.markdown("### 📰 Market News & Overview")
@@ -56,7 +76,7 @@ with tab2:
             st.rerun()
 
 # Sidebar (outside tabs)
-ticker, period = render_sidebar()
+ticker, period = render_sidebar(API_URL)
 
 # Handle quick questions from sidebar and suggestions (outside tabs)
 if st.session_state.quick_question:
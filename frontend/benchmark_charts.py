@@ -0,0 +1,112 @@
+"""Chart benchmark: figure build time and serialized size per chart type
+
+Builds each chart from synthetic data shaped like the /query payloads and
+reports, per chart type and size:
+  - ms to build the figure (memoization bypassed)
+  - serialized figure size (what st.plotly_chart sends to the browser)
+  - trace type (Scatter = SVG, Scattergl = WebGL)
+Pass --svg to force SVG traces everywhere for a before/after comparison.
+
+Usage:
+    python benchmark_charts.py
+    python benchmark_charts.py --bars 500 2500 10000 --tickers 5 --repeat 5
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from components import charts
+
+
+def price_data(bars, seed=1):
+    rng = np.random.default_rng(seed)
+    dates = np.datetime_as_string(
+        np.busday_offset("2000-01-03", np.arange(bars), roll="forward"), unit="D"
+    ).tolist()
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, bars)))
+    spread = np.abs(rng.normal(0, 0.01, bars)) * close
+    return {
+        "dates": dates,
+        "open": np.round(close - spread / 2, 4).tolist(),
+        "high": np.round(close + spread, 4).tolist(),
+        "low": np.round(close - spread, 4).tolist(),
+        "close": np.round(close, 4).tolist(),
+        "volume": rng.integers(1_000_000, 90_000_000, bars).tolist(),
+        "overlays": {"SMA 50": np.round(close, 4).tolist()},
+    }
+
+
+def comparison_data(bars, tickers):
+    data = {}
+    for i in range(tickers):
+        series = price_data(bars, seed=i + 10)
+        data[f"TICK{i}"] = {"dates": series["dates"], "close": series["close"], "volume": series["volume"],
+                            "price": series["close"][-1], "pe_ratio": 25.0, "market_cap_b": 900.0,
+                            "dividend_yield": 0.6}
+    return data
+
+
+def scatter_data(bars, seed=3):
+    rng = np.random.default_rng(seed)
+    x = np.round(rng.normal(0, 1.5, bars), 4)
+    y = np.round(0.8 * x + rng.normal(0, 1, bars), 4)
+    dates = price_data(bars)["dates"]
+    return {"tickers": ["AAA", "BBB"], "x": x.tolist(), "y": y.tolist(), "dates": dates,
+            "beta": 0.8, "correlation": 0.77}
+
+
+def cases(bars, tickers):
+    price = price_data(bars)
+    comparison = comparison_data(bars, tickers)
+    return {
+        "line": (charts.create_line_chart, price),
+        "candlestick": (charts.create_candlestick_chart, price),
+        "volume": (charts.create_volume_chart, price),
+        "comparison": (charts.create_comparison_chart, comparison),
+        "performance_comparison": (charts.create_performance_comparison, comparison),
+        "volume_comparison": (charts.create_volume_comparison, comparison),
+        "scatter": (charts.create_scatter_plot, scatter_data(bars)),
+    }
+
+
+def measure(create, data, repeat):
+    build = create.__wrapped__
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fig = build(data)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    return fig, elapsed, len(fig.to_json())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, nargs="+", default=[500, 2500, 10000])
+    parser.add_argument("--tickers", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--svg", action="store_true", help="never switch to WebGL traces")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    if args.svg:
+        charts.WEBGL_MIN_POINTS = float("inf")
+
+    rows = []
+    for bars in args.bars:
+        for name, (create, data) in cases(bars, args.tickers).items():
+            fig, build_ms, size = measure(create, data, args.repeat)
+            rows.append({"chart": name, "bars": bars, "build_ms": build_ms, "json_bytes": size,
+                         "trace": type(fig.data[0]).__name__})
+
+    print(f"\n{'chart':<24} {'bars':>7} {'build ms':>9} {'JSON KB':>9}  trace")
+    for row in rows:
+        print(f"{row['chart']:<24} {row['bars']:>7} {row['build_ms']:>9.1f} "
+              f"{row['json_bytes'] / 1024:>9.1f}  {row['trace']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,66 @@
 """Chart creation functions"""
+import functools
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+MAX_CACHED_FIGURES = 64
+# SVG scatter traces slow the browser down past a few thousand points
+WEBGL_MIN_POINTS = 2000
+
+_figure_cache = OrderedDict()
+_figure_lock = threading.Lock()
+
+
+def memoized_figure(create):
+    """Reuse the figure built earlier for identical chart data.
+
+    Figures are keyed by the builder and a hash of its arguments, shared
+    across sessions and bounded LRU. Callers must not mutate the result.
+    """
+    @functools.wraps(create)
+    def wrapper(*args):
+        encoded = json.dumps(args, sort_keys=True, default=str, separators=(",", ":")).encode()
+        key = (create.__name__, hashlib.blake2b(encoded, digest_size=16).digest())
+        with _figure_lock:
+            fig = _figure_cache.get(key)
+            if fig is not None:
+                _figure_cache.move_to_end(key)
+                return fig
+        fig = create(*args)
+        with _figure_lock:
+            _figure_cache[key] = fig
+            while len(_figure_cache) > MAX_CACHED_FIGURES:
+                _figure_cache.popitem(last=False)
+        return fig
+    return wrapper
+
 
+def _scatter_trace(points):
+    """go.Scattergl for figures of WEBGL_MIN_POINTS points or more, else go.Scatter"""
+    return go.Scattergl if points >= WEBGL_MIN_POINTS else go.Scatter
+
+
+@memoized_figure
 def create_comparison_chart(data):
     """Create comparison chart for multiple stocks"""
     fig = go.Figure()
     
     colors = ['#00ff00', '#ff6b6b', '#4ecdc4', '#ffe66d', '#a8dadc']
     
+    trace = _scatter_trace(sum(len(stock_data["close"]) for stock_data in data.values()))
     for idx, (ticker, stock_data) in enumerate(data.items()):
-        fig.add_trace(go.Scatter(
+        fig.add_trace(trace(
             x=stock_data["dates"],
             y=stock_data["close"],
             mode="lines",
             name=ticker,
-            line=dict(color=colors[idx % len(colors)], width=2)
+            line=dict(color=colors[idx % len(colors)], width=2),
+            hovertemplate="$%{y:,.2f}"
         ))
     
     fig.update_layout(
@@ -30,25 +75,28 @@ def create_comparison_chart(data):
     return fig
 
 
+@memoized_figure
 def create_performance_comparison(data):
     """Create normalized performance comparison (percentage change)"""
     fig = go.Figure()
     
     colors = ['#00ff00', '#ff6b6b', '#4ecdc4', '#ffe66d', '#a8dadc']
     
+    trace = _scatter_trace(sum(len(stock_data["close"] or []) for stock_data in data.values()))
     for idx, (ticker, stock_data) in enumerate(data.items()):
         # Normalize to percentage change from first value
         closes = stock_data["close"]
         if closes and len(closes) > 0:
             first_price = closes[0]
-            normalized = [(price / first_price - 1) * 100 for price in closes]
+            normalized = [round((price / first_price - 1) * 100, 2) for price in closes]
             
-            fig.add_trace(go.Scatter(
+            fig.add_trace(trace(
                 x=stock_data["dates"],
                 y=normalized,
                 mode="lines",
                 name=ticker,
-                line=dict(color=colors[idx % len(colors)], width=2)
+                line=dict(color=colors[idx % len(colors)], width=2),
+                hovertemplate="%{y:+.2f}%"
             ))
     
     fig.update_layout(
@@ -63,6 +111,7 @@ def create_performance_comparison(data):
     return fig
 
 
+@memoized_figure
 def create_volume_comparison(data):
     """Create volume comparison chart"""
     fig = go.Figure()
@@ -90,6 +139,7 @@ def create_volume_comparison(data):
     return fig
 
 
+@memoized_figure
 def create_metrics_comparison(data):
     """Create bar chart comparing key metrics"""
     fig = go.Figure()
@@ -105,7 +155,7 @@ def create_metrics_comparison(data):
             name=metric_names[idx],
             x=tickers,
             y=values,
-            text=[f'{v:.2f}' for v in values],
+            texttemplate='%{y:.2f}',
             textposition='auto',
         ))
     
@@ -121,55 +171,48 @@ def create_metrics_comparison(data):
     return fig
 
 
+@memoized_figure
 def create_scatter_plot(data):
-    """Create scatter plot comparing two stocks"""
+    """Create scatter plot of two stocks' date-aligned daily returns"""
     fig = go.Figure()
     
-    tickers = list(data.keys())
-    if len(tickers) >= 2:
+    tickers = data.get("tickers", [])
+    if len(tickers) >= 2 and data.get("x"):
         ticker1, ticker2 = tickers[0], tickers[1]
         
-        # Get price data
-        prices1 = data[ticker1].get("close", [])
-        prices2 = data[ticker2].get("close", [])
-        
-        # Ensure same length
-        min_len = min(len(prices1), len(prices2))
-        prices1 = prices1[:min_len]
-        prices2 = prices2[:min_len]
-        
-        fig.add_trace(go.Scatter(
-            x=prices1,
-            y=prices2,
+        fig.add_trace(_scatter_trace(len(data["x"]))(
+            x=data["x"],
+            y=data["y"],
             mode='markers',
+            name='Daily returns',
             marker=dict(
                 size=8,
-                color=list(range(len(prices1))),
+                color=list(range(len(data["x"]))),
                 colorscale='Viridis',
                 showscale=True,
                 colorbar=dict(title="Time")
             ),
-            text=[f"Day {i+1}" for i in range(len(prices1))],
-            hovertemplate=f'{ticker1}: $%{{x:.2f}}<br>{ticker2}: $%{{y:.2f}}<br>%{{text}}<extra></extra>'
+            customdata=data["dates"],
+            hovertemplate=f'{ticker1}: %{{x:.2f}}%<br>{ticker2}: %{{y:.2f}}%<br>%{{customdata}}<extra></extra>'
         ))
         
-        # Add trend line
-        if len(prices1) > 1:
-            import numpy as np
-            z = np.polyfit(prices1, prices2, 1)
-            p = np.poly1d(z)
+        # Least-squares line through the means; its slope is the beta
+        if data.get("beta") is not None:
+            x_range = [min(data["x"]), max(data["x"])]
+            mean_x = sum(data["x"]) / len(data["x"])
+            mean_y = sum(data["y"]) / len(data["y"])
             fig.add_trace(go.Scatter(
-                x=prices1,
-                y=p(prices1),
+                x=x_range,
+                y=[mean_y + data["beta"] * (x - mean_x) for x in x_range],
                 mode='lines',
-                name='Trend',
+                name=f'Trend (β {data["beta"]:.2f})',
                 line=dict(color='red', dash='dash')
             ))
         
         fig.update_layout(
-            title=f"Scatter Plot: {ticker1} vs {ticker2}",
-            xaxis_title=f"{ticker1} Price ($)",
-            yaxis_title=f"{ticker2} Price ($)",
+            title=f"Daily Returns: {ticker1} vs {ticker2} (correlation {data.get('correlation', 0) or 0:.2f})",
+            xaxis_title=f"{ticker1} daily return (%)",
+            yaxis_title=f"{ticker2} daily return (%)",
             height=500,
             template="plotly_dark",
             hovermode='closest'
@@ -178,32 +221,27 @@ def create_scatter_plot(data):
     return fig
 
 
+@memoized_figure
 def create_correlation_heatmap(data):
-    """Create correlation heatmap for multiple stocks"""
-    import pandas as pd
-    
-    # Build dataframe
-    df_data = {}
-    for ticker, stock_data in data.items():
-        df_data[ticker] = stock_data.get("close", [])
-    
-    df = pd.DataFrame(df_data)
-    correlation = df.corr()
+    """Create correlation heatmap from the backend's returns correlation matrix"""
+    tickers = data.get("tickers", [])
+    matrix = data.get("correlation", [])
     
     fig = go.Figure(data=go.Heatmap(
-        z=correlation.values,
-        x=correlation.columns,
-        y=correlation.columns,
+        z=matrix,
+        x=tickers,
+        y=tickers,
         colorscale='RdBu',
         zmid=0,
-        text=correlation.values,
-        texttemplate='%{text:.2f}',
+        zmin=-1,
+        zmax=1,
+        texttemplate='%{z:.2f}',
         textfont={"size": 12},
         colorbar=dict(title="Correlation")
     ))
     
     fig.update_layout(
-        title="Stock Price Correlation Matrix",
+        title=f"Daily Return Correlation ({data.get('observations', 0)} trading days)",
         height=500,
         template="plotly_dark"
     )
@@ -223,16 +261,46 @@ def create_custom_chart(data, chart_config):
         return create_comparison_chart(data)
 
 
+def _price_figure(data):
+    """Figure for a price chart, with a lower panel when oscillators are present"""
+    if data.get("oscillators"):
+        return make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.7, 0.3], vertical_spacing=0.05)
+    return go.Figure()
+
+
+def add_indicator_traces(fig, data):
+    """Draw indicator overlays on the price axis and oscillators below it"""
+    oscillators = data.get("oscillators") or {}
+    price_panel = {"row": 1, "col": 1} if oscillators else {}
+    trace = _scatter_trace(len(data["dates"]))
+    for label, values in (data.get("overlays") or {}).items():
+        fig.add_trace(trace(
+            x=data["dates"], y=values, mode="lines", name=label, line=dict(width=1.2)
+        ), **price_panel)
+    for label, values in oscillators.items():
+        if label.endswith("histogram"):
+            fig.add_trace(go.Bar(x=data["dates"], y=values, name=label, opacity=0.5), row=2, col=1)
+        else:
+            fig.add_trace(trace(
+                x=data["dates"], y=values, mode="lines", name=label, line=dict(width=1.2)
+            ), row=2, col=1)
+    if oscillators:
+        fig.update_layout(height=650, xaxis_rangeslider_visible=False)
+    return fig
+
+
+@memoized_figure
 def create_candlestick_chart(data):
     """Create candlestick chart with Plotly"""
-    fig = go.Figure(data=[go.Candlestick(
+    fig = _price_figure(data)
+    fig.add_trace(go.Candlestick(
         x=data["dates"],
         open=data["open"],
         high=data["high"],
         low=data["low"],
         close=data["close"],
         name="Price"
-    )])
+    ), **({"row": 1, "col": 1} if data.get("oscillators") else {}))
     
     fig.update_layout(
         title="Stock Price Chart",
@@ -242,20 +310,21 @@ def create_candlestick_chart(data):
         template="plotly_dark"
     )
     
-    return fig
+    return add_indicator_traces(fig, data)
 
 
+@memoized_figure
 def create_line_chart(data):
     """Create line chart with Plotly"""
-    fig = go.Figure()
+    fig = _price_figure(data)
     
-    fig.add_trace(go.Scatter(
+    fig.add_trace(_scatter_trace(len(data["close"]))(
         x=data["dates"],
         y=data["close"],
         mode="lines",
         name="Close Price",
         line=dict(color="#00ff00", width=2)
-    ))
+    ), **({"row": 1, "col": 1} if data.get("oscillators") else {}))
     
     fig.update_layout(
         title="Stock Price Trend",
@@ -265,9 +334,10 @@ def create_line_chart(data):
         template="plotly_dark"
     )
     
-    return fig
+    return add_indicator_traces(fig, data)
 
 
+@memoized_figure
 def create_volume_chart(data):
     """Create volume bar chart with Plotly"""
     fig = go.Figure()
@@ -290,6 +360,7 @@ def create_volume_chart(data):
     return fig
 
 
+@memoized_figure
 def create_dividend_chart(data):
     """Create dividend bar chart with Plotly"""
     fig = go.Figure()
@@ -0,0 +1,113 @@
+"""Bounded chat history for the Streamlit session
+
+Messages keep a compact chart spec ({"type", "ref"}) instead of a Plotly
+figure. The chart data behind a ref is stored zlib-compressed in a
+per-session store capped at CHAT_HISTORY_MB; the oldest charts are evicted
+first and their messages keep the text only. Figures are rebuilt lazily for
+the visible page and kept in a small per-session LRU, so each rerun renders
+at most CHAT_PAGE_SIZE messages however long the conversation gets.
+"""
+import json
+import os
+import uuid
+import zlib
+from collections import OrderedDict
+
+import streamlit as st
+
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "10"))
+CHAT_HISTORY_MB = float(os.getenv("CHAT_HISTORY_MB", "8"))
+MAX_MESSAGES = int(os.getenv("CHAT_MAX_MESSAGES", "200"))
+
+
+def _state(name, factory):
+    if name not in st.session_state:
+        st.session_state[name] = factory()
+    return st.session_state[name]
+
+
+def _chart_store():
+    return _state("chart_store", OrderedDict)
+
+
+def _figure_cache():
+    return _state("figure_cache", OrderedDict)
+
+
+def store_chart(chart_type, data, fig=None):
+    """Compress chart data into the session store and return its spec
+    (fig, when given, seeds the figure cache so the next rerun reuses it)"""
+    blob = zlib.compress(json.dumps(data, separators=(",", ":"), default=str).encode(), 6)
+    store = _chart_store()
+    ref = uuid.uuid4().hex
+    store[ref] = blob
+    cap = int(CHAT_HISTORY_MB * 1024 * 1024)
+    total = sum(len(b) for b in store.values())
+    while total > cap and len(store) > 1:
+        dropped_ref, dropped = store.popitem(last=False)
+        _figure_cache().pop(dropped_ref, None)
+        total -= len(dropped)
+    spec = {"type": chart_type, "ref": ref}
+    if fig is not None:
+        _remember(spec["ref"], fig)
+    return spec
+
+
+def load_chart_data(spec):
+    """Chart data behind a spec, or None once evicted"""
+    blob = _chart_store().get(spec["ref"])
+    return json.loads(zlib.decompress(blob)) if blob is not None else None
+
+
+def _remember(ref, fig):
+    cache = _figure_cache()
+    cache[ref] = fig
+    while len(cache) > CHAT_PAGE_SIZE:
+        cache.popitem(last=False)
+
+
+def figure_for(spec, build):
+    """Figure for a chart spec, rebuilt with build(chart_type, data) on a cache miss"""
+    cache = _figure_cache()
+    fig = cache.get(spec["ref"])
+    if fig is None:
+        data = load_chart_data(spec)
+        if data is None:
+            return None
+        fig = build(spec["type"], data)
+        if fig is None:
+            return None
+        _remember(spec["ref"], fig)
+    else:
+        cache.move_to_end(spec["ref"])
+    return fig
+
+
+def append_message(message):
+    """Add a message, dropping the oldest (and their charts) beyond MAX_MESSAGES"""
+    messages = st.session_state.messages
+    messages.append(message)
+    st.session_state.history_page = 0
+    if len(messages) > MAX_MESSAGES:
+        store = _chart_store()
+        for old in messages[:len(messages) - MAX_MESSAGES]:
+            if "chart" in old:
+                store.pop(old["chart"]["ref"], None)
+                _figure_cache().pop(old["chart"]["ref"], None)
+        del messages[:len(messages) - MAX_MESSAGES]
+
+
+def clear_history():
+    st.session_state.messages = []
+    st.session_state.history_page = 0
+    st.session_state.chart_store = OrderedDict()
+    st.session_state.figure_cache = OrderedDict()
+
+
+def page_bounds():
+    """(start, end, pages) of the visible page; page 0 is the latest"""
+    total = len(st.session_state.messages)
+    pages = max((total + CHAT_PAGE_SIZE - 1) // CHAT_PAGE_SIZE, 1)
+    page = min(st.session_state.get("history_page", 0), pages - 1)
+    end = total - page * CHAT_PAGE_SIZE
+    return max(end - CHAT_PAGE_SIZE, 0), end, pages
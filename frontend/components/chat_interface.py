@@ -1,11 +1,14 @@
 """Chat interface component"""
 import streamlit as st
-import requests
 from .charts import (
     create_candlestick_chart, create_line_chart, create_volume_chart, create_dividend_chart,
     create_comparison_chart, create_performance_comparison, create_volume_comparison, 
     create_metrics_comparison, create_scatter_plot, create_correlation_heatmap
 )
+from .api_client import get_session
+from .chat_history import append_message, figure_for, page_bounds, store_chart
+from .payload import ACCEPT, decode_response
+from .series_cache import known_series, resolve_series
 
 
 def render_chat_messages():
@@ -30,16 +33,30 @@ def render_chat_messages():
         </div>
         """, unsafe_allow_html=True)
     
-    # Display chat history
-    for idx, message in enumerate(st.session_state.messages):
+    # Display one page of chat history; older turns stay collapsed
+    messages = st.session_state.messages
+    start, end, pages = page_bounds()
+    page = st.session_state.get("history_page", 0)
+    if start > 0 and st.button(f"⬆️ Show earlier messages ({start} hidden)", key="history_older", use_container_width=True):
+        st.session_state.history_page = page + 1
+        st.rerun()
+
+    for idx in range(start, end):
+        message = messages[idx]
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
             if "chart" in message:
-                st.plotly_chart(message["chart"], use_container_width=True)
+                chart = figure_for(message["chart"], build_chart)
+                if chart is not None:
+                    st.plotly_chart(chart, use_container_width=True)
+                else:
+                    st.caption("📉 Chart dropped from history to save memory")
+            if message.get("caption"):
+                st.caption(message["caption"])
             
             # Display suggestions if this is the last assistant message
             if message["role"] == "assistant" and "suggestions" in message and message["suggestions"]:
-                if idx == len(st.session_state.messages) - 1:  # Only show for last message
+                if idx == len(messages) - 1:  # Only show for last message
                     st.markdown("**💡 You might also want to ask:**")
                     cols = st.columns(min(len(message["suggestions"]), 2))
                     for sug_idx, suggestion in enumerate(message["suggestions"][:4]):
@@ -48,11 +65,35 @@ def render_chat_messages():
                                 st.session_state.quick_question = suggestion
                                 st.rerun()
 
+    if page > 0 and st.button(f"⬇️ Back to latest (page {page + 1} of {pages})", key="history_latest", use_container_width=True):
+        st.session_state.history_page = 0
+        st.rerun()
+
+
+def build_chart(chart_type, data):
+    """Plotly figure for a chart type, or None when there is nothing to draw"""
+    if not data:
+        return None
+    builders = {
+        "scatter": create_scatter_plot,
+        "heatmap": create_correlation_heatmap,
+        "comparison": create_comparison_chart,
+        "performance_comparison": create_performance_comparison,
+        "volume_comparison": create_volume_comparison,
+        "metrics_comparison": create_metrics_comparison,
+        "candlestick": create_candlestick_chart,
+        "line": create_line_chart,
+        "volume": create_volume_chart,
+        "bar": create_dividend_chart,
+    }
+    builder = builders.get(chart_type)
+    return builder(data) if builder else None
+
 
 def handle_chat_input(prompt, ticker, period, api_url):
     """Handle chat input and API response"""
     # Add user message
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    append_message({"role": "user", "content": prompt})
     with st.chat_message("user"):
         st.markdown(prompt)
     
@@ -60,70 +101,62 @@ def handle_chat_input(prompt, ticker, period, api_url):
     with st.chat_message("assistant"):
         with st.spinner("🤔 Analyzing..."):
             try:
-                response = requests.post(
+                response = get_session().post(
                     f"{api_url}/query",
                     json={
                         "question": prompt,
                         "ticker": ticker,
-                        "period": period
+                        "period": period,
+                        # Server-side conversation memory; follow-ups carry context
+                        "session_id": st.session_state.get("session_id"),
+                        "indicators": st.session_state.get("indicators") or None,
+                        "interval": st.session_state.get("interval", "1d"),
+                        # 0 asks for every bar; None uses the server default
+                        "max_points": 0 if st.session_state.get("full_resolution") else None,
+                        "compact": True,
+                        # Cached price series: the server sends only the bars we lack
+                        "known_series": known_series()
                     },
+                    headers={"Accept": ACCEPT},
                     timeout=60  # Increased timeout
                 )
                 
                 if response.status_code == 200:
-                    result = response.json()
+                    result = decode_response(response)
                     answer = result["answer"]
-                    data = result["data"]
+                    data = resolve_series(result, api_url)
                     chart_type = result["chart_type"]
                     suggestions = result.get("suggestions", [])
+                    st.session_state.session_id = result.get("session_id")
                     
                     # Display answer
                     st.markdown(answer)
                     
                     # Create and display chart dynamically
-                    chart = None
-                    if chart_type == "scatter" and data:
-                        chart = create_scatter_plot(data)
-                    elif chart_type == "heatmap" and data:
-                        chart = create_correlation_heatmap(data)
-                    elif chart_type == "comparison" and data:
-                        chart = create_comparison_chart(data)
-                    elif chart_type == "performance_comparison" and data:
-                        chart = create_performance_comparison(data)
-                    elif chart_type == "volume_comparison" and data:
-                        chart = create_volume_comparison(data)
-                    elif chart_type == "metrics_comparison" and data:
-                        chart = create_metrics_comparison(data)
-                    elif chart_type == "candlestick" and data:
-                        chart = create_candlestick_chart(data)
-                    elif chart_type == "line" and data:
-                        chart = create_line_chart(data)
-                    elif chart_type == "volume" and data:
-                        chart = create_volume_chart(data)
-                    elif chart_type == "bar" and data:
-                        chart = create_dividend_chart(data)
-                    
+                    chart = build_chart(chart_type, data)
+                    message = {
+                        "role": "assistant",
+                        "content": answer,
+                        "suggestions": suggestions
+                    }
                     if chart:
                         st.plotly_chart(chart, use_container_width=True)
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": answer,
-                            "chart": chart,
-                            "suggestions": suggestions
-                        })
-                    else:
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": answer,
-                            "suggestions": suggestions
-                        })
+                        downsampled = result.get("downsampled")
+                        if downsampled:
+                            message["caption"] = (
+                                f"Showing {downsampled['points']:,} of {downsampled['original_points']:,} points "
+                                f"({downsampled['method'].upper()}); enable full-resolution charts in the sidebar for every bar")
+                            st.caption(message["caption"])
+                        # History keeps a compressed spec; the figure is rebuilt when shown
+                        message["chart"] = store_chart(chart_type, data, chart)
+                    append_message(message)
                     
                     # Suggestions will be displayed by render_chat_messages()
                     # No need to display them here
                 else:
                     error_msg = f"Error: {response.json().get('detail', 'Unknown error')}"
                     st.error(error_msg)
-                    st.session_state.messages.append({
+                    append_message({
                         "role": "assistant",
                         "content": error_msg
                     })
@@ -131,7 +164,7 @@ def handle_chat_input(prompt, ticker, period, api_url):
             except Exception as e:
                 error_msg = f"Error connecting to API: {str(e)}"
                 st.error(error_msg)
-                st.session_state.messages.append({
+                append_message({
                     "role": "assistant",
                     "content": error_msg
                 })
@@ -0,0 +1,29 @@
+"""Fragment-scoped reruns across Streamlit versions
+
+st.fragment (1.37+) and st.experimental_fragment (1.33-1.36) rerun only the
+decorated function when a widget inside it changes. Older releases have
+neither; there the decorator is a no-op and interactions rerun the page.
+"""
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+FRAGMENTS_SUPPORTED = _fragment is not None
+
+
+def fragment(func=None, **kwargs):
+    """Run func as a fragment where supported (kwargs such as run_every pass through)"""
+    if func is None:
+        return lambda f: fragment(f, **kwargs)
+    if _fragment is None:
+        return func
+    return _fragment(func, **kwargs) if kwargs else _fragment(func)
+
+
+def rerun_fragment():
+    """Rerun the current fragment only, or the whole app where that is unsupported"""
+    try:
+        st.rerun(scope="fragment")
+    except (TypeError, StreamlitAPIException):
+        # No scope argument, or this run was a full-page run
+        st.rerun()
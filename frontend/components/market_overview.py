@@ -1,6 +1,6 @@
 """Market overview component"""
 import streamlit as st
-import requests
+from .api_client import get_json_revalidated
 
 
 def render_market_overview(api_url):
@@ -9,7 +9,7 @@ def render_market_overview(api_url):
     
     with st.spinner("Loading market data..."):
         try:
-            market_data = requests.get(f"{api_url}/market-overview", timeout=10).json()
+            market_data = get_json_revalidated(f"{api_url}/market-overview", timeout=10)
             
             col1, col2, col3 = st.columns(3)
             
@@ -0,0 +1,54 @@
+"""Decoding of compact /query responses"""
+import numpy as np
+
+COMPACT_FORMAT = "columnar-v1"
+MSGPACK_TYPE = "application/msgpack"
+
+try:
+    import msgpack
+    ACCEPT = f"{MSGPACK_TYPE}, application/json"
+except ImportError:
+    msgpack = None
+    ACCEPT = "application/json"
+
+
+def _axis_dates(axis):
+    """Date labels of a {"unit", "start", "deltas"} axis, formatted as the
+    backend sends them ("YYYY-MM-DD" or "YYYY-MM-DD HH:MM")"""
+    values = axis["start"] + np.concatenate(([0], np.cumsum(axis["deltas"], dtype=np.int64)))
+    if axis["unit"] == "minute":
+        labels = np.datetime_as_string(values.astype("datetime64[m]"), unit="m")
+        return np.char.replace(labels, "T", " ").astype(object).tolist()
+    return np.datetime_as_string(values.astype("datetime64[D]"), unit="D").astype(object).tolist()
+
+
+def expand_chart_data(data):
+    """Chart data in the original layout (date strings per series), so the
+    chart builders work unchanged"""
+    if not isinstance(data, dict) or data.get("format") != COMPACT_FORMAT:
+        return data
+    axes = [_axis_dates(axis) for axis in data["axes"]]
+
+    def expand(node):
+        if isinstance(node, dict):
+            out = {}
+            for key, value in node.items():
+                if key == "axis" and isinstance(value, int):
+                    out["dates"] = axes[value]
+                else:
+                    out[key] = expand(value)
+            return out
+        return node
+
+    return expand(data["series"])
+
+
+def decode_response(response):
+    """Body of a /query response (JSON or msgpack) with chart data expanded"""
+    if msgpack and response.headers.get("content-type", "").startswith(MSGPACK_TYPE):
+        result = msgpack.unpackb(response.content, raw=False)
+    else:
+        result = response.json()
+    if "data" in result:
+        result["data"] = expand_chart_data(result["data"])
+    return result
@@ -0,0 +1,101 @@
+"""Per-ticker price series cache for delta-synced charts
+
+The backend tags single-stock price charts with a series marker (ticker,
+period, interval, chart type, revision). The markers of cached series are
+sent with every query; when the backend recognizes one it returns only the
+bars from "delta_from" onward, which are merged here.
+"""
+import streamlit as st
+
+from .api_client import get_session
+from .payload import ACCEPT, decode_response
+
+BAR_COLUMNS = ("dates", "open", "high", "low", "close", "volume")
+MAX_CACHED_SERIES = 20
+
+
+def _cache():
+    if "series_cache" not in st.session_state:
+        st.session_state.series_cache = {}
+    return st.session_state.series_cache
+
+
+def _key(marker):
+    return (marker["ticker"], marker["period"], marker["interval"], marker["chart_type"])
+
+
+def _label(date):
+    """Bar date in the backend's "YYYY-MM-DD HH:MM" form"""
+    return date.replace("T", " ")
+
+
+def known_series():
+    """Markers of the cached series, for the /query request"""
+    return [
+        {**entry["marker"], "last": _label(entry["bars"]["dates"][-1])}
+        for entry in _cache().values() if entry["bars"].get("dates")
+    ]
+
+
+def _merge(cached, delta, marker):
+    """Cached bars before delta_from plus the delta, trimmed to the server's window"""
+    dates = cached["dates"]
+    delta_from = _label(delta["delta_from"])
+    cut = next((i for i, d in enumerate(dates) if _label(d) >= delta_from), len(dates))
+    start = next((i for i, d in enumerate(dates) if _label(d) >= _label(marker["start"])), cut)
+    merged = {}
+    for column in BAR_COLUMNS:
+        if column in delta:
+            merged[column] = cached.get(column, [])[start:cut] + delta[column]
+    if len(merged.get("dates", [])) != marker["count"]:
+        return None
+    return merged
+
+
+def _fetch_full(api_url, marker):
+    """Whole series from /series, when a delta cannot be applied"""
+    try:
+        response = get_session().get(
+            f"{api_url}/series/{marker['ticker']}",
+            params={"period": marker["period"], "interval": marker["interval"]},
+            headers={"Accept": ACCEPT},
+            timeout=30
+        )
+        if response.status_code == 200:
+            return decode_response(response)["data"]
+    except Exception as e:
+        print(f"Series fetch error: {e}")
+    return None
+
+
+def resolve_series(result, api_url):
+    """Full chart data for a /query result, merging a delta into the cache.
+
+    Results without a series marker are returned unchanged.
+    """
+    data = result.get("data") or {}
+    marker = result.get("series")
+    if not marker:
+        return data
+
+    cache = _cache()
+    key = _key(marker)
+    bars = {column: data[column] for column in BAR_COLUMNS if column in data}
+    if "delta_from" in data:
+        cached = cache.get(key)
+        bars = _merge(cached["bars"], data, marker) if cached else None
+        if bars is None:
+            full = _fetch_full(api_url, marker)
+            if not full:
+                cache.pop(key, None)
+                return {}
+            bars = {column: full[column] for column in BAR_COLUMNS if column in data}
+            if len(bars["dates"]) != marker["count"]:
+                # The series moved between the two requests; resync next time
+                cache.pop(key, None)
+                return {**{k: v for k, v in data.items() if k != "delta_from" and k not in BAR_COLUMNS}, **bars}
+
+    cache[key] = {"marker": marker, "bars": bars}
+    if len(cache) > MAX_CACHED_SERIES:
+        cache.pop(next(iter(cache)))
+    return {**{k: v for k, v in data.items() if k != "delta_from" and k not in BAR_COLUMNS}, **bars}
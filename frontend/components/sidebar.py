@@ -1,8 +1,21 @@
 """Sidebar component"""
 import streamlit as st
+from .api_client import get_session
+from .chat_history import clear_history
 
 
-def render_sidebar():
+def end_session(api_url):
+    """Drop the conversation's id here and its memory on the backend"""
+    session_id = st.session_state.pop("session_id", None)
+    if not session_id:
+        return
+    try:
+        get_session().delete(f"{api_url}/session/{session_id}", timeout=5)
+    except Exception as e:
+        print(f"Session cleanup error: {e}")
+
+
+def render_sidebar(api_url):
     """Render the sidebar with settings and quick actions"""
     with st.sidebar:
         st.header("⚙️ Settings")
@@ -13,6 +26,23 @@ def render_sidebar():
             ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "max"],
             index=2
         )
+        st.selectbox(
+            "Bar Interval",
+            ["1d", "1h", "15m", "5m", "1m"],
+            key="interval",
+            help="Intraday bars cover up to the last 5 days (1m), 30 days (5m), 60 days (15m) or 180 days (1h)"
+        )
+        st.checkbox(
+            "Full-resolution charts",
+            key="full_resolution",
+            help="Long ranges are downsampled to a few hundred points by default"
+        )
+        st.multiselect(
+            "Chart Indicators",
+            ["sma:20", "sma:50", "ema:20", "bbands:20,2", "vwap", "rsi:14", "macd:12,26,9", "atr:14"],
+            key="indicators",
+            help="Overlaid on price charts; RSI, MACD and ATR get their own panel"
+        )
         
         st.markdown("---")
         st.markdown("### 💡 Try These")
@@ -70,7 +100,9 @@ def render_sidebar():
         
         st.markdown("---")
         if st.button("🗑️ Clear Chat", use_container_width=True):
-            st.session_state.messages = []
+            clear_history()
+            # Start a fresh server-side conversation too
+            end_session(api_url)
             st.rerun()
         
         st.markdown("---")
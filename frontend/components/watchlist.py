@@ -0,0 +1,51 @@
+"""Live watchlist component"""
+from urllib.parse import quote
+
+import streamlit as st
+
+from .api_client import get_json_revalidated
+from .fragments import FRAGMENTS_SUPPORTED, fragment
+
+DEFAULT_WATCHLIST = "AAPL, MSFT, NVDA, TSLA"
+# The backend polls every QUOTE_POLL_SECONDS (15 by default); refreshing
+# faster only revalidates the same quotes
+REFRESH_SECONDS = 15
+
+
+def watchlist_url(api_url):
+    """/quotes URL for the tickers in the watchlist box"""
+    tickers = st.session_state.get("watchlist", DEFAULT_WATCHLIST)
+    return f"{api_url}/quotes?tickers={quote(tickers)}"
+
+
+def render_watchlist(api_url):
+    """Watchlist input plus quotes that refresh on their own"""
+    st.markdown("### 👀 Watchlist")
+    if "watchlist" not in st.session_state:
+        st.session_state.watchlist = DEFAULT_WATCHLIST
+    st.text_input("Tickers", key="watchlist", help="Comma-separated symbols, up to 25")
+    _render_quotes(watchlist_url(api_url))
+
+
+@fragment(run_every=REFRESH_SECONDS)
+def _render_quotes(url):
+    """Quote tiles; reruns alone every REFRESH_SECONDS where fragments are supported"""
+    try:
+        data = get_json_revalidated(url, timeout=10)
+    except Exception:
+        st.error("Unable to load quotes. Please check if the backend is running.")
+        return
+    if "detail" in data:
+        st.warning(f"⚠️ {data['detail']}")
+        return
+    quotes = data.get("quotes", [])
+    if not quotes:
+        st.info("No quotes for these tickers")
+        return
+    cols = st.columns(min(len(quotes), 4))
+    for idx, item in enumerate(quotes):
+        with cols[idx % len(cols)]:
+            st.metric(item["ticker"], f"${item['price']:,.2f}",
+                      f"{item['change']:+.2f} ({item['change_pct']:+.2f}%)")
+    if not FRAGMENTS_SUPPORTED and st.button("🔄 Refresh quotes", key="watchlist_refresh"):
+        st.rerun()